@@ -0,0 +1,424 @@
+"""
+🧭 APPROXIMATE NEAREST-NEIGHBOR INDEX
+=====================================
+
+IVF-PQ index (inverted file + product quantization) in NumPy for top-k
+serving over item vectors without scoring the whole catalog:
+
+1. a coarse k-means splits the items into n_lists inverted lists
+2. every item residual (vector - list centroid) is product-quantized into
+   n_subspaces one-byte codes
+3. a query probes its n_probe closest lists, ranks their items with
+   asymmetric distance tables (one (n_subspaces, 256) lookup per list),
+   and re-scores the best refine x k candidates exactly
+
+Items are ranked by inner product. Maximum inner product search is reduced
+to L2 search by appending sqrt(max_norm^2 - |y|^2) to every item vector
+(and 0 to the query); the 'cosine' metric L2-normalizes items and queries
+first. Matrix factorization models are indexed as [item_factors | item_bias]
+and queried with [user_factors | 1], so the index ranks exactly like
+FactorModel.scores.
+
+Items the user has already seen are passed as exclusion lists and never
+returned; when they fill the probed lists the query probes twice as many
+lists until k items are found or the whole index is searched. Arrays are persisted as .npy files next to the other array
+models and can be loaded memory-mapped.
+
+Usage:
+    index = ANNIndex.from_factor_model(factor_model)
+    ids, scores = index.search(ANNIndex.factor_queries(factor_model, [0]), 10, exclude=[seen])
+    python ann_index.py --items 200000          # recall@k vs latency benchmark
+
+Author: AI Assistant
+Date: June 19, 2025
+"""
+
+import argparse
+import json
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import scipy.sparse as sp
+
+from scoring_engine import top_k
+
+ARRAY_FIELDS = ['centroids', 'codebooks', 'list_offsets', 'list_items', 'codes', 'vectors']
+METRICS = ('ip', 'cosine')
+SUBSPACE_DIM = 4
+CODEBOOK_SIZE = 256
+TRAINING_POINTS_PER_CLUSTER = 64
+
+Exclusions = Union[None, sp.spmatrix, Sequence[Optional[np.ndarray]]]
+
+
+def _assign(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Closest centroid (L2) of every row, computed in blocks of bounded size"""
+    centroid_norms = np.einsum('ij,ij->i', centroids, centroids)
+    labels = np.empty(len(data), dtype=np.int32)
+    block_size = max(1, (1 << 22) // max(len(centroids), 1))
+    for start in range(0, len(data), block_size):
+        block = data[start:start + block_size]
+        labels[start:start + block_size] = np.argmin(centroid_norms - 2 * (block @ centroids.T), axis=1)
+    return labels
+
+
+def _kmeans(data: np.ndarray, n_clusters: int, iterations: int,
+            rng: np.random.Generator) -> np.ndarray:
+    """Lloyd's k-means; empty clusters are re-seeded with random points"""
+    n_rows = len(data)
+    n_clusters = max(1, min(n_clusters, n_rows))
+    centroids = data[rng.choice(n_rows, n_clusters, replace=False)].astype(np.float32)
+
+    for _ in range(iterations):
+        labels = _assign(data, centroids)
+        membership = sp.csr_matrix((np.ones(n_rows, dtype=np.float32), (labels, np.arange(n_rows))),
+                                   shape=(n_clusters, n_rows))
+        counts = np.asarray(membership.sum(axis=1)).ravel()
+        sums = membership @ data
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        if not filled.all():
+            centroids[~filled] = data[rng.choice(n_rows, int((~filled).sum()))]
+    return centroids
+
+
+def _exclusion_getter(exclude: Exclusions, n_queries: int) -> Callable[[int], Optional[np.ndarray]]:
+    """Per-query excluded item ids from a CSR matrix (one row per query) or a list of arrays"""
+    if exclude is None:
+        return lambda position: None
+    if sp.issparse(exclude):
+        matrix = sp.csr_matrix(exclude)
+        return lambda position: matrix.indices[matrix.indptr[position]:matrix.indptr[position + 1]]
+    if len(exclude) != n_queries:
+        raise ValueError(f"Expected {n_queries} exclusion lists, got {len(exclude)}")
+    return lambda position: exclude[position]
+
+
+@dataclass
+class ANNIndex:
+    """IVF-PQ index over item vectors, ranked by inner product"""
+    centroids: np.ndarray          # (n_lists, dim) float32 coarse centroids (index space)
+    codebooks: np.ndarray          # (n_subspaces, n_codes, SUBSPACE_DIM) float32 PQ codebooks
+    list_offsets: np.ndarray       # (n_lists + 1,) int64 list boundaries in list order
+    list_items: np.ndarray         # (n_items,) int32 item id of every position
+    codes: np.ndarray              # (n_items, n_subspaces) uint8 PQ codes
+    vectors: np.ndarray            # (n_items, d) float32 item vectors for exact re-scoring
+    metric: str = 'ip'
+    max_norm: float = 0.0
+    n_probe: int = 8
+    refine: int = 4
+
+    @property
+    def n_items(self) -> int:
+        return len(self.list_items)
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    @property
+    def n_subspaces(self) -> int:
+        return self.codebooks.shape[0]
+
+    # ------------------------------------------------------------------
+    # Build
+    # ------------------------------------------------------------------
+    @classmethod
+    def build(cls, vectors: np.ndarray, item_ids: Optional[np.ndarray] = None, metric: str = 'ip',
+              n_lists: Optional[int] = None, n_probe: int = 8, refine: int = 4,
+              iterations: int = 15, random_state: Optional[int] = 42) -> 'ANNIndex':
+        """
+        Build an index over item vectors
+
+        Args:
+            vectors: (n_items, d) item vectors
+            item_ids: Id returned for every row (default: row number)
+            metric: 'ip' (inner product) or 'cosine'
+            n_lists: Inverted lists (default: 4 * sqrt(n_items))
+            n_probe: Default lists probed per query
+            refine: Default shortlist size, as a multiple of k, re-scored exactly
+            iterations: k-means iterations (coarse quantizer and codebooks)
+            random_state: Seed of the k-means initialisation and sampling
+
+        Returns:
+            ANNIndex
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric: {metric} (expected one of {METRICS})")
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if metric == 'cosine':
+            vectors = cls._normalized(vectors)
+        n_items = len(vectors)
+        item_ids = np.arange(n_items) if item_ids is None else np.asarray(item_ids)
+        rng = np.random.default_rng(random_state)
+
+        norms = np.sqrt(np.einsum('ij,ij->i', vectors, vectors))
+        max_norm = float(norms.max()) if n_items else 0.0
+        index_space = cls._index_space(vectors, np.sqrt(np.maximum(max_norm ** 2 - norms ** 2, 0.0)))
+
+        # Coarse quantizer, trained on a sample
+        n_lists = n_lists or max(1, int(4 * np.sqrt(n_items)))
+        sample_size = min(n_items, n_lists * TRAINING_POINTS_PER_CLUSTER)
+        sample = index_space[rng.choice(n_items, sample_size, replace=False)]
+        centroids = _kmeans(sample, n_lists, iterations, rng)
+        labels = _assign(index_space, centroids)
+
+        # Product quantization of the residuals, one codebook per subspace
+        residuals = index_space - centroids[labels]
+        n_subspaces = index_space.shape[1] // SUBSPACE_DIM
+        n_codes = min(CODEBOOK_SIZE, n_items)
+        sample = residuals[rng.choice(n_items, min(n_items, n_codes * TRAINING_POINTS_PER_CLUSTER),
+                                      replace=False)]
+        codebooks = np.zeros((n_subspaces, n_codes, SUBSPACE_DIM), dtype=np.float32)
+        codes = np.empty((n_items, n_subspaces), dtype=np.uint8)
+        for subspace in range(n_subspaces):
+            columns = slice(subspace * SUBSPACE_DIM, (subspace + 1) * SUBSPACE_DIM)
+            codebook = _kmeans(sample[:, columns], n_codes, iterations, rng)
+            codebooks[subspace, :len(codebook)] = codebook
+            codes[:, subspace] = _assign(residuals[:, columns], codebook)
+
+        # Items stored list by list
+        order = np.argsort(labels, kind='stable')
+        list_offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=len(centroids)), out=list_offsets[1:])
+
+        return cls(centroids, codebooks, list_offsets, item_ids[order].astype(np.int32),
+                   codes[order], vectors[order], metric, max_norm, n_probe, refine)
+
+    @classmethod
+    def from_factor_model(cls, factors, **kwargs) -> 'ANNIndex':
+        """Index the scorable items of a FactorModel as [item_factors | item_bias]"""
+        item_ids = np.flatnonzero(factors.item_mask)
+        vectors = np.hstack([factors.item_factors[item_ids], factors.item_bias[item_ids, None]])
+        return cls.build(vectors, item_ids, metric='ip', **kwargs)
+
+    @staticmethod
+    def factor_queries(factors, user_rows: Sequence[int]) -> np.ndarray:
+        """Queries [user_factors | 1] matching from_factor_model (user bias and mean excluded)"""
+        user_rows = np.asarray(user_rows, dtype=np.int64)
+        return np.hstack([factors.user_factors[user_rows],
+                          np.ones((len(user_rows), 1), dtype=np.float32)])
+
+    @staticmethod
+    def _normalized(vectors: np.ndarray) -> np.ndarray:
+        norms = np.sqrt(np.einsum('ij,ij->i', vectors, vectors))
+        return vectors / np.where(norms > 0, norms, 1.0)[:, None].astype(np.float32)
+
+    @staticmethod
+    def _index_space(vectors: np.ndarray, extra: np.ndarray) -> np.ndarray:
+        """[vectors | extra | zero padding] with a dimension divisible by SUBSPACE_DIM"""
+        dim = -(-(vectors.shape[1] + 1) // SUBSPACE_DIM) * SUBSPACE_DIM
+        index_space = np.zeros((len(vectors), dim), dtype=np.float32)
+        index_space[:, :vectors.shape[1]] = vectors
+        index_space[:, vectors.shape[1]] = extra
+        return index_space
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+    def search(self, queries: np.ndarray, k: int, n_probe: Optional[int] = None,
+               exclude: Exclusions = None, refine: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate top-k items by inner product
+
+        Args:
+            queries: (n_queries, d) query vectors
+            k: Items per query
+            n_probe: Inverted lists probed per query (default: self.n_probe),
+                     doubled while exclusions leave fewer than k items
+            exclude: Item ids never returned, as one array per query or a
+                     CSR matrix with one row per query (e.g. user-item rows)
+            refine: Shortlist size as a multiple of k, re-scored exactly
+
+        Returns:
+            (ids, scores): int64 (n_queries, k) item ids, -1 for empty slots
+            (only when fewer than k items are not excluded), and float32
+            exact inner products, -inf for empty slots
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if self.metric == 'cosine':
+            queries = self._normalized(queries)
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+        shortlist = max(k, k * (refine or self.refine))
+        excluded = _exclusion_getter(exclude, len(queries))
+
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        if self.n_items == 0 or k <= 0:
+            return ids, scores
+
+        index_queries = self._index_space(queries, np.zeros(len(queries), dtype=np.float32))
+        coarse = (np.einsum('ij,ij->i', self.centroids, self.centroids)[None, :]
+                  - 2 * (index_queries @ self.centroids.T))
+        probe_order = np.argsort(coarse, axis=1, kind='stable')
+        codebook_norms = np.einsum('mkd,mkd->mk', self.codebooks, self.codebooks)
+
+        for position, query in enumerate(queries):
+            # Exclusions are applied inside the probed lists only, so a heavy
+            # user can exhaust them: widen the probe until k items are found
+            # or every list has been searched
+            probe_count = n_probe
+            while True:
+                found, found_scores = self._search_one(
+                    query, index_queries[position], probe_order[position, :probe_count], k,
+                    shortlist, excluded(position), codebook_norms)
+                if len(found) >= k or probe_count >= self.n_lists:
+                    break
+                probe_count = min(2 * probe_count, self.n_lists)
+            ids[position, :len(found)] = found
+            scores[position, :len(found)] = found_scores
+        return ids, scores
+
+    def _search_one(self, query: np.ndarray, index_query: np.ndarray, probe: np.ndarray, k: int,
+                    shortlist: int, excluded: Optional[np.ndarray],
+                    codebook_norms: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        starts, stops = self.list_offsets[probe], self.list_offsets[probe + 1]
+        sizes = stops - starts
+        n_candidates = int(sizes.sum())
+        if n_candidates == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        # Positions of every item in the probed lists, and the probe each belongs to
+        owner = np.repeat(np.arange(len(probe)), sizes)
+        positions = np.arange(n_candidates) + np.repeat(starts - (np.cumsum(sizes) - sizes), sizes)
+
+        # Asymmetric distance tables: |r_j - codebook_j|^2 per probe and subspace
+        residual = (index_query[None, :] - self.centroids[probe]).reshape(
+            len(probe), self.n_subspaces, SUBSPACE_DIM)
+        tables = (np.einsum('pmd,pmd->pm', residual, residual)[:, :, None]
+                  - 2 * np.einsum('pmd,mkd->pmk', residual, self.codebooks)
+                  + codebook_norms[None, :, :])
+        distances = tables[owner[:, None], np.arange(self.n_subspaces)[None, :],
+                           self.codes[positions]].sum(axis=1)
+
+        eligible = None
+        if excluded is not None and len(excluded):
+            eligible = ~np.isin(self.list_items[positions], excluded)
+
+        # Exact inner products over the shortlist
+        positions = positions[top_k(-distances, shortlist, eligible)]
+        exact = self.vectors[positions] @ query
+        best = top_k(exact, k)
+        return self.list_items[positions[best]].astype(np.int64), exact[best]
+
+    def exact_search(self, queries: np.ndarray, k: int,
+                     exclude: Exclusions = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Brute-force top-k over every indexed item (same output format as search)"""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if self.metric == 'cosine':
+            queries = self._normalized(queries)
+        excluded = _exclusion_getter(exclude, len(queries))
+
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        all_scores = queries @ self.vectors.T
+        position_of = np.full(int(self.list_items.max()) + 1 if self.n_items else 0, -1, dtype=np.int64)
+        position_of[self.list_items] = np.arange(self.n_items)
+        for position in range(len(queries)):
+            eligible = None
+            items = excluded(position)
+            if items is not None and len(items):
+                items = np.asarray(items, dtype=np.int64)
+                items = position_of[items[(items >= 0) & (items < len(position_of))]]
+                eligible = np.ones(self.n_items, dtype=bool)
+                eligible[items[items >= 0]] = False
+            best = top_k(all_scores[position], k, eligible)
+            ids[position, :len(best)] = self.list_items[best]
+            scores[position, :len(best)] = all_scores[position, best]
+        return ids, scores
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def save(self, prefix: str):
+        """Write one <prefix>.<field>.npy per array plus <prefix>.json"""
+        for name in ARRAY_FIELDS:
+            np.save(f"{prefix}.{name}.npy", np.ascontiguousarray(getattr(self, name)))
+        with open(f"{prefix}.json", 'w', encoding='utf-8') as f:
+            json.dump({'metric': self.metric, 'max_norm': self.max_norm,
+                       'n_probe': self.n_probe, 'refine': self.refine}, f)
+
+    @classmethod
+    def load(cls, prefix: str, mmap_mode: Optional[str] = 'r') -> 'ANNIndex':
+        """Load saved arrays (memory-mapped read-only by default)"""
+        with open(f"{prefix}.json", 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        arrays = {name: np.load(f"{prefix}.{name}.npy", mmap_mode=mmap_mode) for name in ARRAY_FIELDS}
+        return cls(**arrays, **meta)
+
+
+def recall_at_k(found: np.ndarray, expected: np.ndarray) -> float:
+    """Mean fraction of the exact top-k ids (ignoring empty slots) that were found"""
+    hits, total = 0, 0
+    for found_row, expected_row in zip(found, expected):
+        expected_row = expected_row[expected_row >= 0]
+        hits += len(np.intersect1d(found_row, expected_row))
+        total += len(expected_row)
+    return hits / total if total else 1.0
+
+
+def benchmark(index: ANNIndex, queries: np.ndarray, k: int = 10,
+              n_probes: Sequence[int] = (1, 2, 4, 8, 16, 32),
+              exclude: Exclusions = None) -> List[Dict[str, Any]]:
+    """
+    Recall@k and latency of the index against exact search
+
+    Args:
+        index: Built ANNIndex
+        queries: (n_queries, d) query vectors
+        k: Items per query
+        n_probes: Probe counts to measure
+        exclude: Exclusion lists applied to both searches
+
+    Returns:
+        One row per probe count (plus an 'exact' row): recall, ms per query
+    """
+    start_time = time.perf_counter()
+    expected, _ = index.exact_search(queries, k, exclude)
+    exact_ms = (time.perf_counter() - start_time) * 1000 / len(queries)
+
+    rows = [{'n_probe': 'exact', 'recall': 1.0, 'ms_per_query': round(exact_ms, 3), 'speedup': 1.0}]
+    for n_probe in n_probes:
+        if n_probe > index.n_lists:
+            break
+        start_time = time.perf_counter()
+        found, _ = index.search(queries, k, n_probe=n_probe, exclude=exclude)
+        ms = (time.perf_counter() - start_time) * 1000 / len(queries)
+        rows.append({'n_probe': n_probe, 'recall': round(recall_at_k(found, expected), 4),
+                     'ms_per_query': round(ms, 3), 'speedup': round(exact_ms / ms, 2)})
+    return rows
+
+
+def main():
+    """Benchmark on synthetic clustered factors (catalog sizes beyond the sample data)"""
+    parser = argparse.ArgumentParser(description='ANN index recall/latency benchmark')
+    parser.add_argument('--items', type=int, default=200000)
+    parser.add_argument('--factors', type=int, default=32)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--seen', type=int, default=20, help='excluded items per query')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    topics = rng.standard_normal((64, args.factors)).astype(np.float32)
+    items = (topics[rng.integers(0, 64, args.items)]
+             + 0.5 * rng.standard_normal((args.items, args.factors))).astype(np.float32)
+    queries = (topics[rng.integers(0, 64, args.queries)]
+               + 0.5 * rng.standard_normal((args.queries, args.factors))).astype(np.float32)
+    exclude = [rng.choice(args.items, args.seen, replace=False) for _ in range(args.queries)]
+
+    print(f"🧭 Building IVF-PQ index over {args.items} x {args.factors} item factors...")
+    start_time = time.perf_counter()
+    index = ANNIndex.build(items)
+    print(f"✅ Built in {time.perf_counter() - start_time:.2f}s "
+          f"({index.n_lists} lists, {index.n_subspaces} subspaces)")
+
+    print(f"{'n_probe':>8}{'recall@' + str(args.k):>12}{'ms/query':>11}{'speedup':>9}")
+    for row in benchmark(index, queries, args.k, exclude=exclude):
+        print(f"{row['n_probe']:>8}{row['recall']:>12.4f}{row['ms_per_query']:>11.3f}{row['speedup']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
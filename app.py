@@ -1,53 +1,72 @@
-from flask import Flask, request, jsonify, render_template
-import pandas as pd
-import numpy as np
-from catboost import CatBoostRegressor
 import os
 import time
 import random
 import json
 import functools
-
-# Import AI Agent components
-from food_ai_agent import get_agent_instance
-from simple_food_db import SimpleFoodRecommendationDB
-
-# Import Enhanced AI Agent with LLM + RAG + ChromaDB
-try:
-    from production_enhanced_agent import get_production_agent_instance
-    ENHANCED_AGENT_AVAILABLE = True
-    print("✅ Production Enhanced AI Agent enabled")
-except ImportError as e:
-    try:
-        from demo_enhanced_agent import get_enhanced_agent_instance as get_production_agent_instance
-        ENHANCED_AGENT_AVAILABLE = True
-        print("✅ Fallback to Demo Enhanced AI Agent")
-    except ImportError as e2:
-        ENHANCED_AGENT_AVAILABLE = False
-        print(f"⚠️ Enhanced AI Agent not available: {e2}")
+from startup_profiler import startup_profiler, lazy_import, module_available, get_memory_breakdown
+
+with startup_profiler.step('import flask', kind='import'):
+    from flask import Flask, request, jsonify, render_template
+with startup_profiler.step('import pandas/numpy', kind='import'):
+    import pandas as pd
+    import numpy as np
+with startup_profiler.step('import data layer', kind='import'):
+    from data_snapshot import read_table
+    from interaction_store import InteractionStore
+    from id_registry import get_id_registry, load_id_registry
+    from recipe_catalog import RecipeCatalog, build_recipe_catalog
+    from popularity_index import PopularityIndex, set_popularity_index
+    from scoring_engine import ScoringEngine, fill_menus
+    from keyword_index import get_keyword_index, get_rule, list_rules, load_rules
+    from sampling import make_rng, shuffled
+
+# Heavy optional subsystems are imported on first use by the routes that need them
+food_ai_agent_module = lazy_import('food_ai_agent')
+simple_food_db_module = lazy_import('simple_food_db')
+catboost_module = lazy_import('catboost')
+
+# Enhanced AI Agent with LLM + RAG + ChromaDB (production agent, demo agent as fallback)
+# Agent module -> instance factory, in order of preference
+ENHANCED_AGENT_FACTORIES = {
+    'production_enhanced_agent': 'get_production_agent_instance',
+    'demo_enhanced_agent': 'get_enhanced_agent_instance'
+}
+ENHANCED_AGENT_MODULES = [name for name in ENHANCED_AGENT_FACTORIES
+                          if module_available(name)]
+ENHANCED_AGENT_AVAILABLE = bool(ENHANCED_AGENT_MODULES)
+if ENHANCED_AGENT_AVAILABLE:
+    print(f"✅ Enhanced AI Agent enabled ({', '.join(ENHANCED_AGENT_MODULES)}, loaded on first use)")
+else:
+    print("⚠️ Enhanced AI Agent not available")
 
 # Import New Customer Registration System
 try:
-    from new_customer_registration import add_new_customer_routes
+    with startup_profiler.step('import new_customer_registration', kind='import'):
+        from new_customer_registration import add_new_customer_routes
     NEW_CUSTOMER_SYSTEM_AVAILABLE = True
     print("✅ New Customer Registration System enabled")
 except ImportError as e:
     NEW_CUSTOMER_SYSTEM_AVAILABLE = False
     print(f"⚠️ New Customer Registration System not available: {e}")
 
-# Import Hybrid Recommendation System
+# Import Hybrid Recommendation System (ML libraries load when the service first trains)
 try:
-    from hybrid_integration import add_hybrid_routes, initialize_hybrid_service
-    HYBRID_SYSTEM_AVAILABLE = True
-    print("✅ Hybrid Recommendation System enabled")
+    with startup_profiler.step('import hybrid_integration', kind='import'):
+        from hybrid_integration import add_hybrid_routes, get_hybrid_service
+    HYBRID_SYSTEM_AVAILABLE = module_available('sklearn')
+    if HYBRID_SYSTEM_AVAILABLE:
+        print("✅ Hybrid Recommendation System enabled")
+    else:
+        print("⚠️ Hybrid Recommendation System not available: scikit-learn missing")
 except ImportError as e:
     HYBRID_SYSTEM_AVAILABLE = False
     print(f"⚠️ Hybrid Recommendation System not available: {e}")
 
 # Import performance monitoring and caching
 try:
-    from performance_monitor import perf_monitor, monitor_performance
-    from cache_manager import cache_manager, clear_cache
+    with startup_profiler.step('import monitoring', kind='import'):
+        from performance_monitor import perf_monitor, monitor_performance
+        from cache_manager import cache_manager, clear_cache
     MONITORING_ENABLED = True
     print("✅ Performance monitoring enabled")
 except ImportError:
@@ -81,42 +100,67 @@ enhanced_agent = None
 def get_ai_agent():
     global ai_agent
     if ai_agent is None:
-        ai_agent = get_agent_instance()
+        ai_agent = food_ai_agent_module.get_agent_instance()
     return ai_agent
 
 
 def get_vector_db():
     global vector_db
     if vector_db is None:
-        vector_db = SimpleFoodRecommendationDB()
+        vector_db = simple_food_db_module.SimpleFoodRecommendationDB()
     return vector_db
 
 
 def get_enhanced_agent():
     """Get Enhanced AI Agent instance"""
-    global enhanced_agent
+    global enhanced_agent, ENHANCED_AGENT_AVAILABLE
     if enhanced_agent is None and ENHANCED_AGENT_AVAILABLE:
-        enhanced_agent = get_production_agent_instance()
+        # find_spec only proves the module exists: its own imports (aiohttp,
+        # openai, chromadb...) can still fail, then the next candidate is tried
+        for module_name in ENHANCED_AGENT_MODULES:
+            try:
+                agent_module = startup_profiler.import_module(
+                    module_name, kind='lazy')
+                enhanced_agent = getattr(
+                    agent_module, ENHANCED_AGENT_FACTORIES[module_name])()
+                break
+            except ImportError as e:
+                print(f"⚠️ Enhanced AI Agent {module_name} not available: {e}")
+        else:
+            # Every candidate failed: use the original agent from now on
+            ENHANCED_AGENT_AVAILABLE = False
     return enhanced_agent
 
 
-# Load the trained model
-try:
-    model = CatBoostRegressor()
-    model.load_model('catboost_best_model.cbm')
-    print("✅ CatBoost model loaded successfully")
-except Exception as e:
-    print(f"Warning: Could not load model: {str(e)}")
-    model = None
+# CatBoost model (not used by the recommendation routes - loaded on demand only)
+model = None
+
+
+def get_catboost_model():
+    """Load the trained CatBoost model on first use"""
+    global model
+    if model is None:
+        try:
+            with startup_profiler.step('load catboost model', kind='lazy'):
+                model = catboost_module.CatBoostRegressor()
+                model.load_model('catboost_best_model.cbm')
+            print("✅ CatBoost model loaded successfully")
+        except Exception as e:
+            print(f"Warning: Could not load model: {str(e)}")
+            model = None
+    return model
+
 
 # Load interaction data (we'll load just what we need for memory efficiency)
 try:
-    interactions_df = pd.read_csv('interactions_enhanced_final.csv')
+    with startup_profiler.step('load interactions'):
+        interactions_df = read_table(
+            'interactions_enhanced_final.csv', refresh=True)
     print(
         f"✅ Loaded enhanced dataset with {len(interactions_df)} interactions")
 except Exception as e:
     try:
-        interactions_df = pd.read_csv('interactions_encoded.csv')
+        interactions_df = read_table('interactions_encoded.csv')
         print(f"⚠️ Fallback to original dataset: {str(e)}")
     except Exception as e2:
         print(f"❌ Could not load any interactions data: {str(e2)}")
@@ -124,7 +168,8 @@ except Exception as e:
 
 # Load customer data for enhanced display
 try:
-    customers_df = pd.read_csv('customers_data.csv')
+    with startup_profiler.step('load customers'):
+        customers_df = read_table('customers_data.csv', refresh=True)
     print(f"✅ Loaded customer data with {len(customers_df)} customers")
 except Exception as e:
     print(f"❌ Could not load customer data: {str(e)}")
@@ -151,9 +196,13 @@ def generate_random_age(age_group):
         return random.randint(25, 35)  # Default fallback
 
 
-# Create helper dictionaries for quick lookups
-user_items = {}
-item_features = {}
+# Compact array-backed interaction store for quick lookups
+interaction_store = InteractionStore()
+recipe_catalog = RecipeCatalog.empty()  # One row per recipe, shared with other modules
+popularity_index = None  # Pre-sorted cold-start leaderboards
+keyword_index = get_keyword_index(interaction_store)  # Compiled keyword filter rules
+scoring_engine = ScoringEngine(interaction_store, keyword_index)  # Vectorized top-k scoring
+shared_arena = None  # Contiguous read-only arrays, set by serve.py before forking workers
 customer_ids = []  # List to store all customer IDs
 customers_info = {}  # Dictionary to store enhanced customer information
 
@@ -161,7 +210,8 @@ customers_info = {}  # Dictionary to store enhanced customer information
 
 
 def preprocess_data():
-    global user_items, item_features, customer_ids, customers_info
+    global interaction_store, recipe_catalog, popularity_index, keyword_index, scoring_engine
+    global customer_ids, customers_info
 
     if interactions_df.empty:
         print("No interaction data available.")
@@ -177,17 +227,46 @@ def preprocess_data():
     try:
         print("Preprocessing data for recommendations...")
 
+        # Stable customer/recipe ids (shared, persisted registry, extended with new keys)
+        id_registry = load_id_registry(interactions_df, customers_df)
+        print(f"Loaded ID registry: {len(id_registry.customers)} customers, "
+              f"{len(id_registry.recipes)} recipes")
+
+        # Group interactions by user and extract item features
+        interaction_store = InteractionStore.from_dataframe(interactions_df)
+        print(
+            f"Built interaction store: {interaction_store.n_customers} users, "
+            f"{interaction_store.n_items} items "
+            f"({interaction_store.memory_usage() / 1024 / 1024:.1f} MB)")
+        # Keyword rules (defaults + keyword_rules.json) compiled against the new store
+        loaded_rules = load_rules()
+        keyword_index = get_keyword_index(interaction_store)
+        scoring_engine = ScoringEngine(interaction_store, keyword_index)
+        print(f"Compiled {keyword_index.stats()['rules']} keyword filter rules"
+              f" ({loaded_rules} from file)")
+
+        # Recipe feature catalog (shared with hybrid service, registration, dietary filter)
+        recipe_catalog = build_recipe_catalog(interactions_df)
+        print(f"Built recipe catalog with {len(recipe_catalog)} recipes")
+
+        # Popularity leaderboards for cold-start users (global + per region/age group)
+        popularity_index = set_popularity_index(
+            PopularityIndex.from_store(interaction_store, customers_df, keyword_index))
+        print(
+            f"Built popularity index with {popularity_index.stats()['leaderboards']} leaderboards")
+
         # Extract unique customer IDs (up to 1300)
-        customer_ids = sorted(interactions_df['customer_id'].unique().tolist())
+        customer_ids = interaction_store.customer_ids.tolist()
         if len(customer_ids) > 1300:
             customer_ids = customer_ids[:1300]
         print(f"Extracted {len(customer_ids)} unique customer IDs")
 
         # Process customer information for enhanced display
         if not customers_df.empty:
+            listed_customers = set(customer_ids)
             for _, customer in customers_df.iterrows():
                 customer_id = customer['customer_id']
-                if customer_id in customer_ids:  # Only process customers that have interactions
+                if customer_id in listed_customers:  # Only process customers that have interactions
                     age = generate_random_age(
                         customer.get('age_group', '25-34'))
                     customers_info[customer_id] = {
@@ -208,33 +287,6 @@ def preprocess_data():
             print(
                 f"Created fallback customer info for {len(customers_info)} customers")
 
-        # Group interactions by user
-        for _, row in interactions_df.iterrows():
-            user_id = row['customer_id']
-            if user_id not in user_items:
-                user_items[user_id] = []
-
-            user_items[user_id].append({
-                'item_index': row['item_index'],
-                'recipe_name': row['recipe_name'],
-                'rating': row['rating'],
-                'interaction_type': row['interaction_type'],
-                'difficulty': row['difficulty'],
-                'meal_time': row['meal_time']
-            })
-
-        # Extract item features for recommendations
-        for _, row in interactions_df.iterrows():
-            item_index = row['item_index']
-            if item_index not in item_features:
-                item_features[item_index] = {
-                    'recipe_name': row['recipe_name'],
-                    'recipe_url': row['recipe_url'],
-                    'difficulty': row['difficulty'],
-                    'meal_time': row['meal_time'],
-                    'content_score': row['content_score'],
-                    'cf_score': row['cf_score']
-                }
         print("Data preprocessing complete!")
 
     except Exception as e:
@@ -249,7 +301,7 @@ def preprocess_data():
 
 
 # Initialize the app data at startup
-with app.app_context():
+with app.app_context(), startup_profiler.step('preprocess data'):
     preprocess_data()
 
 # Route for the web interface
@@ -434,6 +486,94 @@ def hybrid_demo():
                                latest_customers=[],
                                hybrid_available=False)
 
+# Demo algorithm -> HybridRecommendationService method
+HYBRID_DEMO_METHODS = {
+    'all': 'hybrid',
+    'ensemble': 'hybrid',
+    'collaborative': 'collaborative',
+    'content': 'content',
+    'matrix_factorization': 'matrix_factorization',
+    'deep_learning': 'deep_learning',
+    'implicit_feedback': 'implicit_feedback'
+}
+
+HYBRID_DEMO_EXPLANATIONS = {
+    'collaborative': 'Dựa trên người dùng có sở thích tương tự',
+    'content': 'Dựa trên đặc điểm món ăn bạn đã thích',
+    'matrix_factorization': 'Phân tích ma trận tương tác người dùng-món ăn',
+    'deep_learning': 'Mạng nơ-ron học từ lịch sử tương tác',
+    'implicit_feedback': 'Dựa trên mức độ tương tác (xem, lưu, nấu)',
+    'hybrid': 'Kết hợp nhiều thuật toán để tối ưu kết quả'
+}
+
+
+def hybrid_demo_recommendations(service, customer_id, algorithm_type):
+    """
+    Demo response from the shared hybrid service (one scoring pass)
+
+    Args:
+        service: Initialized HybridRecommendationService
+        customer_id: Customer ID
+        algorithm_type: Demo algorithm ('all', 'ensemble' or a single method)
+
+    Returns:
+        Response dictionary, or None when the service has no recommendations
+        (unknown algorithm, unknown customer) and the demo should fall back
+    """
+    method = HYBRID_DEMO_METHODS.get(algorithm_type)
+    if method is None:
+        return None
+
+    result = service.get_recommendations(
+        customer_id, n_recommendations=8 if method == 'hybrid' else 6, method=method)
+    if not result['success'] or not result['recommendations']:
+        return None
+
+    # Only surprise SVD predicts ratings; other scores are shown on a 1-5 scale
+    # relative to the top recommendation (the raw score is kept in 'score')
+    top_score = max(result['recommendations'][0]['score'], 1e-9)
+
+    recommendations = []
+    methods_used = set()
+    for rec in result['recommendations']:
+        features = rec['features'] or {}
+        method_scores = {name: float(score)
+                         for name, score in features.get('method_scores', {}).items()}
+        methods_used.update(method_scores or [method])
+        if rec['method'] == 'matrix_factorization_svd':
+            predicted_rating = float(features['predicted_rating'])
+        else:
+            predicted_rating = round(1.0 + 4.0 * max(rec['score'], 0.0) / top_score, 2)
+        recommendations.append({
+            'recipe_name': rec['recipe_name'],
+            'predicted_rating': predicted_rating,
+            'score': rec['score'],
+            'confidence': rec['confidence'],
+            'explanation': HYBRID_DEMO_EXPLANATIONS.get(method, rec['method']),
+            'method_scores': method_scores or None,
+            'recipe_url': rec.get('recipe_url') or f"#recipe_{rec['recipe_name'].replace(' ', '_')}",
+            'difficulty': rec.get('difficulty'),
+            'meal_time': rec.get('meal_time')
+        })
+
+    system = service.system
+    return {
+        'success': True,
+        'customer_id': customer_id,
+        'algorithm_type': algorithm_type,
+        'method': method,
+        'recommendations': recommendations,
+        'algorithm_details': {
+            'methods_used': sorted(methods_used),
+            'ensemble_weights': system.ensemble_weights if method == 'hybrid' else {method: 1.0},
+            'processing_time': round(result['metadata']['recommendation_time'] * 1000, 2),
+            'from_cache': result.get('from_cache', False),
+            'generation_id': result.get('generation_id')
+        },
+        'demo_mode': False
+    }
+
+
 # API endpoint for Hybrid Demo recommendations
 
 
@@ -448,96 +588,29 @@ def hybrid_demo_api():
         timestamp = data.get('timestamp', None)
         randomize = data.get('randomize', True)
 
-        # Use timestamp to seed random for consistent but varied results
-        if timestamp and randomize:
-            random.seed(timestamp)
+        # Per-request generator: the timestamp gives consistent but varied results
+        rng = make_rng(timestamp if timestamp and randomize else None)
 
         if not customer_id:
             return jsonify({'success': False, 'error': 'Missing customer_id'})
 
-        # Import hybrid service
+        # Shared, pre-warmed hybrid service: a click is one scoring pass
+        hybrid_status = None
         if HYBRID_SYSTEM_AVAILABLE:
-            try:
-                from hybrid_integration import HybridRecommendationService
-
-                # Initialize service
-                service = HybridRecommendationService()
-
-                # Check if system is trained
-                if not service.initialize_system('interactions_enhanced_final.csv'):
-                    return jsonify({
-                        'success': False,
-                        'error': 'Hybrid system not initialized',
-                        'fallback_message': 'Using fallback recommendations'
-                    })
-
-                # Get recommendations based on algorithm type
+            service = get_hybrid_service()
+            if service.ensure_initialized(wait=False):
                 try:
-                    if algorithm_type == 'all':
-                        # Get all algorithm results for comparison
-                        recommendations = service.get_recommendations(
-                            customer_id,
-                            n_recommendations=8,
-                            include_explanations=True
-                        )
-
-                        if recommendations and hasattr(recommendations, 'success') and recommendations.success:
-                            return jsonify({
-                                'success': True,
-                                'customer_id': customer_id,
-                                'algorithm_type': 'Hybrid (All Methods)',
-                                'recommendations': [
-                                    {
-                                        'recipe_name': rec.recipe_name,
-                                        'predicted_rating': float(rec.predicted_rating),
-                                        'confidence': float(rec.confidence),
-                                        'explanation': rec.explanation,
-                                        'method_scores': getattr(rec, 'method_scores', {}),
-                                        'recipe_url': f"#recipe_{rec.recipe_name.replace(' ', '_')}"
-                                    }
-                                    for rec in recommendations.recommendations
-                                ],
-                                'algorithm_details': {
-                                    'methods_used': getattr(recommendations, 'methods_used', []),
-                                    'ensemble_weights': getattr(recommendations, 'ensemble_weights', {}),
-                                    'processing_time': getattr(recommendations, 'processing_time_ms', 0)
-                                }
-                            })
-                    else:
-                        # Get specific algorithm recommendations (simplified for demo)
-                        recommendations = service.get_recommendations(
-                            customer_id,
-                            n_recommendations=6,
-                            method_filter=algorithm_type
-                        )
-
-                        if recommendations and hasattr(recommendations, 'success') and recommendations.success:
-                            return jsonify({
-                                'success': True,
-                                'customer_id': customer_id,
-                                'algorithm_type': algorithm_type,
-                                'recommendations': [
-                                    {
-                                        'recipe_name': rec.recipe_name,
-                                        'predicted_rating': float(rec.predicted_rating),
-                                        'confidence': float(rec.confidence),
-                                        'explanation': rec.explanation
-                                    }
-                                    for rec in recommendations.recommendations
-                                ]
-                            })
-
+                    result = hybrid_demo_recommendations(
+                        service, customer_id, algorithm_type)
+                    if result:
+                        return jsonify(result)
                 except Exception as e:
                     print(f"Hybrid recommendation error: {e}")
-                    # Fallback to regular recommendations
-                    pass
-            except ImportError as e:
-                print(f"Could not import hybrid service: {e}")
-                pass
+            hybrid_status = service.readiness()
 
         # Fallback recommendations using existing system
         fallback_recs = get_recommendations(
-            customer_id, count=8, randomize=True)
+            customer_id, count=8, randomize=True, rng=rng)
 
         # Add algorithm simulation for demo purposes
         algorithm_explanations = {
@@ -555,17 +628,17 @@ def hybrid_demo_api():
             variation = 0.3  # ±30% variation
 
             method_scores = {
-                'collaborative_filtering': max(0.1, min(0.95, base_scores[0] + random.uniform(-variation, variation))),
-                'content_based': max(0.1, min(0.95, base_scores[1] + random.uniform(-variation, variation))),
-                'matrix_factorization': max(0.1, min(0.95, base_scores[2] + random.uniform(-variation, variation))),
-                'deep_learning': max(0.1, min(0.95, base_scores[3] + random.uniform(-variation, variation)))
+                'collaborative_filtering': max(0.1, min(0.95, base_scores[0] + rng.uniform(-variation, variation))),
+                'content_based': max(0.1, min(0.95, base_scores[1] + rng.uniform(-variation, variation))),
+                'matrix_factorization': max(0.1, min(0.95, base_scores[2] + rng.uniform(-variation, variation))),
+                'deep_learning': max(0.1, min(0.95, base_scores[3] + rng.uniform(-variation, variation)))
             }
 
             # Add some randomness to confidence as well
             # Decrease confidence for lower ranked items
             confidence_base = 0.8 - (i * 0.05)
             confidence = max(
-                0.5, min(0.95, confidence_base + random.uniform(-0.15, 0.15)))
+                0.5, min(0.95, confidence_base + rng.uniform(-0.15, 0.15)))
 
             formatted_recs.append({
                 'recipe_name': rec['recipe_name'],
@@ -586,9 +659,10 @@ def hybrid_demo_api():
             'algorithm_details': {
                 'methods_used': ['collaborative_filtering', 'content_based', 'matrix_factorization'],
                 'ensemble_weights': {'collaborative': 0.4, 'content': 0.3, 'matrix': 0.3},
-                'processing_time': random.randint(100, 500)
+                'processing_time': int(rng.integers(100, 501))
             },
-            'demo_mode': True
+            'demo_mode': True,
+            'hybrid_status': hybrid_status
         })
 
     except Exception as e:
@@ -610,88 +684,77 @@ def demo_new_user():
 # Helper function to get recommendations
 
 
-def get_popular_recommendations(feature_type=None, count=5):
+def get_popular_recommendations(feature_type=None, count=5, region=None, age_group=None):
     """Get popular/trending recommendations for new users (cold start solution)"""
     try:
-        # Get top-rated recipes from all interactions
-        recipe_ratings = {}
-        for user_interactions in user_items.values():
-            for interaction in user_interactions:
-                recipe_name = interaction['recipe_name']
-                rating = interaction.get('rating', 3.5)
-
-                if recipe_name not in recipe_ratings:
-                    recipe_ratings[recipe_name] = []
-                recipe_ratings[recipe_name].append(rating)
-
-        # Calculate average ratings and interaction counts
-        popular_recipes = []
-        for recipe_name, ratings in recipe_ratings.items():
-            avg_rating = sum(ratings) / len(ratings)
-            interaction_count = len(ratings)
-            popularity_score = avg_rating * (1 + interaction_count * 0.1)
-
-            # Find recipe details from item_features
-            recipe_item = None
-            for item_index, features in item_features.items():
-                if features['recipe_name'] == recipe_name:
-                    recipe_item = {
-                        'item_index': item_index,
-                        'recipe_name': recipe_name,
-                        'recipe_url': features['recipe_url'],
-                        'difficulty': features['difficulty'],
-                        'meal_time': features['meal_time'],
-                        'predicted_rating': popularity_score,
-                        'avg_rating': avg_rating,
-                        'interaction_count': interaction_count
-                    }
-                    break
+        if popularity_index is None:
+            return []
 
-            if recipe_item:
-                popular_recipes.append(recipe_item)
-
-        # Sort by popularity score
-        popular_recipes.sort(key=lambda x: x['predicted_rating'], reverse=True)
-
-        # Filter by feature type if specified
-        if feature_type == 'breakfast':
-            breakfast_keywords = ['sáng', 'điểm tâm', 'breakfast']
-            popular_recipes = [
-                r for r in popular_recipes if r.get('meal_time') == 'breakfast' or
-                any(keyword in r['recipe_name'].lower()
-                    for keyword in breakfast_keywords)
-            ]
-        elif feature_type == 'lunch':
-            lunch_keywords = ['trưa', 'lunch']
-            popular_recipes = [
-                r for r in popular_recipes if r.get('meal_time') == 'lunch' or
-                any(keyword in r['recipe_name'].lower()
-                    for keyword in lunch_keywords)
-            ]
-        elif feature_type == 'dinner':
-            dinner_keywords = ['tối', 'chiều', 'dinner']
-            popular_recipes = [
-                r for r in popular_recipes if r.get('meal_time') == 'dinner' or
-                any(keyword in r['recipe_name'].lower()
-                    for keyword in dinner_keywords)
-            ]
-        elif feature_type == 'easy':
-            popular_recipes = [
-                r for r in popular_recipes if r['difficulty'] == 'Dễ']
-
-        return popular_recipes[:count]
+        # Slice of a pre-sorted leaderboard (segment first, then global)
+        return popularity_index.top(feature_type, count, region=region, age_group=age_group)
 
     except Exception as e:
         print(f"Error getting popular recommendations: {e}")
         return []
 
 
-def get_recommendations(user_id, feature_type=None, count=5, randomize=False):
+# Accepted rating values (as in the interactions data)
+MIN_RATING, MAX_RATING = 1.0, 5.0
+
+
+def is_known_customer(customer_id):
+    """Customer with interactions or registered through /api/register-customer"""
+    if interaction_store.has_customer(customer_id) or customer_id in get_id_registry().customers:
+        return True
+    if popularity_index is not None and popularity_index.segment_of(customer_id):
+        return True
+
+    # Registered by another worker since startup: check the registration store
+    try:
+        registered = read_table('customers_data.csv', columns=['customer_id'])
+        return bool((registered['customer_id'] == customer_id).any())
+    except Exception:
+        return False
+
+
+@app.route('/api/record_interaction', methods=['POST'])
+def record_interaction_api():
+    """Count a new rating in the cold-start popularity leaderboards"""
+    data = request.get_json(silent=True) or {}
+    customer_id = data.get('customer_id')
+    recipe_name = data.get('recipe_name')
+    try:
+        rating = float(data.get('rating'))
+    except (TypeError, ValueError):
+        rating = None
+
+    if not isinstance(customer_id, str) or not isinstance(recipe_name, str) \
+            or not customer_id or not recipe_name or rating is None:
+        return jsonify({'success': False,
+                        'error': 'customer_id, recipe_name and a numeric rating are required'}), 400
+    if not np.isfinite(rating) or not MIN_RATING <= rating <= MAX_RATING:
+        return jsonify({'success': False,
+                        'error': f'rating must be between {MIN_RATING:g} and {MAX_RATING:g}'}), 400
+    if not is_known_customer(customer_id):
+        return jsonify({'success': False, 'error': f'Unknown customer: {customer_id}'}), 400
+    if popularity_index is None:
+        return jsonify({'success': False, 'error': 'Popularity index not available'}), 503
+
+    # Updates the global leaderboard and the customer's region/age_group segments
+    if not popularity_index.record_interaction(customer_id, recipe_name, rating):
+        return jsonify({'success': False, 'error': f'Unknown recipe: {recipe_name}'}), 404
+    return jsonify({'success': True, 'customer_id': customer_id, 'recipe_name': recipe_name,
+                    'segment': popularity_index.segment_of(customer_id)})
+
+
+def get_recommendations(user_id, feature_type=None, count=5, randomize=False, rng=None):
     # Cold start solution: If user is new, return popular recommendations
-    if user_id not in user_items:
+    if not interaction_store.has_customer(user_id):
         print(
             f"New user detected ({user_id}), returning popular recommendations")
-        popular_recs = get_popular_recommendations(feature_type, count)
+        segment = popularity_index.segment_of(user_id) if popularity_index else {}
+        popular_recs = get_popular_recommendations(
+            feature_type, count, region=segment.get('region'), age_group=segment.get('age_group'))
 
         # Add new user indicator to each recommendation
         for rec in popular_recs:
@@ -700,90 +763,32 @@ def get_recommendations(user_id, feature_type=None, count=5, randomize=False):
 
         # Randomize popular recommendations if requested
         if randomize:
-            random.shuffle(popular_recs)
+            popular_recs = [popular_recs[i] for i in shuffled(len(popular_recs), rng)]
 
         return popular_recs
 
-    # Get user's historical interactions
-    user_history = user_items[user_id]
+    # Dense scores + seen/feature masks + top-k, dicts only for returned items
+    return scoring_engine.recommend(user_id, feature_type, count, randomize, rng)
 
-    # Make predictions for items not interacted with
-    all_items = list(item_features.keys())
-    interacted_items = [item['item_index'] for item in user_history]
-    candidate_items = [
-        item for item in all_items if item not in interacted_items]
 
-    recommendations = []
-    for item_index in candidate_items:
-        # Use precomputed scores instead of model prediction to avoid errors
-        cf_score = item_features[item_index].get('cf_score', 0)
-        content_score = item_features[item_index].get('content_score', 0)
-        prediction = cf_score + content_score
+def get_slot_recommendations(user_id, slots, count=5):
+    """Top recommendations for several feature types (e.g. meal slots) at once"""
+    if not interaction_store.has_customer(user_id):
+        # Cold start: every slot is a slice of a precomputed leaderboard
+        return {slot: get_recommendations(user_id, feature_type=slot, count=count)
+                for slot in slots}
 
-        # Add small random factor for variation if randomize is True
-        if randomize:
-            random_factor = random.uniform(0.95, 1.05)  # Small variation ±5%
-            prediction *= random_factor
+    return scoring_engine.recommend_slots(user_id, slots, count)
 
-        recommendations.append({
-            'item_index': item_index,
-            'recipe_name': item_features[item_index]['recipe_name'],
-            'recipe_url': item_features[item_index]['recipe_url'],
-            'difficulty': item_features[item_index]['difficulty'],
-            'meal_time': item_features[item_index]['meal_time'],
-            'predicted_rating': float(prediction)
-        })
 
-    # Sort by predicted rating
-    recommendations.sort(key=lambda x: x['predicted_rating'], reverse=True)
-
-    # If randomizing, take more recommendations and shuffle them for variety
-    if randomize:
-        # Take top recommendations but add some randomness
-        # Take 3x more candidates
-        top_count = min(count * 3, len(recommendations))
-        top_recommendations = recommendations[:top_count]
-
-        # Weighted random selection: higher rated items more likely to be selected
-        selected_recommendations = []
-        remaining_recs = top_recommendations.copy()
-
-        for _ in range(min(count * 2, len(remaining_recs))):  # Select 2x desired count
-            # Create weights based on position (earlier = higher weight)
-            weights = [1.0 / (i + 1) for i in range(len(remaining_recs))]
-            selected_rec = random.choices(remaining_recs, weights=weights)[0]
-            selected_recommendations.append(selected_rec)
-            remaining_recs.remove(selected_rec)
-
-        recommendations = selected_recommendations
-
-    # Filter by feature type if specified
-    if feature_type == 'breakfast':
-        breakfast_keywords = ['sáng', 'điểm tâm']
-        recommendations = [
-            r for r in recommendations if r.get('meal_time') == 'breakfast' or
-            any(keyword in r['recipe_name'].lower()
-                for keyword in breakfast_keywords)
-        ]
-    elif feature_type == 'lunch':
-        lunch_keywords = ['trưa']
-        recommendations = [
-            r for r in recommendations if r.get('meal_time') == 'lunch' or
-            any(keyword in r['recipe_name'].lower()
-                for keyword in lunch_keywords)
-        ]
-    elif feature_type == 'dinner':
-        dinner_keywords = ['tối', 'chiều']
-        recommendations = [
-            r for r in recommendations if r.get('meal_time') == 'dinner' or
-            any(keyword in r['recipe_name'].lower()
-                for keyword in dinner_keywords)
-        ]
-    elif feature_type == 'easy':
-        recommendations = [
-            r for r in recommendations if r['difficulty'] == 'Dễ']
+def get_meal_menus(user_id, slots, n_menus=6):
+    """Fill n_menus menus (one dish per slot) without repeating a recipe"""
+    if not interaction_store.has_customer(user_id):
+        ranked = {slot: get_recommendations(user_id, feature_type=slot, count=n_menus * len(slots))
+                  for slot in slots}
+        return fill_menus(ranked, n_menus, lambda rec: rec['recipe_name'])
 
-    return recommendations[:count]
+    return scoring_engine.recommend_menus(user_id, slots, n_menus)
 
 # API endpoint for upsell combos
 
@@ -798,7 +803,7 @@ def upsell_combos():
 
     try:
         # Check if user is new
-        is_new_user = user_id not in user_items
+        is_new_user = not interaction_store.has_customer(user_id)
 
         # Get complementary items that go well with the current item
         recommendations = get_recommendations(user_id, count=3)
@@ -947,61 +952,25 @@ def age_based_recommendations():
             # Default to adults if no age info and no age_group provided
             age_group = 'adults'
 
-        # Validate age_group
-        if age_group not in ['children', 'teenagers', 'adults', 'elderly']:
+        # Validate age_group (registered 'age:<group>' rules are accepted too)
+        if not keyword_index.has_rule(f'age:{age_group}'):
             age_group = 'adults'  # Default fallback
 
-        # Enhanced age-based filtering with real customer data
-        age_filtered_recommendations = []
-
-        if age_group == 'children':
-            # For children (3-12): Easy, nutritious, colorful dishes
-            children_keywords = ['trứng', 'cháo',
-                                 'soup', 'canh', 'bánh', 'sữa', 'rau củ']
-            age_filtered_recommendations = [
-                r for r in recommendations
-                if r['difficulty'] == 'Dễ' or
-                any(keyword in r['recipe_name'].lower()
-                    for keyword in children_keywords)
-            ]
+        # Enhanced age-based filtering: precompiled rule mask over the candidates
+        matched = keyword_index.matches(f'age:{age_group}', recommendations)
+        age_filtered_recommendations = [
+            r for r, is_match in zip(recommendations, matched) if is_match]
 
-        elif age_group == 'teenagers':
-            # For teenagers (13-19): Energy-rich, trendy, quick meals
-            teen_keywords = ['nướng', 'chiên', 'pizza',
-                             'burger', 'mì', 'bánh mì', 'snack', 'fast']
-            age_filtered_recommendations = [
-                r for r in recommendations
-                if any(keyword in r['recipe_name'].lower() for keyword in teen_keywords) or
-                r['meal_time'] in ['lunch', 'dinner']
-            ]
+        if age_group == 'teenagers':
             # If not enough matches, include general recommendations
             if len(age_filtered_recommendations) < 5:
                 age_filtered_recommendations.extend(recommendations[:10])
 
         elif age_group == 'adults':
-            # For adults (20-59): Balanced, varied, professional meals
-            adult_keywords = ['salad', 'gỏi', 'nướng',
-                              'xào', 'hầm', 'curry', 'thịt', 'cá', 'tôm']
-            age_filtered_recommendations = [
-                r for r in recommendations
-                if any(keyword in r['recipe_name'].lower() for keyword in adult_keywords) or
-                r['difficulty'] in ['Trung bình', 'Khó']
-            ]
             # Include all if no specific matches
             if len(age_filtered_recommendations) < 5:
                 age_filtered_recommendations = recommendations
 
-        else:  # elderly (60+)
-            # For elderly: Easy to digest, nutritious, soft foods
-            elderly_keywords = ['canh', 'soup', 'cháo',
-                                'hầm', 'luộc', 'hấp', 'rau', 'cá']
-            age_filtered_recommendations = [
-                r for r in recommendations
-                if r['difficulty'] in ['Dễ', 'Trung bình'] and
-                (any(keyword in r['recipe_name'].lower() for keyword in elderly_keywords) or
-                 r['meal_time'] in ['breakfast', 'lunch'])
-            ]
-
         # Remove duplicates and sort by rating
         unique_recommendations = []
         seen_recipes = set()
@@ -1017,37 +986,17 @@ def age_based_recommendations():
         # Format response with enhanced information
         result = []
         for rec in unique_recommendations[:8]:  # Return top 8 recommendations
-            recipe_info = {
+            result.append({
                 "recipe_name": rec['recipe_name'],
                 "recipe_url": rec['recipe_url'],
                 "difficulty": rec['difficulty'],
                 "meal_time": rec['meal_time'],
                 "predicted_rating": rec['predicted_rating'],
                 "item_index": rec['item_index']
-            }
+            })
 
-            # Add enhanced data from interactions_df if available
-            try:
-                recipe_data = interactions_df[interactions_df['recipe_name'] == rec['recipe_name']].iloc[0] if len(
-                    interactions_df[interactions_df['recipe_name'] == rec['recipe_name']]) > 0 else None
-
-                if recipe_data is not None:
-                    if 'estimated_calories' in recipe_data:
-                        recipe_info['estimated_calories'] = int(
-                            recipe_data['estimated_calories'])
-                    if 'preparation_time_minutes' in recipe_data:
-                        recipe_info['preparation_time_minutes'] = int(
-                            recipe_data['preparation_time_minutes'])
-                    if 'ingredient_count' in recipe_data:
-                        recipe_info['ingredient_count'] = int(
-                            recipe_data['ingredient_count'])
-                    if 'estimated_price_vnd' in recipe_data:
-                        recipe_info['estimated_price_vnd'] = int(
-                            recipe_data['estimated_price_vnd'])
-            except:
-                pass  # Skip if enhanced data not available
-
-            result.append(recipe_info)
+        # Add enhanced data (calories, prep time, price...) from the recipe catalog
+        recipe_catalog.enrich(result)
 
         return jsonify({
             "age_group": age_group,
@@ -1139,6 +1088,9 @@ def meal_recommendations():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Upper bound of the 'menus' parameter of /api/meal_plans
+MAX_MEAL_PLAN_MENUS = 20
+
 # API endpoint to get all meal plans (6 menus with breakfast, lunch, dinner each)
 
 
@@ -1150,23 +1102,25 @@ def meal_plans():
         return jsonify({"error": "Missing user_id parameter"}), 400
 
     try:
-        # Get recommendations for each meal type (user_id is already a string)
-        breakfast_recs = get_recommendations(
-            user_id, feature_type='breakfast', count=6)
-        lunch_recs = get_recommendations(
-            user_id, feature_type='lunch', count=6)
-        dinner_recs = get_recommendations(
-            user_id, feature_type='dinner', count=6)
-
-        # Create 6 meal plans
+        meal_slots = ['breakfast', 'lunch', 'dinner']
+        # Clamped to 1..MAX_MEAL_PLAN_MENUS (non-numeric values use the default)
+        n_menus = min(max(request.args.get('menus', 6, type=int), 1), MAX_MEAL_PLAN_MENUS)
+        unique_recipes = request.args.get('unique', 'false').lower() == 'true'
+
+        if unique_recipes:
+            # N menus without repeating a recipe across the whole plan
+            menus = get_meal_menus(user_id, meal_slots, n_menus)
+        else:
+            # All slots scored in a single pass (user_id is already a string)
+            slot_recs = get_slot_recommendations(user_id, meal_slots, count=n_menus)
+            menus = [{slot: slot_recs[slot][i] if i < len(slot_recs[slot]) else None
+                      for slot in meal_slots}
+                     for i in range(n_menus)]
+
         meal_plans = []
-        for i in range(6):
-            meal_plan = {
-                "menu_number": i + 1,
-                "breakfast": breakfast_recs[i] if i < len(breakfast_recs) else None,
-                "lunch": lunch_recs[i] if i < len(lunch_recs) else None,
-                "dinner": dinner_recs[i] if i < len(dinner_recs) else None
-            }
+        for i, menu in enumerate(menus):
+            meal_plan = {"menu_number": i + 1}
+            meal_plan.update(menu)
             meal_plans.append(meal_plan)
 
         return jsonify({
@@ -1189,7 +1143,7 @@ def nutrition_recommendations():
     if not user_id:
         return jsonify({"error": "Missing user_id parameter"}), 400
 
-    if nutrition_type not in ['weight-loss', 'balanced', 'blood-boost', 'brain-boost', 'digestive-support']:
+    if nutrition_type != 'balanced' and not keyword_index.has_rule(f'nutrition:{nutrition_type}'):
         return jsonify({"error": "Invalid nutrition_type"}), 400
 
     try:
@@ -1199,76 +1153,35 @@ def nutrition_recommendations():
         nutrition_filtered_recommendations = []
 
         # Check if we have the nutrition_category column
-        has_nutrition_category = 'nutrition_category' in interactions_df.columns
+        has_nutrition_category = recipe_catalog.has_column('nutrition_category')
 
         if has_nutrition_category:
             # Use the nutrition_category column for better filtering
-            target_recipes = interactions_df[interactions_df['nutrition_category']
-                                             == nutrition_type]['recipe_name'].unique()
+            target_mask = recipe_catalog.column(
+                'nutrition_category') == nutrition_type
+            recipe_rows = recipe_catalog.rows_of(
+                r['recipe_name'] for r in recommendations)
             nutrition_filtered_recommendations = [
-                r for r in recommendations
-                if r['recipe_name'] in target_recipes
+                r for r, row in zip(recommendations, recipe_rows)
+                if row >= 0 and target_mask[row]
             ]
 
+        nutrition_rule = get_rule(f'nutrition:{nutrition_type}')
+        if nutrition_type == 'balanced':
+            nutrition_focus = "Cân bằng dinh dưỡng, đầy đủ chất, phù hợp mọi lứa tuổi"
+        else:
+            nutrition_focus = nutrition_rule.description or "Dinh dưỡng cân bằng"
+
         # Fallback to keyword-based filtering if no nutrition_category or no matches
         if not nutrition_filtered_recommendations:
-            if nutrition_type == 'weight-loss':
-                # Keywords for weight loss dishes
-                weight_loss_keywords = [
-                    'salad', 'gỏi', 'canh', 'soup', 'luộc', 'hấp', 'nướng', 'thịt nạc', 'rau', 'cá']
-                nutrition_filtered_recommendations = [
-                    r for r in recommendations
-                    if any(keyword in r['recipe_name'].lower() for keyword in weight_loss_keywords)
-                    or r['difficulty'] == 'Dễ'
-                ]
-                nutrition_focus = "Giảm cân, ít chất béo, nhiều chất xơ, protein nạc"
-
-            elif nutrition_type == 'balanced':
+            if nutrition_type == 'balanced':
                 # Balanced nutrition - mix of all meal types
                 nutrition_filtered_recommendations = recommendations
-                nutrition_focus = "Cân bằng dinh dưỡng, đầy đủ chất, phù hợp mọi lứa tuổi"
-
-            elif nutrition_type == 'blood-boost':
-                # Blood boosting foods
-                blood_boost_keywords = [
-                    'thịt đỏ', 'gan', 'rau dền', 'rau chân vịt', 'đậu', 'trứng', 'cà chua']
-                nutrition_filtered_recommendations = [
-                    r for r in recommendations
-                    if any(keyword in r['recipe_name'].lower() for keyword in blood_boost_keywords)
-                ]
-                nutrition_focus = "Bổ máu, tăng cường sắt, vitamin B12, axit folic"
-
-            elif nutrition_type == 'brain-boost':
-                # Brain boosting foods
-                brain_boost_keywords = [
-                    'cá', 'hạt', 'trứng', 'bơ', 'chocolate', 'óc chó', 'cà phê']
-                nutrition_filtered_recommendations = [
-                    r for r in recommendations
-                    if any(keyword in r['recipe_name'].lower() for keyword in brain_boost_keywords)
-                ]
-                nutrition_focus = "Tăng cường trí não, omega-3, vitamin E, choline"
-
-            elif nutrition_type == 'digestive-support':
-                # Digestive support foods
-                digestive_keywords = ['cháo', 'soup', 'canh',
-                                      'yogurt', 'gừng', 'nghệ', 'yến mạch']
+            else:
+                # Precompiled keyword rule mask over the candidates
+                matched = keyword_index.matches(f'nutrition:{nutrition_type}', recommendations)
                 nutrition_filtered_recommendations = [
-                    r for r in recommendations
-                    if any(keyword in r['recipe_name'].lower() for keyword in digestive_keywords)
-                    or r['difficulty'] == 'Dễ'
-                ]
-                nutrition_focus = "Hỗ trợ tiêu hóa, dễ hấp thụ, kháng viêm"
-        else:
-            # Set nutrition focus based on type when using category column
-            nutrition_focus_map = {
-                'weight-loss': "Giảm cân, ít chất béo, nhiều chất xơ, protein nạc",
-                'balanced': "Cân bằng dinh dưỡng, đầy đủ chất, phù hợp mọi lứa tuổi",
-                'blood-boost': "Bổ máu, tăng cường sắt, vitamin B12, axit folic",
-                'brain-boost': "Tăng cường trí não, omega-3, vitamin E, choline",
-                'digestive-support': "Hỗ trợ tiêu hóa, dễ hấp thụ, kháng viêm"
-            }
-            nutrition_focus = nutrition_focus_map.get(
-                nutrition_type, "Dinh dưỡng cân bằng")
+                    r for r, is_match in zip(recommendations, matched) if is_match]
 
         # If no specific matches found, return top recommendations
         if not nutrition_filtered_recommendations:
@@ -1276,35 +1189,17 @@ def nutrition_recommendations():
             nutrition_filtered_recommendations = recommendations[:count]
         result = []
         for rec in nutrition_filtered_recommendations[:count]:
-            # Get additional info from enhanced dataset if available
-            recipe_data = interactions_df[interactions_df['recipe_name'] == rec['recipe_name']].iloc[0] if len(
-                interactions_df[interactions_df['recipe_name'] == rec['recipe_name']]) > 0 else None
-
-            recipe_info = {
+            result.append({
                 "recipe_name": rec['recipe_name'],
                 "recipe_url": rec['recipe_url'],
                 "difficulty": rec['difficulty'],
                 "meal_time": rec['meal_time'],
                 "predicted_rating": rec['predicted_rating'],
                 "item_index": rec['item_index']
-            }
+            })
 
-            # Add enhanced data if available
-            if recipe_data is not None:
-                if 'estimated_calories' in recipe_data:
-                    recipe_info['estimated_calories'] = int(
-                        recipe_data['estimated_calories'])
-                if 'preparation_time_minutes' in recipe_data:
-                    recipe_info['preparation_time_minutes'] = int(
-                        recipe_data['preparation_time_minutes'])
-                if 'ingredient_count' in recipe_data:
-                    recipe_info['ingredient_count'] = int(
-                        recipe_data['ingredient_count'])
-                if 'estimated_price_vnd' in recipe_data:
-                    recipe_info['estimated_price_vnd'] = int(
-                        recipe_data['estimated_price_vnd'])
-
-            result.append(recipe_info)
+        # Add enhanced data from the recipe catalog if available
+        recipe_catalog.enrich(result)
 
         return jsonify({
             "nutrition_type": nutrition_type,
@@ -1330,8 +1225,8 @@ def user_info():
 
     try:
         # Check if user exists in the system
-        is_new_user = user_id not in user_items
-        interaction_count = len(user_items.get(user_id, []))
+        is_new_user = not interaction_store.has_customer(user_id)
+        interaction_count = interaction_store.interaction_count(user_id)
 
         # Get user profile information
         user_profile = customers_info.get(user_id, {
@@ -1345,26 +1240,11 @@ def user_info():
         avg_rating = 0
 
         if not is_new_user:
-            user_interactions = user_items[user_id]
-
-            # Calculate average rating
-            ratings = [item.get('rating', 3.5) for item in user_interactions]
-            avg_rating = sum(ratings) / len(ratings) if ratings else 0
-
-            # Get meal time preferences
-            meal_times = [item.get('meal_time', 'Unknown')
-                          for item in user_interactions]
-            from collections import Counter
-            meal_time_counts = Counter(meal_times)
-            favorite_meal_times = [meal for meal,
-                                   count in meal_time_counts.most_common(3)]
-
-            # Get difficulty preferences
-            difficulties = [item.get('difficulty', 'Unknown')
-                            for item in user_interactions]
-            difficulty_counts = Counter(difficulties)
-            top_categories = [diff for diff,
-                              count in difficulty_counts.most_common(3)]
+            # Average rating, meal time and difficulty preferences
+            history = interaction_store.user_profile(user_id)
+            avg_rating = history['avg_rating']
+            favorite_meal_times = history['favorite_meal_times']
+            top_categories = history['top_difficulties']
 
         # Generate personalized message for new users
         welcome_message = ""
@@ -1701,6 +1581,60 @@ def system_info():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+
+@app.route('/api/system/startup', methods=['GET'])
+def startup_report():
+    """Get the startup timeline (per import and init step, ms and MB)"""
+    return jsonify({
+        "success": True,
+        "startup": startup_profiler.report(),
+        "deferred_modules": {
+            "food_ai_agent": food_ai_agent_module.is_loaded,
+            "simple_food_db": simple_food_db_module.is_loaded,
+            "catboost": catboost_module.is_loaded
+        }
+    })
+
+
+@app.route('/api/system/filter_rules', methods=['GET'])
+def filter_rules():
+    """List the keyword filter rules and how many items each one matches"""
+    return jsonify({
+        "success": True,
+        "rules": list_rules(),
+        "index": keyword_index.stats()
+    })
+
+
+@app.route('/api/system/ids', methods=['GET'])
+def id_registry_report():
+    """Size of the customer/recipe ID registry, optionally resolving ?customer_id= / ?recipe_name="""
+    # Shared registry (also extended by registration, training and the SQLite loaders)
+    id_registry = get_id_registry()
+    lookups = {}
+    customer_id = request.args.get('customer_id')
+    recipe_name = request.args.get('recipe_name')
+    if customer_id:
+        lookups['customer_id'] = id_registry.customers.encode(customer_id)
+    if recipe_name:
+        lookups['recipe_name'] = id_registry.recipes.encode(recipe_name)
+    return jsonify({
+        "success": True,
+        "registry": id_registry.stats(),
+        "ids": lookups
+    })
+
+
+@app.route('/api/system/memory', methods=['GET'])
+def memory_report():
+    """Memory of this worker split into shared and private pages (MB)"""
+    memory = get_memory_breakdown()
+    memory.update({
+        "pid": os.getpid(),
+        "shared_arena_mb": round(shared_arena.nbytes / 1024 / 1024, 2) if shared_arena is not None else None
+    })
+    return jsonify({"success": True, "memory": memory})
+
 # API endpoint for chat interface (simplified)
 
 
@@ -2417,8 +2351,15 @@ def process_ultra_input_analysis(message):
 
 
 # Initialize additional systems
-def initialize_additional_systems():
-    """Initialize additional systems like new customer registration and hybrid recommendations"""
+def initialize_additional_systems(warm_hybrid=True):
+    """
+    Initialize additional systems like new customer registration and hybrid recommendations
+
+    Args:
+        warm_hybrid: Load the hybrid model in the background right away
+                     (off for the reloader's monitor process, which never serves,
+                     and for a pre-fork master, whose workers warm up themselves)
+    """
     print("🔧 Initializing additional systems...")
 
     # Initialize New Customer Registration System
@@ -2432,21 +2373,34 @@ def initialize_additional_systems():
     # Initialize Hybrid Recommendation System
     if HYBRID_SYSTEM_AVAILABLE:
         try:
+            # One process-wide service shared by /api/hybrid/* and /api/hybrid-demo,
+            # loaded in the background so startup is not blocked
             add_hybrid_routes(app)
-            # Initialize hybrid service in background
-            initialize_hybrid_service()
+            if warm_hybrid:
+                get_hybrid_service().start_warmup()
             print("✅ Hybrid Recommendation System routes added")
         except Exception as e:
             print(f"⚠️ Error adding hybrid routes: {e}")
 
 
+def finish_startup():
+    """Close the boot timeline and print it when STARTUP_PROFILE is set"""
+    startup_profiler.mark_boot_complete()
+    if os.getenv('STARTUP_PROFILE'):
+        startup_profiler.emit()
+
+
 # Main execution
 if __name__ == '__main__':
     print("🚀 Starting AI Food Recommendation System with Ultra Analysis...")
     print("=" * 60)
 
     # Initialize additional systems
-    initialize_additional_systems()
+    with startup_profiler.step('initialize additional systems'):
+        # With the debug reloader only the serving child (WERKZEUG_RUN_MAIN) warms up
+        initialize_additional_systems(
+            warm_hybrid=os.environ.get('WERKZEUG_RUN_MAIN') == 'true')
+    finish_startup()
 
     print("\nAvailable interfaces:")
     print("- Main App: http://127.0.0.1:5000/")
@@ -2465,3 +2419,5 @@ if __name__ == '__main__':
     print("=" * 60)
 
     app.run(debug=True, host='0.0.0.0', port=5000)
+else:
+    finish_startup()
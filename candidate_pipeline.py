@@ -0,0 +1,292 @@
+"""
+🪜 TWO-STAGE CANDIDATE PIPELINE
+===============================
+
+Hybrid recommendations in two stages instead of running every method over
+the whole catalog:
+
+1. Candidate generation - cheap generators propose a few hundred recipes
+   the customer has not rated yet:
+       popularity          most-rated recipes (precomputed order)
+       user_neighbors      recipes rated by the most similar customers
+       item_neighbors      CF neighbors of the customer's recipes
+       content_neighbors   content neighbors of the customer's recipes
+2. Rerank - only the candidates are scored by the ensemble methods
+   (collaborative, content, MF, neural CF, implicit ALS) and fused like
+   HybridRecommendationSystem.get_hybrid_recommendations(): every method
+   contributes its top 2n candidates, weighted by ensemble_weights.
+
+The model stage costs O(candidates) instead of O(catalog). When the
+candidates cover every unrated recipe (small catalogs) the result is the
+same as the full ensemble.
+
+Candidate counts come from config['candidate_counts']; every stage is
+timed in the report returned by pipeline.recommend() (nothing is kept on the
+pipeline, which is shared by concurrent requests).
+
+Usage:
+    pipeline = CandidatePipeline(system)
+    result = pipeline.recommend(customer_encoded, 10)
+    result['recipe_codes'], result['timings_ms']
+
+Author: AI Assistant
+Date: June 19, 2025
+"""
+
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+from scoring_engine import top_k
+
+# Candidates per generator (config 'candidate_counts' overrides single entries)
+DEFAULT_CANDIDATE_COUNTS = {
+    'popularity': 100,
+    'user_neighbors': 100,
+    'item_neighbors': 100,
+    'content_neighbors': 100
+}
+
+# Similar customers behind the collaborative scores (as in _collaborative_scores)
+CF_NEIGHBORS = 20
+
+# Per-recipe feature added to the fused result by each method
+METHOD_FEATURES = {
+    'collaborative': lambda score: {'similarity_based': True},
+    'content_based': lambda score: {'content_similarity': score},
+    'matrix_factorization': lambda score: {'predicted_rating': score},
+    'deep_learning': lambda score: {'neural_prediction': score},
+    'implicit_feedback': lambda score: {'preference_score': score}
+}
+
+
+def _aggregate(items: np.ndarray, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Sum of the weights per distinct item (sorted items), without a catalog-sized buffer"""
+    unique, inverse = np.unique(items, return_inverse=True)
+    return unique, np.bincount(inverse, weights=weights, minlength=len(unique))
+
+
+class CandidatePipeline:
+    """Candidate generation + rerank over a trained HybridRecommendationSystem"""
+
+    def __init__(self, system, candidate_counts: Optional[Dict[str, int]] = None):
+        self.system = system
+        self.count_overrides = candidate_counts or {}
+
+        # Recipes by number of ratings, most rated first (ties: lower recipe code)
+        matrix = self.user_item_matrix = system.user_item_matrix
+        counts = np.bincount(matrix.indices, minlength=matrix.shape[1])
+        self.popularity_order = np.argsort(-counts, kind='stable')
+
+        self.generators: Dict[str, Callable[[int, np.ndarray, int], np.ndarray]] = {
+            'popularity': self._popular_candidates,
+            'user_neighbors': self._user_neighbor_candidates,
+            'item_neighbors': self._item_neighbor_candidates,
+            'content_neighbors': self._content_neighbor_candidates
+        }
+        self.scorers: Dict[str, Callable[[int, np.ndarray, np.ndarray], Optional[np.ndarray]]] = {
+            'collaborative': self._collaborative_scores,
+            'content_based': self._content_scores,
+            'matrix_factorization': self._matrix_factorization_scores,
+            'deep_learning': self._deep_learning_scores,
+            'implicit_feedback': self._implicit_scores
+        }
+
+    @property
+    def candidate_counts(self) -> Dict[str, int]:
+        """Candidates per generator: defaults < config 'candidate_counts' < constructor"""
+        return {**DEFAULT_CANDIDATE_COUNTS,
+                **(self.system.config.get('candidate_counts') or {}),
+                **self.count_overrides}
+
+    def _seen(self, customer_encoded: int) -> np.ndarray:
+        matrix = self.system.user_item_matrix
+        return np.sort(matrix.indices[matrix.indptr[customer_encoded]:matrix.indptr[customer_encoded + 1]])
+
+    # ------------------------------------------------------------------
+    # Stage 1: candidate generators (unrated recipes only)
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _top_unseen(items: np.ndarray, scores: np.ndarray, seen: np.ndarray, count: int) -> np.ndarray:
+        eligible = ~np.isin(items, seen, assume_unique=True) & (scores > 0)
+        return items[top_k(scores, count, eligible)]
+
+    def _popular_candidates(self, customer_encoded: int, seen: np.ndarray, count: int) -> np.ndarray:
+        head = self.popularity_order[:count + len(seen)]
+        return head[~np.isin(head, seen)][:count]
+
+    def _user_neighbor_candidates(self, customer_encoded: int, seen: np.ndarray, count: int) -> np.ndarray:
+        table = self.system.models.get('user_neighbors')
+        if table is None:
+            return np.zeros(0, dtype=np.int64)
+        neighbors, similarities = table.neighbors(
+            customer_encoded, CF_NEIGHBORS, self.system.config['similarity_threshold'])
+        rows = self.system.user_item_matrix[neighbors]
+        items, scores = _aggregate(rows.indices, rows.data * np.repeat(similarities, np.diff(rows.indptr)))
+        return self._top_unseen(items, scores, seen, count)
+
+    def _neighbor_table_candidates(self, table_name: str, seen: np.ndarray, count: int) -> np.ndarray:
+        table = self.system.models.get(table_name)
+        if table is None or len(seen) == 0:
+            return np.zeros(0, dtype=np.int64)
+        indices = np.asarray(table.indices[seen]).ravel()
+        scores = np.asarray(table.scores[seen], dtype=np.float64).ravel()
+        keep = indices >= 0
+        items, scores = _aggregate(indices[keep], scores[keep])
+        return self._top_unseen(items, scores, seen, count)
+
+    def _item_neighbor_candidates(self, customer_encoded: int, seen: np.ndarray, count: int) -> np.ndarray:
+        return self._neighbor_table_candidates('item_neighbors', seen, count)
+
+    def _content_neighbor_candidates(self, customer_encoded: int, seen: np.ndarray, count: int) -> np.ndarray:
+        return self._neighbor_table_candidates('content_neighbors', seen, count)
+
+    # ------------------------------------------------------------------
+    # Stage 2: method scores over the candidates (-inf = not proposed)
+    # ------------------------------------------------------------------
+    def _collaborative_scores(self, customer_encoded: int, candidates: np.ndarray,
+                              seen: np.ndarray) -> Optional[np.ndarray]:
+        table = self.system.models.get('user_neighbors')
+        if table is None:
+            return None
+        neighbors, similarities = table.neighbors(
+            customer_encoded, CF_NEIGHBORS, self.system.config['similarity_threshold'])
+        # Neighbor rows in row order, so the sums match R^T w of the full path
+        order = np.argsort(neighbors)
+        rows = self.system.user_item_matrix[neighbors[order]][:, candidates]
+        scores = rows.T @ similarities[order].astype(np.float64)
+        scores[scores <= 0] = -np.inf
+        return scores
+
+    def _content_scores(self, customer_encoded: int, candidates: np.ndarray,
+                        seen: np.ndarray) -> Optional[np.ndarray]:
+        if len(seen) == 0:
+            return None
+        content_features = self.system.content_features
+        user_profile = np.asarray(content_features[seen].mean(axis=0))
+        scores = cosine_similarity(user_profile, content_features[candidates])[0]
+        scores[~(scores > self.system.config['similarity_threshold'])] = -np.inf
+        return scores
+
+    def _matrix_factorization_scores(self, customer_encoded: int, candidates: np.ndarray,
+                                     seen: np.ndarray) -> Optional[np.ndarray]:
+        factors = self.system._factor_model()
+        if factors is None:
+            return None
+        return factors.scores(np.array([customer_encoded]), candidates)[0].astype(np.float64)
+
+    def _deep_learning_scores(self, customer_encoded: int, candidates: np.ndarray,
+                              seen: np.ndarray) -> Optional[np.ndarray]:
+        engine = self.system._neural_engine()
+        if engine is None:
+            return None
+        return engine.scores(np.array([customer_encoded]), candidates)[0].astype(np.float64)
+
+    def _implicit_scores(self, customer_encoded: int, candidates: np.ndarray,
+                         seen: np.ndarray) -> Optional[np.ndarray]:
+        factors = self.system.models.get('implicit_als')
+        if factors is None:
+            return None
+        return factors.scores(np.array([customer_encoded]), candidates)[0].astype(np.float64)
+
+    # ------------------------------------------------------------------
+    # Pipeline
+    # ------------------------------------------------------------------
+    def generate(self, customer_encoded: int) -> Tuple[np.ndarray, Dict[str, int], Dict[str, float]]:
+        """
+        Stage 1: union of every generator's candidates
+
+        Returns:
+            (sorted candidate recipe codes, candidates per generator, timings in ms)
+        """
+        seen = self._seen(customer_encoded)
+        proposals, sources, timings = [], {}, {}
+        candidate_counts = self.candidate_counts
+        for name, generator in self.generators.items():
+            count = candidate_counts.get(name, 0)
+            if count <= 0:
+                continue
+            start_time = time.perf_counter()
+            items = generator(customer_encoded, seen, count)
+            timings[f'generate.{name}'] = (time.perf_counter() - start_time) * 1000
+            proposals.append(np.asarray(items, dtype=np.int64))
+            sources[name] = len(items)
+
+        candidates = np.unique(np.concatenate(proposals)) if proposals else np.zeros(0, dtype=np.int64)
+        return candidates, sources, timings
+
+    def recommend(self, customer_encoded: int, n_recommendations: int = 10) -> Dict[str, Any]:
+        """
+        Generate candidates, score them with every ensemble method and fuse
+
+        Args:
+            customer_encoded: Encoded customer id
+            n_recommendations: Recommendations to return
+
+        Returns:
+            Dictionary with 'recipe_codes', 'scores' (fused), 'num_methods',
+            'method_scores' (method -> weighted score, NaN = not proposed),
+            'features' (one dict per recipe), 'n_candidates',
+            'candidate_sources' and 'timings_ms'
+        """
+        pipeline_start = time.perf_counter()
+        system = self.system
+        candidates, sources, timings = self.generate(customer_encoded)
+        seen = self._seen(customer_encoded)
+
+        methods = list(system.ensemble_weights.keys())
+        n_per_method = n_recommendations * 2
+        total = np.zeros(len(candidates))
+        proposed_by = np.zeros(len(candidates), dtype=np.int64)
+        first_seen = np.full(len(candidates), np.iinfo(np.int64).max)
+        method_scores, raw_scores = {}, {}
+
+        for method_position, method in enumerate(methods):
+            scorer = self.scorers.get(method)
+            if scorer is None or len(candidates) == 0:
+                continue
+            start_time = time.perf_counter()
+            scores = scorer(customer_encoded, candidates, seen)
+            timings[f'score.{method}'] = (time.perf_counter() - start_time) * 1000
+            if scores is None:
+                continue
+
+            # Top 2n of the method, ties by lower recipe code (candidates are sorted)
+            top = top_k(scores, n_per_method, np.isfinite(scores))
+            weighted = scores[top] * system.ensemble_weights[method]
+            total[top] += weighted
+            proposed_by[top] += 1
+            first_seen[top] = np.minimum(first_seen[top], method_position * n_per_method + np.arange(len(top)))
+            method_scores[method] = (top, weighted)
+            raw_scores[method] = (top, scores[top])
+
+        # Fuse: score, then order of first proposal (method order, then rank)
+        start_time = time.perf_counter()
+        proposed = np.flatnonzero(proposed_by > 0)
+        best = proposed[np.lexsort((first_seen[proposed], -total[proposed]))][:n_recommendations]
+
+        position_of = {position: rank for rank, position in enumerate(best)}
+        fused_method_scores = {method: np.full(len(best), np.nan) for method in method_scores}
+        features = [{} for _ in best]
+        for method in method_scores:
+            top, weighted = method_scores[method]
+            for position, weighted_score, raw_score in zip(top, weighted, raw_scores[method][1]):
+                rank = position_of.get(position)
+                if rank is not None:
+                    fused_method_scores[method][rank] = weighted_score
+                    features[rank].update(METHOD_FEATURES[method](float(raw_score)))
+        timings['fuse'] = (time.perf_counter() - start_time) * 1000
+        timings['total'] = (time.perf_counter() - pipeline_start) * 1000
+
+        return {
+            'recipe_codes': candidates[best],
+            'scores': total[best],
+            'num_methods': proposed_by[best],
+            'method_scores': fused_method_scores,
+            'features': features,
+            'n_candidates': len(candidates),
+            'candidate_sources': sources,
+            'timings_ms': {stage: round(ms, 3) for stage, ms in timings.items()}
+        }
@@ -0,0 +1,335 @@
+"""
+🗄️ COLUMNAR DATA SNAPSHOTS
+==========================
+
+Binary, memory-mappable snapshots of the interaction and customer CSV files.
+
+Each CSV is converted into a versioned snapshot directory:
+- manifest.json: format version, source file stamp, column schema
+- one .npy file per numeric column (native dtype)
+- string columns are dictionary-encoded: an int32 codes array plus a
+  fixed-width unicode dictionary array (-1 marks a missing value)
+
+Loaders call read_table(), which returns the snapshot when the CSV still has
+the size and mtime recorded in its manifest and falls back to
+pandas.read_csv otherwise.
+
+Usage:
+    python data_snapshot.py                      # snapshot the default CSVs
+    python data_snapshot.py my_interactions.csv  # snapshot specific files
+
+Author: AI Assistant
+Date: June 19, 2025
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+SNAPSHOT_FORMAT = 'columnar-snapshot'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_ROOT = 'snapshots'
+MANIFEST_FILE = 'manifest.json'
+
+DEFAULT_SOURCES = ['interactions_enhanced_final.csv', 'customers_data.csv']
+
+
+def get_snapshot_dir(csv_path: str, snapshot_root: Optional[str] = None) -> str:
+    """Return the snapshot directory used for a CSV file"""
+    csv_dir = os.path.dirname(os.path.abspath(csv_path))
+    root = snapshot_root or os.path.join(csv_dir, SNAPSHOT_ROOT)
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(root, stem)
+
+
+def _read_manifest(snapshot_dir: str) -> Optional[Dict]:
+    manifest_path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def source_stamp(csv_path: str) -> Optional[Dict]:
+    """Size and mtime of a CSV file (None if it does not exist)"""
+    try:
+        stat = os.stat(csv_path)
+    except OSError:
+        return None
+    return {'source_size': stat.st_size, 'source_mtime': stat.st_mtime}
+
+
+def snapshot_is_fresh(csv_path: str, snapshot_dir: Optional[str] = None) -> bool:
+    """Check whether a usable snapshot exists and was built from the current CSV"""
+    snapshot_dir = snapshot_dir or get_snapshot_dir(csv_path)
+    manifest = _read_manifest(snapshot_dir)
+
+    if not manifest:
+        return False
+    if manifest.get('format') != SNAPSHOT_FORMAT or manifest.get('version') != SNAPSHOT_VERSION:
+        return False
+    stamp = source_stamp(csv_path)
+    if stamp is None:
+        # Snapshot-only deployment: the snapshot is the source of truth
+        return True
+
+    # Any rewrite of the CSV (including a restore with an older mtime) changes the stamp
+    return all(manifest.get(key) == value for key, value in stamp.items())
+
+
+def build_snapshot_from_frame(df: pd.DataFrame, csv_path: str,
+                              snapshot_dir: Optional[str] = None,
+                              stamp: Optional[Dict] = None) -> str:
+    """
+    Write a snapshot for an already loaded DataFrame
+
+    Args:
+        df: DataFrame read from csv_path
+        csv_path: Source CSV (used for naming and the freshness stamp)
+        snapshot_dir: Optional explicit output directory
+        stamp: source_stamp() taken before df was read (default: taken now);
+               a CSV rewritten after that point then no longer matches
+
+    Returns:
+        Path of the snapshot directory
+    """
+    snapshot_dir = snapshot_dir or get_snapshot_dir(csv_path)
+    parent_dir = os.path.dirname(snapshot_dir)
+    os.makedirs(parent_dir, exist_ok=True)
+
+    # Write into a temporary directory first so readers never see a partial snapshot
+    tmp_dir = tempfile.mkdtemp(prefix='.tmp_snapshot_', dir=parent_dir)
+
+    try:
+        columns = []
+        for position, name in enumerate(df.columns):
+            series = df[name]
+            base_name = f"c{position:03d}"
+
+            if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+                values = series.to_numpy()
+                np.save(os.path.join(tmp_dir, f"{base_name}.npy"), values)
+                columns.append({
+                    'name': str(name),
+                    'kind': 'numeric',
+                    'dtype': values.dtype.str,
+                    'file': f"{base_name}.npy"
+                })
+            else:
+                codes, uniques = pd.factorize(series)
+                dictionary = np.asarray([str(value) for value in uniques], dtype=str)
+                if dictionary.size == 0:
+                    dictionary = np.zeros(0, dtype='<U1')
+
+                np.save(os.path.join(tmp_dir, f"{base_name}.codes.npy"),
+                        codes.astype(np.int32))
+                np.save(os.path.join(tmp_dir, f"{base_name}.dict.npy"), dictionary)
+                columns.append({
+                    'name': str(name),
+                    'kind': 'string',
+                    'dtype': 'dictionary',
+                    'file': f"{base_name}.codes.npy",
+                    'dictionary': f"{base_name}.dict.npy",
+                    'cardinality': int(dictionary.size)
+                })
+
+        stamp = stamp if stamp is not None else source_stamp(csv_path)
+        manifest = {
+            'format': SNAPSHOT_FORMAT,
+            'version': SNAPSHOT_VERSION,
+            'source': os.path.basename(csv_path),
+            'source_size': stamp['source_size'] if stamp else None,
+            'source_mtime': stamp['source_mtime'] if stamp else None,
+            'created_at': datetime.now().isoformat(),
+            'n_rows': int(len(df)),
+            'columns': columns
+        }
+
+        # Manifest is written last: its presence marks a complete snapshot
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        # Swap the new snapshot into place
+        if os.path.exists(snapshot_dir):
+            stale_dir = f"{tmp_dir}.old"
+            os.rename(snapshot_dir, stale_dir)
+            os.rename(tmp_dir, snapshot_dir)
+            shutil.rmtree(stale_dir, ignore_errors=True)
+        else:
+            os.rename(tmp_dir, snapshot_dir)
+
+    except OSError:
+        # Another process published the snapshot concurrently - keep theirs
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if not _read_manifest(snapshot_dir):
+            raise
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    return snapshot_dir
+
+
+def build_snapshot(csv_path: str, snapshot_dir: Optional[str] = None) -> str:
+    """Read a CSV file and write its columnar snapshot"""
+    start_time = time.time()
+    stamp = source_stamp(csv_path)
+    df = pd.read_csv(csv_path)
+    snapshot_dir = build_snapshot_from_frame(df, csv_path, snapshot_dir, stamp)
+    print(f"✅ Snapshot {snapshot_dir} ({len(df)} rows) built in "
+          f"{(time.time() - start_time) * 1000:.0f} ms")
+    return snapshot_dir
+
+
+class ColumnarSnapshot:
+    """
+    Read-only view over a snapshot directory
+
+    Column arrays are memory-mapped, so opening a snapshot costs one small
+    JSON read regardless of the number of rows.
+    """
+
+    def __init__(self, snapshot_dir: str, mmap: bool = True):
+        manifest = _read_manifest(snapshot_dir)
+        if not manifest:
+            raise FileNotFoundError(f"No snapshot found in {snapshot_dir}")
+        if manifest.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(
+                f"Unsupported snapshot version {manifest.get('version')} in {snapshot_dir}")
+
+        self.snapshot_dir = snapshot_dir
+        self.manifest = manifest
+        self.n_rows = manifest['n_rows']
+        self._mmap_mode = 'r' if mmap else None
+        self._schema = {column['name']: column for column in manifest['columns']}
+        self._arrays = {}
+
+    @property
+    def columns(self) -> List[str]:
+        return [column['name'] for column in self.manifest['columns']]
+
+    def _load(self, filename: str) -> np.ndarray:
+        if filename not in self._arrays:
+            self._arrays[filename] = np.load(
+                os.path.join(self.snapshot_dir, filename), mmap_mode=self._mmap_mode)
+        return self._arrays[filename]
+
+    def is_string(self, name: str) -> bool:
+        return self._schema[name]['kind'] == 'string'
+
+    def codes(self, name: str) -> np.ndarray:
+        """Dictionary codes of a string column (-1 = missing)"""
+        column = self._schema[name]
+        if column['kind'] != 'string':
+            raise TypeError(f"Column {name} is not dictionary-encoded")
+        return self._load(column['file'])
+
+    def dictionary(self, name: str) -> np.ndarray:
+        """Dictionary (unique values) of a string column"""
+        column = self._schema[name]
+        if column['kind'] != 'string':
+            raise TypeError(f"Column {name} is not dictionary-encoded")
+        return self._load(column['dictionary'])
+
+    def values(self, name: str) -> np.ndarray:
+        """Raw values of a numeric column"""
+        column = self._schema[name]
+        if column['kind'] != 'numeric':
+            raise TypeError(f"Column {name} is dictionary-encoded, use column()")
+        return self._load(column['file'])
+
+    def column(self, name: str) -> np.ndarray:
+        """Decoded column values (strings become Python objects, NaN when missing)"""
+        if not self.is_string(name):
+            return np.asarray(self.values(name))
+
+        codes = np.asarray(self.codes(name))
+        dictionary = np.asarray(self.dictionary(name)).astype(object)
+        decoded = np.empty(len(codes), dtype=object)
+        present = codes >= 0
+        decoded[present] = dictionary[codes[present]]
+        decoded[~present] = np.nan
+        return decoded
+
+    def to_dataframe(self, columns: Optional[List[str]] = None,
+                     categorical: bool = False) -> pd.DataFrame:
+        """
+        Materialize the snapshot as a DataFrame
+
+        Args:
+            columns: Optional subset of columns to load
+            categorical: Keep string columns as pandas Categoricals instead of objects
+        """
+        data = {}
+        for name in columns or self.columns:
+            if categorical and self.is_string(name):
+                data[name] = pd.Categorical.from_codes(
+                    np.asarray(self.codes(name)),
+                    categories=np.asarray(self.dictionary(name)))
+            else:
+                data[name] = self.column(name)
+        return pd.DataFrame(data, columns=columns or self.columns)
+
+
+def open_snapshot(csv_path: str, snapshot_dir: Optional[str] = None,
+                  mmap: bool = True) -> Optional[ColumnarSnapshot]:
+    """Open the snapshot of a CSV if it is fresh, else return None"""
+    snapshot_dir = snapshot_dir or get_snapshot_dir(csv_path)
+    if not snapshot_is_fresh(csv_path, snapshot_dir):
+        return None
+    try:
+        return ColumnarSnapshot(snapshot_dir, mmap=mmap)
+    except (OSError, ValueError):
+        return None
+
+
+def read_table(csv_path: str, refresh: bool = False, columns: Optional[List[str]] = None,
+               snapshot_dir: Optional[str] = None) -> pd.DataFrame:
+    """
+    Load a CSV table, preferring its columnar snapshot
+
+    Args:
+        csv_path: Path to the CSV file
+        refresh: Rebuild the snapshot when it is missing or stale
+        columns: Optional subset of columns to load
+        snapshot_dir: Optional explicit snapshot directory
+
+    Returns:
+        DataFrame with the same columns and values as pd.read_csv(csv_path)
+    """
+    snapshot = open_snapshot(csv_path, snapshot_dir)
+    if snapshot is not None:
+        return snapshot.to_dataframe(columns=columns)
+
+    stamp = source_stamp(csv_path)
+    df = pd.read_csv(csv_path)
+
+    if refresh:
+        try:
+            build_snapshot_from_frame(df, csv_path, snapshot_dir, stamp)
+        except Exception as e:
+            print(f"⚠️ Could not write snapshot for {csv_path}: {e}")
+
+    return df[columns] if columns else df
+
+
+if __name__ == "__main__":
+    sources = sys.argv[1:] or DEFAULT_SOURCES
+
+    print("🗄️ Building columnar snapshots...")
+    for source in sources:
+        if not os.path.exists(source):
+            print(f"⚠️ Skipping missing file: {source}")
+            continue
+        build_snapshot(source)
@@ -0,0 +1,267 @@
+"""
+📊 OFFLINE EVALUATION ENGINE
+============================
+
+Offline evaluation of HybridRecommendationSystem on a held-out split:
+
+1. split the interactions into train/test rows
+2. train a fresh system on the train rows only
+3. score every test customer with get_hybrid_recommendations_batch()
+4. compute all metrics with array operations
+
+Metrics:
+- rmse / mae            rating prediction of the MF serving arrays on test pairs
+- precision@k, recall@k relevant = test ratings >= relevance_threshold
+- ndcg@k                binary gains
+- coverage              share of trained recipes recommended to anyone
+- diversity             mean pairwise distance of the scaled recipe
+                        features within a recommendation list
+
+Customer chunks are scored in parallel worker processes (fork, the trained
+system is inherited copy-on-write) when there are more customers than fit
+in one chunk.
+
+Usage:
+    engine = EvaluationEngine(interactions_df, config)
+    metrics = engine.run(k=10)
+
+Author: AI Assistant
+Date: June 19, 2025
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.model_selection import train_test_split
+
+from hybrid_recommendation_system import HybridRecommendationSystem
+
+DEFAULT_RELEVANCE_THRESHOLD = 4.0
+DEFAULT_CHUNK_SIZE = 2048
+
+# State shared with forked workers (set in the parent right before forking)
+_worker_state: Dict[str, Any] = {}
+
+
+def ranking_metrics(recommended: np.ndarray, relevant: sp.csr_matrix, k: int) -> Dict[str, np.ndarray]:
+    """
+    Per-customer precision@k, recall@k and NDCG@k
+
+    Args:
+        recommended: int (U, >=k) recipe codes, best first, -1 = empty slot
+        relevant: (U, n_recipes) CSR matrix, non-zero = relevant recipe
+        k: Cut-off
+
+    Returns:
+        Dictionary of float64 arrays of length U (NaN for customers without
+        relevant recipes)
+    """
+    recommended = recommended[:, :k]
+    n_users = recommended.shape[0]
+    valid = recommended >= 0
+
+    # Relevance of every recommended slot, gathered from the CSR rows
+    lookup = relevant[np.repeat(np.arange(n_users), k), np.where(valid, recommended, 0).ravel()]
+    hits = (np.asarray(lookup).reshape(n_users, k) > 0) & valid
+    n_relevant = np.diff(relevant.indptr).astype(np.float64)
+
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    dcg = (hits * discounts).sum(axis=1)
+    idcg = np.cumsum(discounts)[np.minimum(n_relevant, k).astype(np.int64) - 1]
+
+    has_relevant = n_relevant > 0
+    n_hits = hits.sum(axis=1).astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'precision': np.where(has_relevant, n_hits / k, np.nan),
+            'recall': np.where(has_relevant, n_hits / n_relevant, np.nan),
+            'ndcg': np.where(has_relevant, dcg / idcg, np.nan)
+        }
+
+
+def intra_list_diversity(recommended: np.ndarray, item_features: np.ndarray) -> np.ndarray:
+    """
+    Mean pairwise Euclidean distance within every recommendation list
+
+    Args:
+        recommended: int (U, k) recipe codes, -1 = empty slot
+        item_features: (n_recipes, d) feature rows
+
+    Returns:
+        float64 array of length U (NaN for lists with fewer than 2 recipes)
+    """
+    valid = recommended >= 0
+    features = item_features[np.where(valid, recommended, 0)]
+    distances = np.linalg.norm(features[:, :, None, :] - features[:, None, :, :], axis=-1)
+
+    k = recommended.shape[1]
+    pairs = valid[:, :, None] & valid[:, None, :] & np.triu(np.ones((k, k), dtype=bool), 1)
+    n_pairs = pairs.sum(axis=(1, 2))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(n_pairs > 0, (distances * pairs).sum(axis=(1, 2)) / n_pairs, np.nan)
+
+
+def _evaluate_chunk(bounds) -> Dict[str, Any]:
+    """Score one chunk of test customers (runs in a worker or in-process)"""
+    start, stop = bounds
+    system: HybridRecommendationSystem = _worker_state['system']
+    customer_ids: List[str] = _worker_state['customer_ids'][start:stop]
+    relevant: sp.csr_matrix = _worker_state['relevant'][start:stop]
+    k: int = _worker_state['k']
+
+    batch = system.get_hybrid_recommendations_batch(customer_ids, k)
+    recommended = batch['recipe_codes']
+
+    ranking = ranking_metrics(recommended, relevant, k)
+    diversity = intra_list_diversity(recommended, system.recipe_features)
+
+    # Rating prediction for this chunk's test pairs
+    pairs = _worker_state['pairs']
+    in_chunk = (pairs['user_row'] >= start) & (pairs['user_row'] < stop)
+    errors = np.zeros(0)
+    if in_chunk.any():
+        codes = np.array([system._encoded('customer', customer_id) for customer_id in customer_ids],
+                         dtype=np.int64)
+        predictions = system._matrix_factorization_scores_batch(codes)
+        if predictions is not None:
+            rows = pairs['user_row'][in_chunk] - start
+            errors = predictions[rows, pairs['recipe_code'][in_chunk]] - pairs['rating'][in_chunk]
+            errors = errors[np.isfinite(errors)]
+
+    return {
+        'precision': np.nansum(ranking['precision']),
+        'recall': np.nansum(ranking['recall']),
+        'ndcg': np.nansum(ranking['ndcg']),
+        'ranked_customers': int(np.sum(~np.isnan(ranking['precision']))),
+        'diversity': np.nansum(diversity),
+        'diverse_lists': int(np.sum(~np.isnan(diversity))),
+        'squared_error': float(np.sum(errors ** 2)),
+        'absolute_error': float(np.sum(np.abs(errors))),
+        'rated_pairs': len(errors),
+        'recommended_recipes': np.unique(recommended[recommended >= 0])
+    }
+
+
+class EvaluationEngine:
+    """Train/test evaluation of the hybrid recommender with batched scoring"""
+
+    def __init__(self, interactions_df: pd.DataFrame, config: Optional[Dict] = None,
+                 test_size: float = 0.2, n_jobs: Optional[int] = None):
+        self.interactions_df = interactions_df
+        self.config = dict(config) if config else None
+        self.test_size = test_size
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.system: Optional[HybridRecommendationSystem] = None
+        self.test_df: Optional[pd.DataFrame] = None
+
+    def train(self) -> HybridRecommendationSystem:
+        """Split the interactions and train a fresh system on the train rows"""
+        random_state = (self.config or {}).get('random_state', 42)
+        train_df, self.test_df = train_test_split(
+            self.interactions_df, test_size=self.test_size, random_state=random_state)
+
+        system = HybridRecommendationSystem(self.config)
+        system.load_interactions(train_df)
+        system.train_all_models()
+        self.system = system
+        return system
+
+    def _test_arrays(self, relevance_threshold: float) -> Dict[str, Any]:
+        """Test customers, relevance matrix and rating pairs in encoded space"""
+        system = self.system
+        test = self.test_df
+        customer_ids = sorted(customer_id for customer_id in set(test['customer_id'])
+                              if customer_id in system.id_registry.customers)
+        user_rows = {customer_id: row for row, customer_id in enumerate(customer_ids)}
+
+        # Test pairs the trained model can address
+        rows = test['customer_id'].map(user_rows)
+        recipe_codes = test['recipe_name'].map(
+            lambda name: system._encoded('recipe', name))
+        known = rows.notna() & recipe_codes.notna()
+        pairs = {
+            'user_row': rows[known].astype(np.int64).values,
+            'recipe_code': recipe_codes[known].astype(np.int64).values,
+            'rating': test.loc[known, 'rating'].fillna(3.0).astype(np.float64).values
+        }
+
+        is_relevant = pairs['rating'] >= relevance_threshold
+        relevant = sp.csr_matrix(
+            (np.ones(int(is_relevant.sum())),
+             (pairs['user_row'][is_relevant], pairs['recipe_code'][is_relevant])),
+            shape=(len(customer_ids), len(system.encoders['recipe'].classes_)))
+        relevant.sum_duplicates()
+
+        return {'customer_ids': customer_ids, 'relevant': relevant, 'pairs': pairs}
+
+    def run(self, k: int = 10, relevance_threshold: float = DEFAULT_RELEVANCE_THRESHOLD,
+            chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, float]:
+        """
+        Train (if needed) and evaluate
+
+        Args:
+            k: Recommendation list length for the ranking metrics
+            relevance_threshold: Minimum test rating counted as relevant
+            chunk_size: Customers per scoring chunk (one chunk per worker task)
+
+        Returns:
+            Dictionary of metrics
+        """
+        start_time = time.time()
+        if self.system is None:
+            self.train()
+
+        arrays = self._test_arrays(relevance_threshold)
+        n_customers = len(arrays['customer_ids'])
+        chunk_size = max(1, min(chunk_size, -(-n_customers // self.n_jobs)))
+        chunks = [(start, min(start + chunk_size, n_customers))
+                  for start in range(0, n_customers, chunk_size)]
+
+        _worker_state.update(system=self.system, k=k, **arrays)
+        try:
+            n_workers = min(self.n_jobs, len(chunks))
+            if n_workers > 1 and 'fork' in multiprocessing.get_all_start_methods():
+                with ProcessPoolExecutor(n_workers, mp_context=multiprocessing.get_context('fork')) as pool:
+                    partials = list(pool.map(_evaluate_chunk, chunks))
+            else:
+                n_workers = 1
+                partials = [_evaluate_chunk(chunk) for chunk in chunks]
+        finally:
+            _worker_state.clear()
+
+        def total(key: str) -> float:
+            return float(sum(partial[key] for partial in partials))
+
+        ranked = max(total('ranked_customers'), 1)
+        rated = total('rated_pairs')
+        recommended = np.unique(np.concatenate(
+            [partial['recommended_recipes'] for partial in partials] or [np.zeros(0, dtype=np.int32)]))
+        trained_recipes = len(np.unique(self.system.interactions_df['recipe_encoded']))
+
+        metrics = {
+            'rmse': float(np.sqrt(total('squared_error') / rated)) if rated else float('inf'),
+            'mae': total('absolute_error') / rated if rated else float('inf'),
+            f'precision@{k}': total('precision') / ranked,
+            f'recall@{k}': total('recall') / ranked,
+            f'ndcg@{k}': total('ndcg') / ranked,
+            'coverage': len(recommended) / trained_recipes if trained_recipes else 0.0,
+            'diversity': total('diversity') / max(total('diverse_lists'), 1),
+            'test_customers': n_customers,
+            'test_pairs': int(rated),
+            'workers': n_workers,
+            'evaluation_seconds': round(time.time() - start_time, 3)
+        }
+        return metrics
+
+
+def evaluate_hybrid_system(interactions_df: pd.DataFrame, config: Optional[Dict] = None,
+                           test_size: float = 0.2, k: int = 10,
+                           n_jobs: Optional[int] = None) -> Dict[str, float]:
+    """Train on a split of interactions_df and evaluate (see EvaluationEngine.run)"""
+    return EvaluationEngine(interactions_df, config, test_size, n_jobs).run(k=k)
@@ -0,0 +1,157 @@
+"""
+🧮 MATRIX FACTORIZATION SERVING ARRAYS
+======================================
+
+Dense float32 export of a trained matrix factorization model, aligned with
+the encoded id spaces of HybridRecommendationSystem (row = customer_encoded,
+column = recipe_encoded):
+
+    prediction = global_mean + user_bias[u] + item_bias[i] + user_factors[u] . item_factors[i]
+
+clipped to the rating scale when the source model clips (surprise SVD/NMF).
+Scoring one customer is one matrix-vector product; a block of customers is
+one matrix product - no per-recipe predict() calls.
+
+Usage:
+    factors = FactorModel.from_surprise(svd_model, customer_classes, recipe_classes)
+    scores = factors.scores(np.array([customer_encoded]))[0]
+    factors.save('hybrid_recommendation_model.pkl_mf_factors')
+    factors = FactorModel.load('hybrid_recommendation_model.pkl_mf_factors')
+
+Author: AI Assistant
+Date: June 19, 2025
+"""
+
+import json
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+ARRAY_FIELDS = ['user_factors', 'item_factors', 'user_bias', 'item_bias', 'item_mask']
+
+
+@dataclass
+class FactorModel:
+    """User/item factors and biases of a matrix factorization model"""
+    user_factors: np.ndarray
+    item_factors: np.ndarray
+    user_bias: np.ndarray
+    item_bias: np.ndarray
+    item_mask: np.ndarray
+    global_mean: float = 0.0
+    rating_scale: Optional[Tuple[float, float]] = None
+    source: str = ''
+
+    @property
+    def n_factors(self) -> int:
+        return self.item_factors.shape[1]
+
+    def scores(self, user_rows: np.ndarray, item_rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Predicted ratings for a block of users
+
+        Args:
+            user_rows: Encoded customer ids
+            item_rows: Optional encoded recipe ids (default: all recipes)
+
+        Returns:
+            float32 (len(user_rows), n_items or len(item_rows)); items the
+            model cannot score are -inf
+        """
+        user_rows = np.asarray(user_rows, dtype=np.int64)
+        if item_rows is None:
+            item_factors, item_bias, item_mask = self.item_factors, self.item_bias, self.item_mask
+        else:
+            item_rows = np.asarray(item_rows, dtype=np.int64)
+            item_factors, item_bias, item_mask = \
+                self.item_factors[item_rows], self.item_bias[item_rows], self.item_mask[item_rows]
+        scores = self.user_factors[user_rows] @ item_factors.T
+        scores += self.user_bias[user_rows, None]
+        scores += item_bias[None, :]
+        scores += np.float32(self.global_mean)
+        if self.rating_scale is not None:
+            np.clip(scores, self.rating_scale[0], self.rating_scale[1], out=scores)
+        scores[:, ~item_mask] = -np.inf
+        return scores
+
+    # ------------------------------------------------------------------
+    # Export from trained models
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_surprise(cls, model, customer_classes: Sequence[str], recipe_classes: Sequence[str],
+                      item_mask: Optional[np.ndarray] = None, source: str = 'svd') -> 'FactorModel':
+        """
+        Export a trained surprise SVD/NMF model
+
+        Customers and recipes unknown to the model's trainset get zero
+        factors and biases, which reproduces surprise's own estimate for
+        unknown users/items (global mean plus the known bias).
+
+        Args:
+            model: Fitted surprise.SVD or surprise.NMF
+            customer_classes: customer_encoded -> customer_id
+            recipe_classes: recipe_encoded -> recipe_name
+            item_mask: Optional recipes to score (default: all)
+            source: Name stored with the arrays
+
+        Returns:
+            FactorModel
+        """
+        trainset = model.trainset
+        biased = getattr(model, 'biased', True)
+        n_factors = model.pu.shape[1]
+
+        def export(raw_ids: Sequence[str], to_inner, factors: np.ndarray,
+                   biases: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+            aligned_factors = np.zeros((len(raw_ids), n_factors), dtype=np.float32)
+            aligned_biases = np.zeros(len(raw_ids), dtype=np.float32)
+            for position, raw_id in enumerate(raw_ids):
+                try:
+                    inner_id = to_inner(raw_id)
+                except ValueError:
+                    continue
+                aligned_factors[position] = factors[inner_id]
+                if biased:
+                    aligned_biases[position] = biases[inner_id]
+            return aligned_factors, aligned_biases
+
+        user_factors, user_bias = export(customer_classes, trainset.to_inner_uid, model.pu, model.bu)
+        item_factors, item_bias = export(recipe_classes, trainset.to_inner_iid, model.qi, model.bi)
+
+        return cls(user_factors, item_factors, user_bias, item_bias,
+                   np.ones(len(recipe_classes), dtype=bool) if item_mask is None else item_mask,
+                   float(trainset.global_mean) if biased else 0.0,
+                   tuple(float(value) for value in trainset.rating_scale), source)
+
+    @classmethod
+    def from_factors(cls, user_factors: np.ndarray, item_factors: np.ndarray,
+                     item_mask: Optional[np.ndarray] = None, source: str = 'svd_sklearn') -> 'FactorModel':
+        """Wrap plain factor matrices (no biases, no clipping), e.g. TruncatedSVD output"""
+        return cls(np.ascontiguousarray(user_factors, dtype=np.float32),
+                   np.ascontiguousarray(item_factors, dtype=np.float32),
+                   np.zeros(len(user_factors), dtype=np.float32),
+                   np.zeros(len(item_factors), dtype=np.float32),
+                   np.ones(len(item_factors), dtype=bool) if item_mask is None else item_mask,
+                   source=source)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def save(self, prefix: str):
+        """Write one <prefix>.<field>.npy per array plus <prefix>.json"""
+        for name in ARRAY_FIELDS:
+            np.save(f"{prefix}.{name}.npy", np.ascontiguousarray(getattr(self, name)))
+        with open(f"{prefix}.json", 'w', encoding='utf-8') as f:
+            json.dump({'global_mean': self.global_mean, 'rating_scale': self.rating_scale,
+                       'source': self.source}, f)
+
+    @classmethod
+    def load(cls, prefix: str, mmap_mode: Optional[str] = 'r') -> 'FactorModel':
+        """Load saved arrays (memory-mapped read-only by default)"""
+        with open(f"{prefix}.json", 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        arrays = {name: np.load(f"{prefix}.{name}.npy", mmap_mode=mmap_mode) for name in ARRAY_FIELDS}
+        rating_scale = tuple(meta['rating_scale']) if meta.get('rating_scale') else None
+        return cls(**arrays, global_mean=meta.get('global_mean', 0.0),
+                   rating_scale=rating_scale, source=meta.get('source', ''))
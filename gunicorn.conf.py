@@ -0,0 +1,31 @@
+"""
+Gunicorn configuration for pre-forked serving (see serve.py)
+
+    gunicorn -c gunicorn.conf.py
+
+Environment:
+    WEB_CONCURRENCY   number of workers (default: 2 x CPU + 1)
+    BIND              listen address (default: 0.0.0.0:5000)
+    PRELOAD_HYBRID    load the hybrid model in the master before fork
+"""
+
+import multiprocessing
+import os
+
+wsgi_app = 'serve:application'
+bind = os.getenv('BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+
+# Load everything once in the master; workers inherit it copy-on-write
+preload_app = True
+# Recycle workers slowly so private memory growth stays bounded
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 0))
+
+
+def post_fork(server, worker):
+    """Warm the worker before it accepts connections"""
+    import serve
+    serve.init_worker()
@@ -9,31 +9,73 @@ Author: AI Assistant
 Date: June 19, 2025
 """
 
-from hybrid_recommendation_system import HybridRecommendationSystem, RecommendationResult
 import os
 import sys
 import json
 import time
+import shutil
 import threading
+import multiprocessing
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, List, Any, Optional
 from datetime import datetime
+from startup_profiler import startup_profiler
+from recipe_catalog import INT_FIELDS, get_recipe_catalog, int_value
+from model_generations import GenerationManager, ModelGeneration, new_generation_id
 
 # Add current directory to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+# Trained model artifact directory (see model_artifact.py)
+MODEL_ARTIFACT_DIR = "hybrid_model_artifact"
+
+DEFAULT_INTERACTIONS_PATH = "interactions_enhanced_final.csv"
+
+
+def _hybrid_system_class():
+    """Import the hybrid system (sklearn/TensorFlow/surprise) on first use"""
+    module = startup_profiler.import_module(
+        'hybrid_recommendation_system', kind='lazy')
+    return module.HybridRecommendationSystem
+
+
+def _train_artifact(config: Dict, interactions_path: str, directory: str, generation_id: str) -> float:
+    """Train a generation and write it as an artifact (runs in a spawned process)"""
+    start_time = time.time()
+    system = _hybrid_system_class()(config)
+    system.load_data(interactions_path)
+    system.train_all_models()
+    system.generation_id = generation_id
+    system.save_artifact(directory)
+    return time.time() - start_time
+
 
 class HybridRecommendationService:
     """
     Service class for integrating hybrid recommendations with Flask app
+
+    The trained system is served as immutable model generations
+    (model_generations.py): retraining builds a new generation off the
+    request path and swaps it in atomically.
     """
 
     def __init__(self, config: Optional[Dict] = None):
         """Initialize the hybrid recommendation service"""
         self.config = config or self._get_default_config()
-        self.system = None
-        self.is_trained = False
-        self.last_training_time = None
-        self.training_lock = threading.Lock()
+        self.generations = GenerationManager()
+        self.artifact_dir = MODEL_ARTIFACT_DIR
+        self.auto_retrain_thread = None
+        self.auto_retrain_stop = threading.Event()
+
+        # First load/train (shared by the warm-up thread and request threads)
+        self.initialization_lock = threading.Lock()
+        self.warmup_thread = None
+        self.warmup_error = None
+
+        # Offline evaluation (trains its own split, so it runs in the background)
+        self.evaluation_thread = None
+        self.last_evaluation = None
 
         # Cache for performance
         self.recommendation_cache = {}
@@ -41,6 +83,21 @@ class HybridRecommendationService:
 
         print("🔗 Hybrid Recommendation Service initialized")
 
+    @property
+    def system(self):
+        """Trained system of the current generation (None before initialization)"""
+        generation = self.generations.current()
+        return generation.system if generation else None
+
+    @property
+    def is_trained(self) -> bool:
+        return self.generations.current() is not None
+
+    @property
+    def last_training_time(self) -> Optional[datetime]:
+        generation = self.generations.current()
+        return generation.created_at if generation else None
+
     def _get_default_config(self) -> Dict:
         """Get default configuration optimized for production"""
         return {
@@ -56,6 +113,8 @@ class HybridRecommendationService:
             'matrix_factorization_factors': 25,  # Reduced for performance
             'content_tfidf_max_features': 300,   # Reduced for performance
             'auto_retrain_hours': 24,  # Auto-retrain every 24 hours
+            'auto_retrain_check_minutes': 10,
+            'isolated_retrain': True,  # Background retraining in a separate process
             'cache_recommendations': True
         }
 
@@ -70,54 +129,234 @@ class HybridRecommendationService:
         Returns:
             True if successful, False otherwise
         """
-        try:
-            with self.training_lock:
-                print("🚀 Initializing hybrid recommendation system...")
-
-                # Check if model exists and is recent
-                model_path = "hybrid_recommendation_model.pkl"
-                if (os.path.exists(model_path) and not force_retrain and
-                        self._is_model_recent(model_path)):
-
-                    print("📁 Loading existing trained model...")
-                    self.system = HybridRecommendationSystem(self.config)
-                    self.system.load_model(model_path)
-
-                    # Still need to load data for new predictions
-                    if os.path.exists(interactions_path):
-                        self.system.load_data(interactions_path)
-                        self.is_trained = True
-                        self.last_training_time = datetime.now()
-                        print("✅ System loaded from existing model")
-                        return True
-
-                # Train new model
-                if not os.path.exists(interactions_path):
-                    print(f"❌ Data file not found: {interactions_path}")
-                    return False
-
-                print("🎯 Training new hybrid model...")
-                start_time = time.time()
-
-                self.system = HybridRecommendationSystem(self.config)
-                self.system.load_data(interactions_path)
-                self.system.train_all_models()
-
-                # Save model
-                self.system.save_model(model_path)
-
-                training_time = time.time() - start_time
-                self.is_trained = True
-                self.last_training_time = datetime.now()
-
-                print(
-                    f"✅ Hybrid system trained and ready in {training_time:.2f} seconds")
+        report = self._rebuild(interactions_path, force_retrain)
+        return report['success']
+
+    def _staging_dir(self, generation_id: str) -> str:
+        return f"{self.artifact_dir}.{generation_id}.staging"
+
+    def _rebuild(self, interactions_path: str, force_retrain: bool = False,
+                 isolated: bool = False, blocking: bool = True) -> Dict[str, Any]:
+        """
+        Build, validate and swap in the next generation
+
+        One build runs at a time across all serving processes (retrain lock
+        next to the artifact): a blocking caller waits for another process's
+        build and then loads the artifact it published; a non-blocking
+        caller gets a 'busy' report.
+        """
+        from model_artifact import artifact_lock
+
+        generation_id = new_generation_id()
+        with artifact_lock(f"{self.artifact_dir}.retrain", blocking=blocking) as acquired:
+            if not acquired:
+                print("⏳ Another process is building a model generation, skipping this build")
+                current = self.generations.current()
+                return {'success': False, 'status': 'busy',
+                        'error': 'Another process is building a model generation',
+                        'generation_id': current.generation_id if current else None}
+            try:
+                return self.generations.build_and_swap(
+                    lambda: self._build_generation(interactions_path, generation_id, force_retrain, isolated),
+                    before_swap=self._publish_artifact,
+                    after_swap=self._on_swap)
+            finally:
+                # Staging artifact of a generation that failed or was rejected
+                shutil.rmtree(self._staging_dir(generation_id), ignore_errors=True)
+
+    def _build_generation(self, interactions_path: str, generation_id: str,
+                          force_retrain: bool = False, isolated: bool = False) -> Optional[ModelGeneration]:
+        """Load or train the next generation without touching the serving one"""
+        print("🚀 Initializing hybrid recommendation system...")
+        system_class = _hybrid_system_class()
+
+        # Warm start: memory-mapped artifact, the CSV is not read
+        manifest_path = os.path.join(self.artifact_dir, 'manifest.json')
+        if (os.path.exists(manifest_path) and not force_retrain and
+                self._is_model_recent(manifest_path)):
+
+            generation = self._load_published_generation(generation_id)
+            if generation is not None:
+                return generation
+
+        # Legacy pickle: load once more from the CSV and convert it to an artifact
+        model_path = "hybrid_recommendation_model.pkl"
+        if (os.path.exists(model_path) and not force_retrain and
+                self._is_model_recent(model_path) and os.path.exists(interactions_path)):
+
+            print("📁 Loading existing trained model...")
+            system = system_class(self.config)
+            system.load_model(model_path)
+            system.load_data(interactions_path)
+            system.generation_id = generation_id
+            system.save_artifact(self._staging_dir(generation_id))
+            print("✅ System loaded from existing model")
+            return ModelGeneration(generation_id, system, 'legacy_model',
+                                   artifact_dir=self._staging_dir(generation_id))
+
+        # Train new model
+        if not os.path.exists(interactions_path):
+            print(f"❌ Data file not found: {interactions_path}")
+            return None
+
+        print("🎯 Training new hybrid model...")
+        start_time = time.time()
+        staging_dir = self._staging_dir(generation_id)
+
+        if isolated:
+            # Training runs in its own interpreter; only the artifact is loaded here
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                pool.submit(_train_artifact, dict(self.config), interactions_path,
+                            staging_dir, generation_id).result()
+            system = system_class(self.config)
+            if not system.load_artifact(staging_dir):
+                return None
+        else:
+            system = system_class(self.config)
+            system.load_data(interactions_path)
+            system.train_all_models()
+            system.generation_id = generation_id
+
+            # Save the warm-start artifact (published when the generation is swapped in)
+            system.save_artifact(staging_dir)
+
+        training_time = time.time() - start_time
+        print(
+            f"✅ Hybrid system trained and ready in {training_time:.2f} seconds")
+        return ModelGeneration(generation_id, system, 'trained', artifact_dir=staging_dir)
+
+    def _load_published_generation(self, generation_id: Optional[str] = None) -> Optional[ModelGeneration]:
+        """Generation loaded from the published (memory-mapped) artifact, None if it cannot be loaded"""
+        print("📁 Loading model artifact...")
+        start_time = time.time()
+        system = _hybrid_system_class()(self.config)
+        if not system.load_artifact(self.artifact_dir):
+            return None
+        print(f"✅ System loaded from model artifact in "
+              f"{(time.time() - start_time) * 1000:.0f} ms")
+        manifest_path = os.path.join(self.artifact_dir, 'manifest.json')
+        return ModelGeneration(
+            system.generation_id or generation_id or new_generation_id(), system, 'artifact',
+            created_at=datetime.fromtimestamp(os.path.getmtime(manifest_path)))
+
+    def _publish_artifact(self, generation: ModelGeneration):
+        """Make a validated generation's artifact the warm-start artifact of every process"""
+        if generation.artifact_dir and os.path.exists(generation.artifact_dir):
+            from model_artifact import publish_artifact
+            try:
+                publish_artifact(generation.artifact_dir, self.artifact_dir)
+            except OSError as e:
+                # The generation is valid: serve it here even if other processes cannot load it
+                print(f"⚠️ Could not publish model artifact {generation.generation_id}: {e}")
+
+    def published_generation_id(self) -> Optional[str]:
+        """Generation id of the published artifact (None without one)"""
+        from model_artifact import read_manifest
+
+        manifest = read_manifest(self.artifact_dir)
+        return manifest.get('generation_id') if manifest else None
+
+    def sync_published_generation(self) -> bool:
+        """
+        Swap in the published artifact if another process published a newer generation
+
+        Returns:
+            True if a newer generation was loaded
+        """
+        published_id = self.published_generation_id()
+        current = self.generations.current()
+        if published_id is None or (current is not None and published_id <= current.generation_id):
+            return False
+
+        print(f"📥 Loading model generation {published_id} published by another process...")
+        report = self.generations.build_and_swap(self._load_published_generation, after_swap=self._on_swap)
+        return report['success']
+
+    def _on_swap(self, generation: ModelGeneration):
+        # Cached results belong to the previous generation
+        self.recommendation_cache = {}
+
+    def ensure_initialized(self, interactions_path: str = DEFAULT_INTERACTIONS_PATH,
+                           wait: bool = True, schedule_retrain: bool = True) -> bool:
+        """
+        Load or train the system the first time it is needed
+
+        Args:
+            interactions_path: Path to interactions data
+            wait: Block until the system is ready (joining a running warm-up);
+                  with False a warm-up is started if needed and the current
+                  readiness is returned immediately
+            schedule_retrain: Start the auto-retrain thread once ready (False
+                              in a pre-fork master, whose threads the
+                              workers do not inherit)
+
+        Returns:
+            True if a generation is serving
+        """
+        if self.is_trained:
+            return True
+        if not wait:
+            self.start_warmup(interactions_path)
+            return False
+
+        with self.initialization_lock:
+            if self.is_trained:
                 return True
+            if not self.initialize_system(interactions_path):
+                self.warmup_error = self.generations.last_build.get('error', 'initialization failed')
+                return False
+            self.warmup_error = None
+        if schedule_retrain:
+            self.start_auto_retrain(interactions_path)
+        return True
+
+    def start_warmup(self, interactions_path: str = DEFAULT_INTERACTIONS_PATH) -> bool:
+        """
+        Load (or train) the system in a background thread
 
-        except Exception as e:
-            print(f"❌ Error initializing hybrid system: {e}")
+        Called at app startup so the first request does not pay for the
+        model load; request threads that need the system meanwhile either
+        wait for it (ensure_initialized) or check readiness().
+
+        Returns:
+            True if a warm-up thread was started
+        """
+        if self.is_trained or (self.warmup_thread and self.warmup_thread.is_alive()):
             return False
 
+        self.warmup_thread = threading.Thread(
+            target=self.ensure_initialized, args=(interactions_path,),
+            name='hybrid-warmup', daemon=True)
+        self.warmup_thread.start()
+        print("🔥 Hybrid model warm-up started in the background")
+        return True
+
+    def readiness(self) -> Dict[str, Any]:
+        """
+        Serving state of the service
+
+        Returns:
+            Dictionary with 'ready', 'state' ('cold', 'warming', 'ready' or
+            'failed'), 'generation_id', 'building' and 'error'
+        """
+        generation = self.generations.current()
+        if generation is not None:
+            state = 'ready'
+        elif (self.warmup_thread and self.warmup_thread.is_alive()) or self.initialization_lock.locked():
+            state = 'warming'
+        elif self.warmup_error:
+            state = 'failed'
+        else:
+            state = 'cold'
+
+        return {
+            'ready': generation is not None,
+            'state': state,
+            'generation_id': generation.generation_id if generation else None,
+            'building': self.generations.is_building(),
+            'error': self.warmup_error if state == 'failed' else None
+        }
+
     def _is_model_recent(self, model_path: str) -> bool:
         """Check if the saved model is recent enough"""
         try:
@@ -127,6 +366,43 @@ class HybridRecommendationService:
         except:
             return False
 
+    def start_auto_retrain(self, interactions_path: str) -> bool:
+        """
+        Start the scheduled retraining thread (config 'auto_retrain_hours')
+
+        Runs in every serving process. Every 'auto_retrain_check_minutes' a
+        newer generation published by another process is loaded; otherwise,
+        once the serving generation is older than auto_retrain_hours, the
+        next one is built in the background by whichever process takes the
+        retrain lock first, and the others load it at their next check.
+
+        Returns:
+            True if the thread was started
+        """
+        if not self.config.get('auto_retrain_hours') or (
+                self.auto_retrain_thread and self.auto_retrain_thread.is_alive()):
+            return False
+
+        interval = self.config.get('auto_retrain_check_minutes', 10) * 60
+
+        def run():
+            while not self.auto_retrain_stop.wait(interval):
+                if self.sync_published_generation():
+                    continue
+                generation = self.generations.current()
+                if generation is None or generation.age_hours >= self.config['auto_retrain_hours']:
+                    print("⏰ Scheduled retraining of the hybrid model...")
+                    self._rebuild(interactions_path, isolated=self.config.get('isolated_retrain', True),
+                                  blocking=False)
+
+        self.auto_retrain_stop.clear()
+        self.auto_retrain_thread = threading.Thread(target=run, name='hybrid-auto-retrain', daemon=True)
+        self.auto_retrain_thread.start()
+        return True
+
+    def stop_auto_retrain(self):
+        self.auto_retrain_stop.set()
+
     def get_recommendations(self, customer_id: str, n_recommendations: int = 10,
                             method: str = 'hybrid') -> Dict[str, Any]:
         """
@@ -135,25 +411,29 @@ class HybridRecommendationService:
         Args:
             customer_id: Customer ID
             n_recommendations: Number of recommendations
-            method: Recommendation method ('hybrid', 'collaborative', 'content', 'matrix_factorization', 'deep_learning')
+            method: Recommendation method ('hybrid', 'collaborative', 'content', 'matrix_factorization', 'deep_learning', 'implicit_feedback')
 
         Returns:
             Dictionary with recommendations and metadata
         """
-        if not self.is_trained or not self.system:
+        # The whole request is served by the generation current at its start
+        generation = self.generations.current()
+        if generation is None:
             return {
                 'success': False,
                 'error': 'System not trained. Please initialize first.',
                 'recommendations': []
             }
+        system = generation.system
 
         try:
             # Check cache first
-            cache_key = f"{customer_id}_{method}_{n_recommendations}"
+            cache = self.recommendation_cache
+            cache_key = f"{generation.generation_id}_{customer_id}_{method}_{n_recommendations}"
             if (self.config['cache_recommendations'] and
-                    cache_key in self.recommendation_cache):
+                    cache_key in cache):
 
-                cached_result = self.recommendation_cache[cache_key]
+                cached_result = cache[cache_key]
                 if time.time() - cached_result['timestamp'] < self.cache_timeout:
                     cached_result['from_cache'] = True
                     return cached_result
@@ -161,20 +441,24 @@ class HybridRecommendationService:
             start_time = time.time()
 
             # Get recommendations based on method
+            pipeline_report = {}
             if method == 'hybrid':
-                recommendations = self.system.get_hybrid_recommendations(
-                    customer_id, n_recommendations)
+                recommendations = system.get_hybrid_recommendations(
+                    customer_id, n_recommendations, pipeline_report=pipeline_report)
             elif method == 'collaborative':
-                recommendations = self.system.get_collaborative_recommendations(
+                recommendations = system.get_collaborative_recommendations(
                     customer_id, n_recommendations)
             elif method == 'content':
-                recommendations = self.system.get_content_based_recommendations(
+                recommendations = system.get_content_based_recommendations(
                     customer_id, n_recommendations)
             elif method == 'matrix_factorization':
-                recommendations = self.system.get_matrix_factorization_recommendations(
+                recommendations = system.get_matrix_factorization_recommendations(
                     customer_id, n_recommendations)
             elif method == 'deep_learning':
-                recommendations = self.system.get_deep_learning_recommendations(
+                recommendations = system.get_deep_learning_recommendations(
+                    customer_id, n_recommendations)
+            elif method == 'implicit_feedback':
+                recommendations = system.get_implicit_feedback_recommendations(
                     customer_id, n_recommendations)
             else:
                 return {
@@ -206,23 +490,29 @@ class HybridRecommendationService:
                 'success': True,
                 'customer_id': customer_id,
                 'method': method,
+                'generation_id': generation.generation_id,
                 'recommendations': formatted_recs,
                 'metadata': {
                     'recommendation_time': round(recommendation_time, 4),
                     'total_recommendations': len(formatted_recs),
                     'timestamp': datetime.now().isoformat(),
                     'system_info': {
-                        'last_training': self.last_training_time.isoformat() if self.last_training_time else None,
-                        'is_trained': self.is_trained
+                        'last_training': generation.created_at.isoformat(),
+                        'is_trained': True,
+                        'generation_id': generation.generation_id
                     }
                 },
                 'from_cache': False
             }
 
+            # Candidate counts and stage timings of this request's two-stage hybrid call
+            if pipeline_report:
+                result['metadata']['candidate_pipeline'] = pipeline_report
+
             # Cache result
             if self.config['cache_recommendations']:
                 result['timestamp'] = time.time()
-                self.recommendation_cache[cache_key] = result.copy()
+                cache[cache_key] = result.copy()
 
                 # Clean old cache entries
                 self._clean_cache()
@@ -235,61 +525,59 @@ class HybridRecommendationService:
                 'error': f'Error getting recommendations: {str(e)}',
                 'recommendations': [],
                 'customer_id': customer_id,
-                'method': method
+                'method': method,
+                'generation_id': generation.generation_id
             }
 
     def _get_recipe_details(self, recipe_name: str) -> Dict[str, Any]:
-        """Get additional recipe details from interactions data"""
-        try:
-            recipe_data = self.system.interactions_df[
-                self.system.interactions_df['recipe_name'] == recipe_name
-            ].iloc[0]
+        """Get additional recipe details from the shared recipe catalog"""
+        details = {
+            'nutrition_category': 'unknown',
+            'estimated_calories': 0,
+            'preparation_time_minutes': 0,
+            'difficulty': 'unknown',
+            'meal_time': 'unknown',
+            'ingredient_count': 0,
+            'estimated_price_vnd': 0,
+            'recipe_url': ''
+        }
 
-            return {
-                'nutrition_category': recipe_data.get('nutrition_category', 'unknown'),
-                'estimated_calories': int(recipe_data.get('estimated_calories', 0)),
-                'preparation_time_minutes': int(recipe_data.get('preparation_time_minutes', 0)),
-                'difficulty': recipe_data.get('difficulty', 'unknown'),
-                'meal_time': recipe_data.get('meal_time', 'unknown'),
-                'ingredient_count': int(recipe_data.get('ingredient_count', 0)),
-                'estimated_price_vnd': int(recipe_data.get('estimated_price_vnd', 0)),
-                'recipe_url': recipe_data.get('recipe_url', '')
-            }
-        except:
-            return {
-                'nutrition_category': 'unknown',
-                'estimated_calories': 0,
-                'preparation_time_minutes': 0,
-                'difficulty': 'unknown',
-                'meal_time': 'unknown',
-                'ingredient_count': 0,
-                'estimated_price_vnd': 0,
-                'recipe_url': ''
-            }
+        recipe_data = get_recipe_catalog().details(recipe_name, list(details))
+        if recipe_data:
+            details.update(
+                {key: value for key, value in recipe_data.items() if not pd.isna(value)})
+            for key in INT_FIELDS:
+                details[key] = int_value(details[key], INT_FIELDS[key])
+        return details
 
     def _clean_cache(self):
         """Clean old cache entries"""
         current_time = time.time()
+        cache = self.recommendation_cache
         keys_to_remove = []
 
-        for key, value in self.recommendation_cache.items():
+        for key, value in list(cache.items()):
             if current_time - value.get('timestamp', 0) > self.cache_timeout:
                 keys_to_remove.append(key)
 
         for key in keys_to_remove:
-            del self.recommendation_cache[key]
+            cache.pop(key, None)
 
     def get_system_stats(self) -> Dict[str, Any]:
         """Get system statistics and health information"""
-        if not self.system:
-            return {'status': 'not_initialized'}
+        generation = self.generations.current()
+        if generation is None:
+            return {'status': 'not_initialized', 'readiness': self.readiness(),
+                    'generations': self.generations.status()}
 
         try:
-            info = self.system.get_model_info()
+            info = generation.system.get_model_info()
 
             stats = {
-                'status': 'ready' if self.is_trained else 'not_trained',
-                'last_training': self.last_training_time.isoformat() if self.last_training_time else None,
+                'status': 'ready',
+                'last_training': generation.created_at.isoformat(),
+                'generation_id': generation.generation_id,
+                'generations': self.generations.status(),
                 'data_stats': info['data_shape'],
                 'trained_models': info['trained_models'],
                 'ensemble_weights': info['ensemble_weights'],
@@ -312,40 +600,119 @@ class HybridRecommendationService:
                 'error': str(e)
             }
 
-    def evaluate_system(self) -> Dict[str, Any]:
-        """Evaluate system performance"""
-        if not self.is_trained:
+    def evaluate_system(self, background: bool = True, refresh: bool = False) -> Dict[str, Any]:
+        """
+        Evaluate system performance
+
+        Evaluation trains a fresh system on a train split (see
+        evaluate_model()), so by default it runs in a background thread and
+        the result is kept per generation for later calls.
+
+        Args:
+            background: Evaluate in a background thread and return immediately
+            refresh: Re-evaluate even if the current generation has a result
+
+        Returns:
+            Dictionary with the status and the latest evaluation (if any)
+        """
+        generation = self.generations.current()
+        if generation is None:
             return {'error': 'System not trained'}
 
-        try:
-            metrics = self.system.evaluate_model()
+        last = self.last_evaluation
+        if not refresh and last and last.get('generation_id') == generation.generation_id:
+            return dict(last, status='completed')
+
+        if not background:
+            return self._evaluate(generation)
+
+        if self.evaluation_thread and self.evaluation_thread.is_alive():
             return {
+                'success': True,
+                'status': 'running',
+                'generation_id': generation.generation_id,
+                'last_evaluation': last
+            }
+        self.evaluation_thread = threading.Thread(
+            target=self._evaluate, name='hybrid-evaluate', daemon=True, args=(generation,))
+        self.evaluation_thread.start()
+        return {
+            'success': True,
+            'status': 'started',
+            'message': 'Evaluation started in the background',
+            'generation_id': generation.generation_id,
+            'last_evaluation': last
+        }
+
+    def _evaluate(self, generation: ModelGeneration) -> Dict[str, Any]:
+        """Evaluate one generation and keep the result as last_evaluation"""
+        try:
+            metrics = generation.system.evaluate_model()
+            result = {
                 'success': True,
                 'metrics': metrics,
+                'generation_id': generation.generation_id,
                 'evaluation_time': datetime.now().isoformat()
             }
         except Exception as e:
-            return {
+            print(f"❌ Evaluation failed: {e}")
+            result = {
                 'success': False,
-                'error': str(e)
+                'error': str(e),
+                'generation_id': generation.generation_id,
+                'evaluation_time': datetime.now().isoformat()
             }
+        self.last_evaluation = result
+        return result
+
+    def retrain_system(self, interactions_path: str, background: bool = True) -> Dict[str, Any]:
+        """
+        Retrain the system with updated data
 
-    def retrain_system(self, interactions_path: str) -> Dict[str, Any]:
-        """Retrain the system with updated data"""
+        Args:
+            interactions_path: Path to interactions data
+            background: Build the new generation in a background thread and
+                        return immediately (the current generation keeps serving)
+
+        Returns:
+            Dictionary with the status and the generation ids
+        """
         try:
-            success = self.initialize_system(
-                interactions_path, force_retrain=True)
+            current = self.generations.current()
+            if background:
+                if self.generations.is_building():
+                    return {
+                        'success': False,
+                        'status': 'busy',
+                        'error': 'Retraining already in progress',
+                        'generation_id': current.generation_id if current else None
+                    }
+                threading.Thread(
+                    target=self._rebuild, name='hybrid-retrain', daemon=True,
+                    args=(interactions_path, True, self.config.get('isolated_retrain', True), False)).start()
+                return {
+                    'success': True,
+                    'status': 'started',
+                    'message': 'Retraining started in the background (other processes load it when published)',
+                    'generation_id': current.generation_id if current else None
+                }
 
-            if success:
+            report = self._rebuild(interactions_path, force_retrain=True)
+            if report['success']:
                 return {
                     'success': True,
+                    'status': report['status'],
                     'message': 'System retrained successfully',
+                    'generation_id': report['generation_id'],
+                    'previous_generation_id': report['previous_generation_id'],
                     'training_time': self.last_training_time.isoformat()
                 }
             else:
                 return {
                     'success': False,
-                    'error': 'Failed to retrain system'
+                    'status': report['status'],
+                    'error': f"Failed to retrain system: {report.get('error')}",
+                    'generation_id': report.get('generation_id')
                 }
 
         except Exception as e:
@@ -356,7 +723,7 @@ class HybridRecommendationService:
 
     def clear_cache(self):
         """Clear recommendation cache"""
-        self.recommendation_cache.clear()
+        self.recommendation_cache = {}
         return {'success': True, 'message': 'Cache cleared'}
 
 
@@ -369,7 +736,7 @@ def get_hybrid_service() -> HybridRecommendationService:
     return hybrid_service
 
 
-def initialize_hybrid_service(interactions_path: str = "interactions_enhanced_final.csv") -> bool:
+def initialize_hybrid_service(interactions_path: str = DEFAULT_INTERACTIONS_PATH) -> bool:
     """Initialize the hybrid service"""
     return hybrid_service.initialize_system(interactions_path)
 
@@ -386,6 +753,7 @@ def add_hybrid_routes(app):
         method = request.args.get('method', 'hybrid')
         n_recommendations = int(request.args.get('n', 10))
 
+        hybrid_service.ensure_initialized()
         result = hybrid_service.get_recommendations(
             customer_id, n_recommendations, method)
         return jsonify(result)
@@ -400,10 +768,12 @@ def add_hybrid_routes(app):
 
     @app.route('/api/hybrid/evaluate')
     def evaluate_hybrid_system():
-        """Evaluate hybrid system performance"""
-        from flask import jsonify
+        """Evaluate hybrid system performance (in the background; poll for the result)"""
+        from flask import request, jsonify
 
-        evaluation = hybrid_service.evaluate_system()
+        hybrid_service.ensure_initialized()
+        evaluation = hybrid_service.evaluate_system(
+            refresh=request.args.get('refresh', 'false').lower() == 'true')
         return jsonify(evaluation)
 
     @app.route('/api/hybrid/retrain', methods=['POST'])
@@ -411,11 +781,28 @@ def add_hybrid_routes(app):
         """Retrain the hybrid system"""
         from flask import request, jsonify
 
-        interactions_path = request.json.get(
-            'interactions_path', 'interactions_enhanced_final.csv')
-        result = hybrid_service.retrain_system(interactions_path)
+        payload = request.get_json(silent=True) or {}
+        interactions_path = payload.get(
+            'interactions_path', DEFAULT_INTERACTIONS_PATH)
+        result = hybrid_service.retrain_system(
+            interactions_path, background=not payload.get('wait', False))
         return jsonify(result)
 
+    @app.route('/api/hybrid/ready')
+    def get_hybrid_readiness():
+        """Readiness of the shared hybrid service (503 until a generation serves)"""
+        from flask import jsonify
+
+        readiness = hybrid_service.readiness()
+        return jsonify(readiness), 200 if readiness['ready'] else 503
+
+    @app.route('/api/hybrid/generations')
+    def get_hybrid_generations():
+        """Serving model generation, running build and recent generations"""
+        from flask import jsonify
+
+        return jsonify(hybrid_service.generations.status())
+
     @app.route('/api/hybrid/cache/clear', methods=['POST'])
     def clear_hybrid_cache():
         """Clear recommendation cache"""
@@ -7,6 +7,7 @@ Advanced hybrid recommendation system combining multiple ML approaches:
 - Content-Based Filtering (CBF) 
 - Matrix Factorization (MF)
 - Deep Learning Neural Networks
+- Implicit-feedback ALS (interaction types as confidence)
 - Ensemble Methods
 
 Author: AI Assistant
@@ -14,37 +15,41 @@ Date: June 19, 2025
 Version: 1.0
 """
 
-from sklearn.metrics import mean_squared_error, mean_absolute_error
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.decomposition import TruncatedSVD
-from sklearn.neighbors import NearestNeighbors
-from sklearn.preprocessing import StandardScaler, LabelEncoder
+from sklearn.preprocessing import StandardScaler, normalize
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.model_selection import train_test_split
 import pandas as pd
 import numpy as np
+import scipy.sparse as sp
 import pickle
 import json
 import os
+import time
+import importlib.util
 from typing import Dict, List, Tuple, Optional, Any
 from dataclasses import dataclass
 from datetime import datetime
+from data_snapshot import read_table
+from scoring_engine import top_k
+from neighbor_tables import NeighborTable, build_neighbor_table
+from factor_model import FactorModel
+from neural_inference import NeuralCFInference
+from implicit_als import ImplicitALS, build_confidence_matrix
+from ann_index import ANNIndex
+from candidate_pipeline import CandidatePipeline
+from id_registry import REGISTRY_DIR, IdMap, IdRegistry, load_id_registry
 import warnings
 warnings.filterwarnings('ignore')
 
 # ML Libraries
 
-# Deep Learning
-try:
-    import tensorflow as tf
-    from tensorflow.keras.models import Model, Sequential
-    from tensorflow.keras.layers import Dense, Embedding, Flatten, Concatenate, Dropout, Input
-    from tensorflow.keras.optimizers import Adam
-    from tensorflow.keras.callbacks import EarlyStopping
-    TENSORFLOW_AVAILABLE = True
-except ImportError:
-    TENSORFLOW_AVAILABLE = False
+# Deep Learning (TensorFlow is only imported to train or to read a Keras file;
+# serving uses the NumPy engine in neural_inference.py)
+TENSORFLOW_AVAILABLE = importlib.util.find_spec('tensorflow') is not None
+if not TENSORFLOW_AVAILABLE:
     print("⚠️ TensorFlow not available - Deep learning features disabled")
 
 # Matrix Factorization
@@ -58,6 +63,21 @@ except ImportError:
     print("⚠️ Surprise library not available - Advanced CF methods disabled")
 
 
+# Models saved as .npy arrays next to the pickle (type name -> class with save/load)
+ARRAY_MODEL_TYPES = {
+    'NeighborTable': NeighborTable,
+    'FactorModel': FactorModel,
+    'NeuralCFInference': NeuralCFInference,
+    'ANNIndex': ANNIndex
+}
+
+# ANN indexes over item vectors (built for large catalogs only)
+ANN_INDEXES = ['ann_mf', 'ann_implicit', 'ann_content']
+
+# Per-call summary of the two-stage pipeline exposed to callers
+PIPELINE_REPORT_KEYS = ('n_candidates', 'candidate_sources', 'timings_ms')
+
+
 @dataclass
 class RecommendationResult:
     """Structure for recommendation results"""
@@ -78,7 +98,8 @@ class HybridRecommendationSystem:
     2. Content-Based Filtering (Recipe features)
     3. Matrix Factorization (SVD, NMF)
     4. Deep Learning (Neural Collaborative Filtering)
-    5. Ensemble Methods (Weighted combination)
+    5. Implicit-feedback ALS (view/like/rate/save/cook confidence)
+    6. Ensemble Methods (Weighted combination)
     """
 
     def __init__(self, config: Optional[Dict] = None):
@@ -89,23 +110,30 @@ class HybridRecommendationSystem:
         self.interactions_df = None
         self.recipes_df = None
         self.customers_df = None
+        self.data_source = None
+        self.n_interactions = 0
+        self.training_report = None
+        self.candidate_pipeline = None
+        self.generation_id = None
 
         # Models
         self.models = {}
         self.encoders = {}
         self.scalers = {}
+        self.id_registry = IdRegistry()
 
         # Feature matrices
         self.user_item_matrix = None
         self.content_features = None
         self.recipe_features = None
 
-        # Model weights for ensemble
+        # Model weights for ensemble (sum to 1)
         self.ensemble_weights = {
-            'collaborative': 0.3,
-            'content_based': 0.25,
-            'matrix_factorization': 0.25,
-            'deep_learning': 0.2
+            'collaborative': 0.25,
+            'content_based': 0.2,
+            'matrix_factorization': 0.2,
+            'deep_learning': 0.175,
+            'implicit_feedback': 0.175
         }
 
         print("🎯 Hybrid Recommendation System initialized")
@@ -123,7 +151,25 @@ class HybridRecommendationSystem:
             'deep_learning_epochs': 50,
             'deep_learning_batch_size': 256,
             'matrix_factorization_factors': 50,
-            'content_tfidf_max_features': 1000
+            'content_tfidf_max_features': 1000,
+            'content_neighbors': 20,
+            'cf_neighbors': 50,
+            'implicit_als_factors': 32,
+            'implicit_als_iterations': 10,
+            'implicit_als_regularization': 0.1,
+            'implicit_als_alpha': 1.0,
+            'ann_min_items': 5000,
+            'ann_n_probe': 8,
+            'two_stage_retrieval': True,
+            'candidate_counts': {
+                'popularity': 100,
+                'user_neighbors': 100,
+                'item_neighbors': 100,
+                'content_neighbors': 100
+            },
+            'log_pipeline_timings': False,
+            'profile_training_memory': False,
+            'id_registry_dir': REGISTRY_DIR
         }
 
     def load_data(self, interactions_path: str, recipes_path: str = None, customers_path: str = None):
@@ -138,21 +184,34 @@ class HybridRecommendationSystem:
         print("📊 Loading data...")
 
         # Load interactions data
-        self.interactions_df = pd.read_csv(interactions_path)
+        self.interactions_df = read_table(interactions_path)
+        self.data_source = interactions_path
         print(f"✅ Loaded {len(self.interactions_df)} interactions")
 
         # Load recipes data if available
         if recipes_path and os.path.exists(recipes_path):
-            self.recipes_df = pd.read_csv(recipes_path)
+            self.recipes_df = read_table(recipes_path)
             print(f"✅ Loaded {len(self.recipes_df)} recipes")
 
         # Load customers data if available
         if customers_path and os.path.exists(customers_path):
-            self.customers_df = pd.read_csv(customers_path)
+            self.customers_df = read_table(customers_path)
             print(f"✅ Loaded {len(self.customers_df)} customers")
 
         self._preprocess_data()
 
+    def load_interactions(self, interactions_df: pd.DataFrame):
+        """
+        Use an in-memory interactions DataFrame (e.g. a training split)
+
+        Args:
+            interactions_df: Interactions with the same columns as the CSV file
+        """
+        self.interactions_df = interactions_df.copy()
+        print(f"✅ Loaded {len(self.interactions_df)} interactions")
+
+        self._preprocess_data()
+
     def _preprocess_data(self):
         """Preprocess the loaded data"""
         print("🔄 Preprocessing data...")
@@ -161,14 +220,19 @@ class HybridRecommendationSystem:
         self.interactions_df['rating'] = self.interactions_df['rating'].fillna(
             3.0)
 
-        # Create numeric encodings for categorical data
-        self.encoders['customer'] = LabelEncoder()
-        self.encoders['recipe'] = LabelEncoder()
+        # Ids of the shared, persisted registry (same ids as app.py and SQLite), extended
+        # in place; the model keeps a copy, so ids appended after training stay unknown to it
+        registry = load_id_registry(
+            self.interactions_df, directory=self.config.get('id_registry_dir', REGISTRY_DIR))
+        self.id_registry = IdRegistry(IdMap(registry.customers.classes_),
+                                      IdMap(registry.recipes.classes_))
+        self.encoders['customer'] = self.id_registry.customers
+        self.encoders['recipe'] = self.id_registry.recipes
 
-        self.interactions_df['customer_encoded'] = self.encoders['customer'].fit_transform(
+        self.interactions_df['customer_encoded'] = self.id_registry.customers.encode_many(
             self.interactions_df['customer_id']
         )
-        self.interactions_df['recipe_encoded'] = self.encoders['recipe'].fit_transform(
+        self.interactions_df['recipe_encoded'] = self.id_registry.recipes.encode_many(
             self.interactions_df['recipe_name']
         )
 
@@ -190,8 +254,9 @@ class HybridRecommendationSystem:
                 self.interactions_df['recipe_name'].isin(valid_recipes)
             ]
 
+        self.n_interactions = len(self.interactions_df)
         print(
-            f"✅ Preprocessed data: {len(self.interactions_df)} interactions after filtering")
+            f"✅ Preprocessed data: {self.n_interactions} interactions after filtering")
 
         # Create user-item matrix
         self._create_user_item_matrix()
@@ -200,46 +265,63 @@ class HybridRecommendationSystem:
         self._extract_content_features()
 
     def _create_user_item_matrix(self):
-        """Create user-item interaction matrix"""
+        """
+        Create the user-item interaction matrix
+
+        Stored as scipy CSR (int32 indices): row = customer_encoded,
+        column = recipe_encoded, value = mean rating of that pair. Memory
+        grows with the number of interactions, not users x recipes.
+        """
         print("📈 Creating user-item matrix...")
 
-        self.user_item_matrix = self.interactions_df.pivot_table(
-            index='customer_encoded',
-            columns='recipe_encoded',
-            values='rating',
-            fill_value=0
-        )
+        n_customers = len(self.encoders['customer'].classes_)
+        n_recipes = len(self.encoders['recipe'].classes_)
+        rows = self.interactions_df['customer_encoded'].values.astype(np.int32)
+        cols = self.interactions_df['recipe_encoded'].values.astype(np.int32)
+        ratings = self.interactions_df['rating'].values.astype(np.float64)
+
+        # Duplicate (customer, recipe) pairs are summed by the COO -> CSR
+        # conversion; divide by their count to keep the mean rating
+        shape = (n_customers, n_recipes)
+        sums = sp.coo_matrix((ratings, (rows, cols)), shape=shape).tocsr()
+        counts = sp.coo_matrix((np.ones(len(rows)), (rows, cols)), shape=shape).tocsr()
+        sums.sort_indices()
+        counts.sort_indices()
+        sums.data /= counts.data
+
+        sums.indices = sums.indices.astype(np.int32)
+        sums.indptr = sums.indptr.astype(np.int32)
+        self.user_item_matrix = sums
 
         print(
-            f"✅ Created {self.user_item_matrix.shape[0]}x{self.user_item_matrix.shape[1]} user-item matrix")
+            f"✅ Created {self.user_item_matrix.shape[0]}x{self.user_item_matrix.shape[1]} user-item matrix "
+            f"({self.user_item_matrix.nnz} ratings)")
 
     def _extract_content_features(self):
-        """Extract content-based features from recipes"""
-        print("🔍 Extracting content features...")
-
-        # Combine text features for TF-IDF
-        text_features = []
-
-        for _, row in self.interactions_df.iterrows():
-            features = []
-
-            # Add recipe name
-            if pd.notna(row.get('recipe_name')):
-                features.append(str(row['recipe_name']))
+        """
+        Extract content-based features, one row per recipe
 
-            # Add nutrition category
-            if pd.notna(row.get('nutrition_category')):
-                features.append(str(row['nutrition_category']))
+        Row i of content_features / recipe_features describes the recipe with
+        recipe_encoded == i. A recipe's text joins its name and nutrition
+        category with every meal time and difficulty it was served with;
+        its numerical features are the means over its interactions. Recipes
+        removed by the interaction filters keep an empty (all-zero) row.
+        """
+        print("🔍 Extracting content features...")
 
-            # Add meal time
-            if pd.notna(row.get('meal_time')):
-                features.append(str(row['meal_time']))
+        n_recipes = len(self.encoders['recipe'].classes_)
+        recipes = self.interactions_df.groupby('recipe_encoded', sort=True)
 
-            # Add difficulty
-            if pd.notna(row.get('difficulty')):
-                features.append(str(row['difficulty']))
+        def join_values(values: pd.Series) -> str:
+            return ' '.join(sorted({str(value) for value in values.dropna()}))
 
-            text_features.append(' '.join(features))
+        # Combine text features for TF-IDF
+        text_columns = [column for column in
+                        ['recipe_name', 'nutrition_category', 'meal_time', 'difficulty']
+                        if column in self.interactions_df]
+        recipe_text = recipes[text_columns].agg(join_values).apply(
+            lambda row: ' '.join(value for value in row if value), axis=1)
+        text_features = recipe_text.reindex(range(n_recipes), fill_value='')
 
         # Create TF-IDF vectors
         tfidf = TfidfVectorizer(
@@ -248,67 +330,76 @@ class HybridRecommendationSystem:
             ngram_range=(1, 2)
         )
 
-        self.content_features = tfidf.fit_transform(text_features)
+        self.content_features = tfidf.fit_transform(text_features.tolist()).tocsr()
         self.models['tfidf'] = tfidf
 
-        # Create numerical features matrix
-        numerical_features = []
-        for _, row in self.interactions_df.iterrows():
-            features = [
-                row.get('estimated_calories', 0),
-                row.get('preparation_time_minutes', 0),
-                row.get('ingredient_count', 0),
-                row.get('estimated_price_vnd', 0),
-                row.get('difficulty_code', 0),
-                row.get('meal_time_code', 0)
-            ]
-            numerical_features.append(features)
-
-        self.recipe_features = np.array(numerical_features)
+        # Create numerical features matrix (missing columns count as 0)
+        numerical_columns = ['estimated_calories', 'preparation_time_minutes', 'ingredient_count',
+                             'estimated_price_vnd', 'difficulty_code', 'meal_time_code']
+        numerical = self.interactions_df.reindex(columns=numerical_columns).apply(
+            pd.to_numeric, errors='coerce').fillna(0)
+        recipe_means = numerical.groupby(self.interactions_df['recipe_encoded']).mean()
 
-        # Scale numerical features
+        # Scale numerical features over the recipes that have interactions
         scaler = StandardScaler()
-        self.recipe_features = scaler.fit_transform(self.recipe_features)
+        scaler.fit(recipe_means.values)
+        self.recipe_features = np.zeros((n_recipes, len(numerical_columns)))
+        self.recipe_features[recipe_means.index.values] = scaler.transform(recipe_means.values)
         self.scalers['recipe_features'] = scaler
 
-        print("✅ Content features extracted")
+        print(f"✅ Content features extracted for {len(recipe_means)} recipes")
 
     def train_collaborative_filtering(self):
         """Train collaborative filtering models"""
         print("🤝 Training collaborative filtering models...")
 
-        # User-based collaborative filtering
-        user_similarity = cosine_similarity(self.user_item_matrix)
-        self.models['user_similarity'] = user_similarity
+        n_neighbors = self.config.get('cf_neighbors', 50)
 
-        # Item-based collaborative filtering
-        item_similarity = cosine_similarity(self.user_item_matrix.T)
-        self.models['item_similarity'] = item_similarity
+        # User-based collaborative filtering: top-K similar users per user
+        self.models['user_neighbors'] = build_neighbor_table(
+            self.user_item_matrix, n_neighbors)
 
-        # KNN-based collaborative filtering
-        knn_model = NearestNeighbors(
-            metric='cosine', algorithm='brute', n_neighbors=20)
-        knn_model.fit(self.user_item_matrix)
-        self.models['knn_cf'] = knn_model
+        # Item-based collaborative filtering: top-K similar recipes per recipe
+        self.models['item_neighbors'] = build_neighbor_table(
+            self.user_item_matrix.T, n_neighbors)
 
-        print("✅ Collaborative filtering models trained")
+        print(f"✅ Collaborative filtering models trained ({n_neighbors} neighbors per user/recipe)")
 
     def train_content_based_filtering(self):
         """Train content-based filtering models"""
         print("📝 Training content-based filtering models...")
 
-        # Content similarity matrix
-        content_similarity = cosine_similarity(self.content_features)
-        self.models['content_similarity'] = content_similarity
-
-        # KNN for content-based recommendations
-        knn_content = NearestNeighbors(
-            metric='cosine', algorithm='brute', n_neighbors=20)
-        knn_content.fit(self.content_features)
-        self.models['knn_content'] = knn_content
+        # Sparse top-K neighbor list instead of a dense recipe x recipe matrix
+        self.models['content_neighbors'] = build_neighbor_table(
+            self.content_features, self.config.get('content_neighbors', 20))
 
         print("✅ Content-based filtering models trained")
 
+    def get_similar_recipes(self, recipe_name: str, n_recommendations: int = 10) -> List[RecommendationResult]:
+        """Recipes most similar in content to a recipe (from the neighbor list)"""
+        try:
+            recipe_encoded = self._encoded('recipe', recipe_name)
+            if 'content_neighbors' not in self.models or recipe_encoded is None:
+                return []
+
+            neighbors, similarities = self.models['content_neighbors'].neighbors(
+                recipe_encoded, n_recommendations)
+            results = []
+            for neighbor, similarity in zip(neighbors, similarities):
+                results.append(RecommendationResult(
+                    recipe_id=str(neighbor),
+                    recipe_name=self.encoders['recipe'].classes_[neighbor],
+                    score=float(similarity),
+                    confidence=float(similarity),
+                    method='content_based_filtering',
+                    features={'content_similarity': float(similarity)}
+                ))
+            return results
+
+        except Exception as e:
+            print(f"⚠️ Error finding similar recipes: {e}")
+            return []
+
     def train_matrix_factorization(self):
         """Train matrix factorization models"""
         print("🧮 Training matrix factorization models...")
@@ -346,6 +437,13 @@ class HybridRecommendationSystem:
             print(f"✅ SVD RMSE: {svd_rmse:.4f}")
             print(f"✅ NMF RMSE: {nmf_rmse:.4f}")
 
+            # Serving arrays aligned with the encoded customer/recipe ids
+            classes = (self.encoders['customer'].classes_, self.encoders['recipe'].classes_)
+            self.models['mf_factors'] = FactorModel.from_surprise(
+                svd_model, *classes, item_mask=self._trained_recipe_mask(), source='svd')
+            self.models['nmf_factors'] = FactorModel.from_surprise(
+                nmf_model, *classes, item_mask=self._trained_recipe_mask(), source='nmf')
+
         else:
             # Fallback to basic SVD using sklearn
             svd = TruncatedSVD(
@@ -358,9 +456,64 @@ class HybridRecommendationSystem:
                 'user_factors': user_factors,
                 'item_factors': item_factors
             }
+            self.models['mf_factors'] = FactorModel.from_factors(
+                user_factors, item_factors, self._trained_recipe_mask())
 
             print("✅ Matrix factorization models trained (sklearn fallback)")
 
+    def _trained_recipe_mask(self) -> np.ndarray:
+        """Recipes (recipe_encoded) left in the interactions after filtering"""
+        mask = np.zeros(len(self.encoders['recipe'].classes_), dtype=bool)
+        if self.interactions_df is not None and 'recipe_encoded' in self.interactions_df:
+            mask[self.interactions_df['recipe_encoded'].values] = True
+        elif self.user_item_matrix is not None:
+            # Loaded models keep the user-item matrix but not the interactions
+            matrix = self.user_item_matrix
+            mask[:matrix.shape[1]] = np.bincount(matrix.indices, minlength=matrix.shape[1]) > 0
+        else:
+            mask[:] = True
+        return mask
+
+    def _factor_model(self) -> Optional[FactorModel]:
+        """MF serving arrays, exported on first use for models trained without them"""
+        if 'mf_factors' not in self.models:
+            if SURPRISE_AVAILABLE and 'svd' in self.models:
+                self.models['mf_factors'] = FactorModel.from_surprise(
+                    self.models['svd'], self.encoders['customer'].classes_,
+                    self.encoders['recipe'].classes_, item_mask=self._trained_recipe_mask(),
+                    source='svd')
+            elif 'svd_sklearn' in self.models:
+                self.models['mf_factors'] = FactorModel.from_factors(
+                    self.models['svd_sklearn']['user_factors'],
+                    self.models['svd_sklearn']['item_factors'], self._trained_recipe_mask())
+        return self.models.get('mf_factors')
+
+    def train_implicit_als(self):
+        """Train the implicit-feedback ALS model (interaction types as confidence)"""
+        print("🔁 Training implicit-feedback ALS model...")
+
+        if 'interaction_type' not in self.interactions_df:
+            print("⚠️ No interaction_type column - skipping implicit-feedback ALS")
+            return
+
+        confidence = build_confidence_matrix(
+            self.interactions_df['customer_encoded'].values,
+            self.interactions_df['recipe_encoded'].values,
+            self.interactions_df['interaction_type'].values,
+            self.user_item_matrix.shape,
+            alpha=self.config.get('implicit_als_alpha', 1.0))
+
+        als = ImplicitALS(
+            factors=self.config.get('implicit_als_factors', 32),
+            regularization=self.config.get('implicit_als_regularization', 0.1),
+            iterations=self.config.get('implicit_als_iterations', 10),
+            random_state=self.config.get('random_state', 42))
+        als.fit(confidence)
+        self.models['implicit_als'] = als.to_factor_model(self._trained_recipe_mask())
+
+        print(f"✅ Implicit-feedback ALS trained on {confidence.nnz} pairs "
+              f"in {als.training_seconds:.2f} seconds")
+
     def train_deep_learning(self):
         """Train deep learning models"""
         print("🧠 Training deep learning models...")
@@ -369,13 +522,18 @@ class HybridRecommendationSystem:
             print("⚠️ TensorFlow not available - skipping deep learning training")
             return
 
+        from tensorflow.keras.models import Model
+        from tensorflow.keras.layers import Dense, Embedding, Flatten, Concatenate, Dropout, Input
+        from tensorflow.keras.optimizers import Adam
+        from tensorflow.keras.callbacks import EarlyStopping
+
         # Prepare data for neural network
         X_users = self.interactions_df['customer_encoded'].values
         X_items = self.interactions_df['recipe_encoded'].values
         y = self.interactions_df['rating'].values
 
-        # Additional features
-        X_features = self.recipe_features
+        # Additional features (per-recipe rows gathered per interaction)
+        X_features = self.recipe_features[X_items]
 
         # Train-test split
         X_users_train, X_users_test, X_items_train, X_items_test, X_feat_train, X_feat_test, y_train, y_test = train_test_split(
@@ -438,6 +596,8 @@ class HybridRecommendationSystem:
         )
 
         self.models['neural_cf'] = model
+        # NumPy copy of the weights used for serving
+        self.models['neural_cf_numpy'] = NeuralCFInference.from_keras(model, self.recipe_features)
 
         # Evaluate model
         train_loss = model.evaluate(
@@ -448,61 +608,164 @@ class HybridRecommendationSystem:
         print(
             f"✅ Neural CF - Train Loss: {train_loss[0]:.4f}, Test Loss: {test_loss[0]:.4f}")
 
-    def train_all_models(self):
-        """Train all recommendation models"""
+    def train_all_models(self, models: Optional[List[str]] = None, n_jobs: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Train all recommendation models (or retrain a subset)
+
+        The model groups are independent once the data is preprocessed and
+        run concurrently in worker processes for large datasets (see
+        training_orchestrator.py).
+
+        Args:
+            models: Optional subset of 'collaborative', 'content_based',
+                    'matrix_factorization', 'deep_learning', 'implicit_feedback'
+            n_jobs: Worker processes (default: config 'training_jobs' or all cores)
+
+        Returns:
+            Training summary with per-model wall time, peak memory and model size
+        """
+        from training_orchestrator import TrainingOrchestrator, format_report
+
         print("🎯 Training all recommendation models...")
-        start_time = datetime.now()
+        orchestrator = TrainingOrchestrator(self, n_jobs or self.config.get('training_jobs'))
+        summary = orchestrator.train(models)
+        self.training_report = summary
 
-        self.train_collaborative_filtering()
-        self.train_content_based_filtering()
-        self.train_matrix_factorization()
-        self.train_deep_learning()
+        failed = [group for group in summary['groups'] if group['error']]
+        if failed:
+            raise RuntimeError(f"Training failed for {failed[0]['group']}: {failed[0]['error']}")
 
-        training_time = (datetime.now() - start_time).total_seconds()
-        print(f"✅ All models trained in {training_time:.2f} seconds")
+        print(format_report(summary))
+        print(f"✅ All models trained in {summary['seconds']:.2f} seconds")
 
-    def get_collaborative_recommendations(self, customer_id: str, n_recommendations: int = 10) -> List[RecommendationResult]:
-        """Get recommendations using collaborative filtering"""
-        try:
-            if customer_id not in self.encoders['customer'].classes_:
-                return []
+        self.build_ann_indexes()
+        return summary
 
-            customer_encoded = self.encoders['customer'].transform([customer_id])[
-                0]
+    def build_ann_indexes(self, min_items: Optional[int] = None):
+        """
+        Build the approximate nearest-neighbor indexes used for top-k serving
 
-            # Get user similarities
-            user_similarities = self.models['user_similarity'][customer_encoded]
+        Indexes are built over the MF and implicit-feedback item factors and
+        the recipe content vectors, only for catalogs of at least min_items
+        recipes (config 'ann_min_items'); smaller catalogs are scored exactly.
 
-            # Find similar users
-            similar_users = np.argsort(user_similarities)[
-                ::-1][1:21]  # Top 20 similar users
+        Args:
+            min_items: Optional catalog size threshold overriding the config
+        """
+        if min_items is None:
+            min_items = self.config.get('ann_min_items', 5000)
+        for index_name in ANN_INDEXES:
+            self.models.pop(index_name, None)
 
-            # Get items rated by similar users
-            recommendations = {}
-            user_ratings = self.user_item_matrix.iloc[customer_encoded]
+        n_recipes = self.user_item_matrix.shape[1]
+        if n_recipes < min_items:
+            return
 
-            for similar_user in similar_users:
-                similarity_score = user_similarities[similar_user]
-                if similarity_score < self.config['similarity_threshold']:
-                    continue
+        print(f"🧭 Building ANN indexes over {n_recipes} recipes...")
+        start_time = time.time()
+        factors = self._factor_model()
+        if factors is not None:
+            self.models['ann_mf'] = ANNIndex.from_factor_model(factors)
+        if 'implicit_als' in self.models:
+            self.models['ann_implicit'] = ANNIndex.from_factor_model(self.models['implicit_als'])
+        self.models['ann_content'] = ANNIndex.build(
+            self.content_features.toarray(), metric='cosine')
+
+        built = [index_name for index_name in ANN_INDEXES if index_name in self.models]
+        print(f"✅ ANN indexes built ({', '.join(built)}) in {time.time() - start_time:.2f} seconds")
+
+    def _ann_search(self, index_name: str, query: np.ndarray, customer_encoded: int,
+                    n_recommendations: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Approximate top items (customer's recipes excluded)
+
+        Returns None, so the caller scores exactly, without an index or when
+        the index returns fewer items than the customer has left unseen.
+        """
+        index = self.models.get(index_name)
+        if index is None:
+            return None
+        matrix = self.user_item_matrix
+        seen = matrix.indices[matrix.indptr[customer_encoded]:matrix.indptr[customer_encoded + 1]]
+        ids, scores = index.search(query, n_recommendations, n_probe=self.config.get('ann_n_probe'),
+                                   exclude=[seen])
+        found = ids[0] >= 0
+        if found.sum() < min(n_recommendations, index.n_items - len(seen)):
+            return None
+        return ids[0][found], scores[0][found].astype(np.float64)
+
+    def _factor_top_items(self, factors: FactorModel, index_name: str, customer_encoded: int,
+                          n_recommendations: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top recipes and scores of a factor model, seen recipes excluded (ANN or exact)"""
+        found = self._ann_search(index_name, ANNIndex.factor_queries(factors, [customer_encoded]),
+                                 customer_encoded, n_recommendations)
+        if found is not None:
+            top_items, item_scores = found
+            item_scores += float(factors.user_bias[customer_encoded]) + factors.global_mean
+            if factors.rating_scale is not None:
+                np.clip(item_scores, factors.rating_scale[0], factors.rating_scale[1], out=item_scores)
+            return top_items, item_scores
+
+        # One dot product plus biases over every recipe, seen recipes masked
+        scores = factors.scores(np.array([customer_encoded]))[0].astype(np.float64)
+        matrix = self.user_item_matrix
+        scores[matrix.indices[matrix.indptr[customer_encoded]:matrix.indptr[customer_encoded + 1]]] = -np.inf
+        top_items = top_k(scores, n_recommendations, np.isfinite(scores))
+        return top_items, scores[top_items]
+
+    def _collaborative_scores(self, customer_encoded: int, n_neighbors: int = 20) -> np.ndarray:
+        """
+        User-based CF scores of every recipe for one customer
+
+        score(recipe) = sum over the n_neighbors most similar users (with
+        similarity >= similarity_threshold, read from the user neighbor
+        table) of similarity * rating, computed as one R^T w product.
 
-                similar_user_ratings = self.user_item_matrix.iloc[similar_user]
+        Args:
+            customer_encoded: Row of the customer in the user-item matrix
+            n_neighbors: Similar users taken into account
 
-                for item_idx, rating in similar_user_ratings.items():
-                    # User hasn't rated this item
-                    if rating > 0 and user_ratings[item_idx] == 0:
-                        if item_idx not in recommendations:
-                            recommendations[item_idx] = 0
-                        recommendations[item_idx] += similarity_score * rating
+        Returns:
+            float64 array over recipe_encoded; recipes the customer already
+            rated or no neighbor rated are -inf
+        """
+        matrix = self.user_item_matrix
+        neighbors, similarities = self.models['user_neighbors'].neighbors(
+            customer_encoded, n_neighbors, self.config['similarity_threshold'])
+
+        # Neighbor weights (zero elsewhere) times the ratings: R^T w
+        weights = np.zeros(matrix.shape[0])
+        weights[neighbors] = similarities
+        scores = matrix.T @ weights
+
+        scores[scores <= 0] = -np.inf
+        scores[matrix.indices[matrix.indptr[customer_encoded]:matrix.indptr[customer_encoded + 1]]] = -np.inf
+        return scores
+
+    def _encoded(self, encoder_name: str, value: Any) -> Optional[int]:
+        """Encoded id of a customer/recipe, None if unknown (hash lookup in the ID registry)"""
+        encoder = self.encoders.get(encoder_name)
+        if encoder is None:
+            return None
+        return encoder.get(value)
+
+    def get_collaborative_recommendations(self, customer_id: str, n_recommendations: int = 10) -> List[RecommendationResult]:
+        """Get recommendations using collaborative filtering"""
+        try:
+            customer_encoded = self._encoded('customer', customer_id)
+            if customer_encoded is None:
+                return []
+
+            scores = self._collaborative_scores(customer_encoded)
+            top_items = top_k(scores, n_recommendations, np.isfinite(scores))
 
             # Convert to recommendation results
             results = []
-            for item_idx, score in sorted(recommendations.items(), key=lambda x: x[1], reverse=True)[:n_recommendations]:
-                recipe_name = self.encoders['recipe'].inverse_transform([item_idx])[
-                    0]
+            for item_idx in top_items:
+                score = float(scores[item_idx])
                 results.append(RecommendationResult(
                     recipe_id=str(item_idx),
-                    recipe_name=recipe_name,
+                    recipe_name=self.encoders['recipe'].classes_[item_idx],
                     score=score,
                     confidence=min(score / 5.0, 1.0),
                     method='collaborative_filtering',
@@ -518,43 +781,51 @@ class HybridRecommendationSystem:
     def get_content_based_recommendations(self, customer_id: str, n_recommendations: int = 10) -> List[RecommendationResult]:
         """Get recommendations using content-based filtering"""
         try:
-            # Get user's interaction history
-            user_interactions = self.interactions_df[self.interactions_df['customer_id'] == customer_id]
+            # Get user's interaction history (recipes in their user-item row)
+            customer_encoded = self._encoded('customer', customer_id)
+            if customer_encoded is None:
+                return []
+            matrix = self.user_item_matrix
+            interacted_items = np.sort(
+                matrix.indices[matrix.indptr[customer_encoded]:matrix.indptr[customer_encoded + 1]])
 
-            if len(user_interactions) == 0:
+            if len(interacted_items) == 0:
                 return []
 
-            # Get user's preferred content features
-            user_feature_indices = user_interactions.index.tolist()
-            user_features = self.content_features[user_feature_indices]
+            # User profile: mean content vector of the recipes they interacted with
+            user_profile = np.asarray(
+                self.content_features[interacted_items].mean(axis=0))
 
-            # Calculate user profile (average of liked items)
-            user_profile = np.mean(user_features.toarray(), axis=0)
+            found = self._ann_search('ann_content', user_profile, customer_encoded, n_recommendations)
+            if found is not None:
+                candidates, similarities = found
+                above = similarities > self.config['similarity_threshold']
+                candidates, similarities = candidates[above], similarities[above]
+            else:
+                # Cosine similarity with every recipe in one sparse product
+                all_similarities = cosine_similarity(
+                    user_profile, self.content_features)[0]
+                all_similarities[interacted_items] = 0.0
 
-            # Calculate similarity with all items
-            all_similarities = cosine_similarity(
-                [user_profile], self.content_features.toarray())[0]
+                candidates = np.flatnonzero(
+                    all_similarities > self.config['similarity_threshold'])
+                candidates = candidates[np.argsort(
+                    -all_similarities[candidates], kind='stable')][:n_recommendations]
+                similarities = all_similarities[candidates]
 
-            # Get items user hasn't interacted with
-            interacted_items = set(user_interactions['recipe_encoded'].values)
             recommendations = []
+            for recipe_encoded, similarity in zip(candidates, similarities):
+                similarity = float(similarity)
+                recommendations.append(RecommendationResult(
+                    recipe_id=str(recipe_encoded),
+                    recipe_name=self.encoders['recipe'].classes_[recipe_encoded],
+                    score=similarity,
+                    confidence=similarity,
+                    method='content_based_filtering',
+                    features={'content_similarity': similarity}
+                ))
 
-            for idx, similarity in enumerate(all_similarities):
-                recipe_encoded = self.interactions_df.iloc[idx]['recipe_encoded']
-                if recipe_encoded not in interacted_items and similarity > self.config['similarity_threshold']:
-                    recipe_name = self.interactions_df.iloc[idx]['recipe_name']
-                    recommendations.append(RecommendationResult(
-                        recipe_id=str(recipe_encoded),
-                        recipe_name=recipe_name,
-                        score=similarity,
-                        confidence=similarity,
-                        method='content_based_filtering',
-                        features={'content_similarity': similarity}
-                    ))
-
-            # Sort by score and return top N
-            recommendations.sort(key=lambda x: x.score, reverse=True)
-            return recommendations[:n_recommendations]
+            return recommendations
 
         except Exception as e:
             print(f"⚠️ Error in content-based filtering: {e}")
@@ -563,99 +834,86 @@ class HybridRecommendationSystem:
     def get_matrix_factorization_recommendations(self, customer_id: str, n_recommendations: int = 10) -> List[RecommendationResult]:
         """Get recommendations using matrix factorization"""
         try:
-            recommendations = []
+            factors = self._factor_model()
+            customer_encoded = self._encoded('customer', customer_id)
+            if factors is None or customer_encoded is None:
+                return []
 
-            if SURPRISE_AVAILABLE and 'svd' in self.models:
-                # Get all recipes
-                all_recipes = self.interactions_df['recipe_name'].unique()
-
-                # Get predictions for all recipes
-                for recipe_name in all_recipes:
-                    prediction = self.models['svd'].predict(
-                        customer_id, recipe_name)
-
-                    recommendations.append(RecommendationResult(
-                        recipe_id=recipe_name,
-                        recipe_name=recipe_name,
-                        score=prediction.est,
-                        # Confidence based on distance from neutral rating
-                        confidence=1.0 - abs(prediction.est - 3.0) / 2.0,
-                        method='matrix_factorization_svd',
-                        features={'predicted_rating': prediction.est}
-                    ))
+            top_items, item_scores = self._factor_top_items(
+                factors, 'ann_mf', customer_encoded, n_recommendations)
 
-            elif 'svd_sklearn' in self.models:
-                # Fallback to sklearn SVD
-                if customer_id not in self.encoders['customer'].classes_:
-                    return []
-
-                customer_encoded = self.encoders['customer'].transform([customer_id])[
-                    0]
-                user_factors = self.models['svd_sklearn']['user_factors'][customer_encoded]
-                item_factors = self.models['svd_sklearn']['item_factors']
-
-                # Calculate predictions
-                predictions = np.dot(user_factors, item_factors.T)
-
-                # Get top recommendations
-                top_items = np.argsort(predictions)[::-1][:n_recommendations]
-
-                for item_idx in top_items:
-                    recipe_name = self.encoders['recipe'].inverse_transform([item_idx])[
-                        0]
-                    score = predictions[item_idx]
-
-                    recommendations.append(RecommendationResult(
-                        recipe_id=str(item_idx),
-                        recipe_name=recipe_name,
-                        score=score,
-                        confidence=min(score / 5.0, 1.0),
-                        method='matrix_factorization_sklearn',
-                        features={'predicted_rating': score}
-                    ))
-
-            # Sort by score and return top N
-            recommendations.sort(key=lambda x: x.score, reverse=True)
-            return recommendations[:n_recommendations]
+            surprise_model = factors.source == 'svd'
+            recommendations = []
+            for item_idx, score in zip(top_items, item_scores):
+                score = float(score)
+                recommendations.append(RecommendationResult(
+                    recipe_id=str(item_idx),
+                    recipe_name=self.encoders['recipe'].classes_[item_idx],
+                    score=score,
+                    # Confidence based on distance from neutral rating (surprise) or scaled score
+                    confidence=1.0 - abs(score - 3.0) / 2.0 if surprise_model else min(score / 5.0, 1.0),
+                    method='matrix_factorization_svd' if surprise_model else 'matrix_factorization_sklearn',
+                    features={'predicted_rating': score}
+                ))
+
+            return recommendations
 
         except Exception as e:
             print(f"⚠️ Error in matrix factorization: {e}")
             return []
 
-    def get_deep_learning_recommendations(self, customer_id: str, n_recommendations: int = 10) -> List[RecommendationResult]:
-        """Get recommendations using deep learning"""
+    def get_implicit_feedback_recommendations(self, customer_id: str, n_recommendations: int = 10) -> List[RecommendationResult]:
+        """Get recommendations from the implicit-feedback ALS model"""
         try:
-            if not TENSORFLOW_AVAILABLE or 'neural_cf' not in self.models:
+            factors = self.models.get('implicit_als')
+            customer_encoded = self._encoded('customer', customer_id)
+            if factors is None or customer_encoded is None:
                 return []
 
-            if customer_id not in self.encoders['customer'].classes_:
-                return []
+            top_items, item_scores = self._factor_top_items(
+                factors, 'ann_implicit', customer_encoded, n_recommendations)
+
+            recommendations = []
+            for item_idx, score in zip(top_items, item_scores):
+                score = float(score)
+                recommendations.append(RecommendationResult(
+                    recipe_id=str(item_idx),
+                    recipe_name=self.encoders['recipe'].classes_[item_idx],
+                    score=score,
+                    confidence=min(max(score, 0.0), 1.0),
+                    method='implicit_feedback_als',
+                    features={'preference_score': score}
+                ))
 
-            customer_encoded = self.encoders['customer'].transform([customer_id])[
-                0]
+            return recommendations
 
-            # Get all recipes
-            all_recipe_encoded = list(
-                range(len(self.encoders['recipe'].classes_)))
+        except Exception as e:
+            print(f"⚠️ Error in implicit-feedback recommendations: {e}")
+            return []
 
-            # Prepare input data
-            user_input = np.array([customer_encoded] * len(all_recipe_encoded))
-            item_input = np.array(all_recipe_encoded)
+    def _neural_engine(self) -> Optional[NeuralCFInference]:
+        """NumPy neural CF engine, exported on first use from a loaded Keras model"""
+        if 'neural_cf_numpy' not in self.models and 'neural_cf' in self.models:
+            self.models['neural_cf_numpy'] = NeuralCFInference.from_keras(
+                self.models['neural_cf'], self.recipe_features)
+        return self.models.get('neural_cf_numpy')
 
-            # Get average features for recipes (simplified approach)
-            feature_input = np.tile(
-                np.mean(self.recipe_features, axis=0), (len(all_recipe_encoded), 1))
+    def get_deep_learning_recommendations(self, customer_id: str, n_recommendations: int = 10) -> List[RecommendationResult]:
+        """Get recommendations using deep learning"""
+        try:
+            engine = self._neural_engine()
+            customer_encoded = self._encoded('customer', customer_id)
+            if engine is None or customer_encoded is None:
+                return []
 
-            # Get predictions
-            predictions = self.models['neural_cf'].predict(
-                [user_input, item_input, feature_input], verbose=0)
+            # Predictions for every recipe from the precomputed NumPy forward pass
+            predictions = engine.scores(np.array([customer_encoded]))[0].astype(np.float64)
+            top_items = top_k(predictions, n_recommendations)
+            recipe_names = self.encoders['recipe'].classes_[top_items]
 
-            # Create recommendations
             recommendations = []
-            for i, (recipe_encoded, pred_rating) in enumerate(zip(all_recipe_encoded, predictions.flatten())):
-                recipe_name = self.encoders['recipe'].inverse_transform([recipe_encoded])[
-                    0]
-
+            for recipe_encoded, recipe_name in zip(top_items, recipe_names):
+                pred_rating = float(predictions[recipe_encoded])
                 recommendations.append(RecommendationResult(
                     recipe_id=str(recipe_encoded),
                     recipe_name=recipe_name,
@@ -665,27 +923,32 @@ class HybridRecommendationSystem:
                     features={'neural_prediction': pred_rating}
                 ))
 
-            # Sort by score and return top N
-            recommendations.sort(key=lambda x: x.score, reverse=True)
-            return recommendations[:n_recommendations]
+            return recommendations
 
         except Exception as e:
             print(f"⚠️ Error in deep learning recommendations: {e}")
             return []
 
-    def get_hybrid_recommendations(self, customer_id: str, n_recommendations: int = 10) -> List[RecommendationResult]:
+    def get_hybrid_recommendations(self, customer_id: str, n_recommendations: int = 10,
+                                   pipeline_report: Optional[Dict[str, Any]] = None) -> List[RecommendationResult]:
         """
         Get hybrid recommendations by combining all methods
 
         Args:
             customer_id: ID of the customer
             n_recommendations: Number of recommendations to return
+            pipeline_report: Optional dict filled with the candidate counts and
+                             stage timings of this call (two-stage path only)
 
         Returns:
             List of RecommendationResult objects
         """
         print(f"🎯 Getting hybrid recommendations for customer: {customer_id}")
 
+        customer_encoded = self._encoded('customer', customer_id)
+        if self.config.get('two_stage_retrieval', True) and customer_encoded is not None:
+            return self._two_stage_recommendations(customer_encoded, n_recommendations, pipeline_report)
+
         # Get recommendations from each method
         cf_recs = self.get_collaborative_recommendations(
             customer_id, n_recommendations * 2)
@@ -695,6 +958,8 @@ class HybridRecommendationSystem:
             customer_id, n_recommendations * 2)
         dl_recs = self.get_deep_learning_recommendations(
             customer_id, n_recommendations * 2)
+        ia_recs = self.get_implicit_feedback_recommendations(
+            customer_id, n_recommendations * 2) if 'implicit_feedback' in self.ensemble_weights else []
 
         # Combine recommendations
         all_recommendations = {}
@@ -755,6 +1020,20 @@ class HybridRecommendationSystem:
             all_recommendations[rec.recipe_name]['features'].update(
                 rec.features)
 
+        # Add implicit-feedback recommendations
+        for rec in ia_recs:
+            if rec.recipe_name not in all_recommendations:
+                all_recommendations[rec.recipe_name] = {
+                    'recipe_id': rec.recipe_id,
+                    'recipe_name': rec.recipe_name,
+                    'scores': {},
+                    'features': {}
+                }
+            all_recommendations[rec.recipe_name]['scores']['implicit_feedback'] = rec.score * \
+                self.ensemble_weights['implicit_feedback']
+            all_recommendations[rec.recipe_name]['features'].update(
+                rec.features)
+
         # Calculate final scores
         final_recommendations = []
         for recipe_name, data in all_recommendations.items():
@@ -763,7 +1042,7 @@ class HybridRecommendationSystem:
             num_methods = len(data['scores'])
 
             # Confidence based on number of methods agreeing
-            confidence = num_methods / 4.0  # 4 total methods
+            confidence = num_methods / len(self.ensemble_weights)
 
             final_recommendations.append(RecommendationResult(
                 recipe_id=data['recipe_id'],
@@ -785,101 +1064,289 @@ class HybridRecommendationSystem:
             f"✅ Generated {len(final_recommendations)} hybrid recommendations")
         return final_recommendations[:n_recommendations]
 
-    def evaluate_model(self, test_size: float = 0.2) -> Dict[str, float]:
+    def _candidate_pipeline(self) -> CandidatePipeline:
+        """Two-stage pipeline over the current user-item matrix (rebuilt after training/loading)"""
+        if self.candidate_pipeline is None or self.candidate_pipeline.user_item_matrix is not self.user_item_matrix:
+            self.candidate_pipeline = CandidatePipeline(self)
+        return self.candidate_pipeline
+
+    def _two_stage_recommendations(self, customer_encoded: int, n_recommendations: int,
+                                   pipeline_report: Optional[Dict[str, Any]] = None) -> List[RecommendationResult]:
         """
-        Evaluate the hybrid recommendation system
+        Hybrid recommendations from the candidate pipeline
+
+        Popularity and neighbor generators propose the candidates (config
+        'candidate_counts'); only those are scored by the ensemble methods,
+        fused exactly like the full ensemble. The candidate counts and stage
+        timings of this call go into pipeline_report when one is given.
+        """
+        result = self._candidate_pipeline().recommend(customer_encoded, n_recommendations)
+        if pipeline_report is not None:
+            pipeline_report.update({key: result[key] for key in PIPELINE_REPORT_KEYS})
+
+        recipe_names = self.encoders['recipe'].classes_
+        recommendations = []
+        for rank, recipe_encoded in enumerate(result['recipe_codes']):
+            method_scores = {method: float(scores[rank])
+                             for method, scores in result['method_scores'].items()
+                             if not np.isnan(scores[rank])}
+            recommendations.append(RecommendationResult(
+                recipe_id=str(recipe_encoded),
+                recipe_name=recipe_names[recipe_encoded],
+                score=float(result['scores'][rank]),
+                confidence=len(method_scores) / len(self.ensemble_weights),
+                method='hybrid_ensemble',
+                features={
+                    'method_scores': method_scores,
+                    'num_methods': len(method_scores),
+                    **result['features'][rank]
+                }
+            ))
+
+        if self.config.get('log_pipeline_timings'):
+            stages = ', '.join(f"{stage} {ms:.2f}ms" for stage, ms in result['timings_ms'].items())
+            print(f"⏱️ Candidate pipeline: {stages}")
+        print(f"✅ Generated {len(recommendations)} hybrid recommendations "
+              f"from {result['n_candidates']} candidates")
+        return recommendations
+
+    # ------------------------------------------------------------------
+    # Batch scoring (many customers at once)
+    # ------------------------------------------------------------------
+    def _seen_mask_batch(self, customer_codes: np.ndarray) -> np.ndarray:
+        """(B, n_recipes) boolean mask of the recipes each customer rated"""
+        matrix = self.user_item_matrix
+        block = matrix[customer_codes]
+        seen = np.zeros((len(customer_codes), matrix.shape[1]), dtype=bool)
+        seen[np.repeat(np.arange(len(customer_codes)), np.diff(block.indptr)), block.indices] = True
+        return seen
+
+    def _collaborative_scores_batch(self, customer_codes: np.ndarray, seen: np.ndarray,
+                                    n_neighbors: int = 20) -> np.ndarray:
+        """Batch version of _collaborative_scores: one (B x users) x (users x recipes) product"""
+        table = self.models['user_neighbors']
+        indices = np.asarray(table.indices[customer_codes, :n_neighbors])
+        similarities = np.asarray(table.scores[customer_codes, :n_neighbors], dtype=np.float64)
+        keep = (indices != -1) & (similarities >= self.config['similarity_threshold'])
+
+        weights = sp.csr_matrix(
+            (similarities[keep], (np.nonzero(keep)[0], indices[keep])),
+            shape=(len(customer_codes), self.user_item_matrix.shape[0]))
+        scores = (weights @ self.user_item_matrix).toarray()
+
+        scores[(scores <= 0) | seen] = -np.inf
+        return scores
+
+    def _content_scores_batch(self, seen: np.ndarray) -> np.ndarray:
+        """Cosine similarity between every customer profile and every recipe"""
+        # Profile = mean of the rated recipes' TF-IDF rows (the mean's norm cancels out)
+        profiles = normalize(sp.csr_matrix(seen, dtype=np.float64) @ self.content_features)
+        scores = (profiles @ normalize(self.content_features).T).toarray()
+
+        scores[seen | ~(scores > self.config['similarity_threshold'])] = -np.inf
+        return scores
+
+    def _matrix_factorization_scores_batch(self, customer_codes: np.ndarray) -> Optional[np.ndarray]:
+        """Predicted ratings of every recipe, seen recipes included (None if no MF model is trained)"""
+        factors = self._factor_model()
+        if factors is None:
+            return None
+        return factors.scores(customer_codes).astype(np.float64)
+
+    def _deep_learning_scores_batch(self, customer_codes: np.ndarray) -> Optional[np.ndarray]:
+        """Neural CF predictions for every (customer, recipe) pair of the block"""
+        engine = self._neural_engine()
+        if engine is None:
+            return None
+        return engine.scores(customer_codes).astype(np.float64)
+
+    def _implicit_scores_batch(self, customer_codes: np.ndarray, seen: np.ndarray) -> Optional[np.ndarray]:
+        """Implicit-feedback preference scores, seen recipes masked (None if not trained)"""
+        factors = self.models.get('implicit_als')
+        if factors is None:
+            return None
+        scores = factors.scores(customer_codes).astype(np.float64)
+        scores[seen] = -np.inf
+        return scores
+
+    @staticmethod
+    def _top_rows(scores: np.ndarray, k: int) -> np.ndarray:
+        """
+        Column indices of the k best finite scores of every row, best first
+
+        Ties are broken like the single-customer methods (lower recipe index
+        first). Rows with fewer than k finite scores are padded with -1.
+        """
+        columns = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+        order = np.lexsort((columns, -scores), axis=1)[:, :k]
+        return np.where(np.isfinite(np.take_along_axis(scores, order, axis=1)), order, -1)
+
+    def _method_scores_batch(self, method: str, block: np.ndarray, seen: np.ndarray) -> Optional[np.ndarray]:
+        """(B, n_recipes) scores of one ensemble method, seen recipes -inf (None if not trained)"""
+        if method == 'collaborative':
+            return self._collaborative_scores_batch(block, seen) if 'user_neighbors' in self.models else None
+        if method == 'content_based':
+            return self._content_scores_batch(seen)
+        if method == 'matrix_factorization':
+            scores = self._matrix_factorization_scores_batch(block)
+            if scores is not None:
+                scores[seen] = -np.inf
+            return scores
+        if method == 'deep_learning':
+            return self._deep_learning_scores_batch(block)
+        if method == 'implicit_feedback':
+            return self._implicit_scores_batch(block, seen)
+        return None
+
+    @staticmethod
+    def _fuse_batch(rows: np.ndarray, items: np.ndarray, weighted: np.ndarray, entries: np.ndarray,
+                    method_of: np.ndarray, n_recommendations: int, n_methods: int,
+                    recipe_codes: np.ndarray, fused_scores: np.ndarray, num_methods: np.ndarray,
+                    method_scores: np.ndarray):
+        """
+        Fuse the per-method top lists of a block into the output rows
+
+        items/weighted/entries/method_of are (B, methods x 2n) proposals
+        (-1 = empty slot); a recipe's fused score is the sum of its weighted
+        scores, ties are broken by its first proposal (entry).
+        """
+        n_recipes = int(items.max()) + 1
+        block_rows, slots = np.nonzero(items >= 0)
+        if len(block_rows) == 0:
+            return
+        keys = block_rows * n_recipes + items[block_rows, slots]
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+
+        totals = np.bincount(inverse, weights=weighted[block_rows, slots])
+        counts = np.bincount(inverse)
+        first_entry = np.full(len(unique_keys), np.iinfo(np.int64).max)
+        np.minimum.at(first_entry, inverse, entries[block_rows, slots])
+        per_method = np.full((len(unique_keys), n_methods), np.nan)
+        per_method[inverse, method_of[block_rows, slots]] = weighted[block_rows, slots]
+
+        # Best n per customer: by row, then fused score, then first proposal
+        key_rows = unique_keys // n_recipes
+        order = np.lexsort((first_entry, -totals, key_rows))
+        sorted_rows = key_rows[order]
+        rank = np.arange(len(order)) - np.searchsorted(sorted_rows, sorted_rows, side='left')
+        keep = order[rank < n_recommendations]
+        out_rows, out_ranks = rows[key_rows[keep]], rank[rank < n_recommendations]
+
+        recipe_codes[out_rows, out_ranks] = unique_keys[keep] % n_recipes
+        fused_scores[out_rows, out_ranks] = totals[keep]
+        num_methods[out_rows, out_ranks] = counts[keep]
+        method_scores[out_rows, out_ranks] = per_method[keep]
+
+    def get_hybrid_recommendations_batch(self, customer_ids: List[str], n_recommendations: int = 10,
+                                         batch_size: int = 512) -> Dict[str, Any]:
+        """
+        Hybrid recommendations for many customers at once
+
+        Every method is scored for a block of customers with matrix operations
+        and fused like the full ensemble of get_hybrid_recommendations() with
+        config 'two_stage_retrieval' off: each method contributes its top 2n
+        recipes, weighted by ensemble_weights. The default two-stage path
+        returns the same recipes whenever its candidates include every
+        method's top 2n (e.g. small catalogs).
 
         Args:
-            test_size: Proportion of data to use for testing
+            customer_ids: Customers to score (unknown ids get empty rows)
+            n_recommendations: Recommendations per customer
+            batch_size: Customers scored per block; peak memory is one
+                        block x recipes score matrix (a method at a time)
 
         Returns:
-            Dictionary containing evaluation metrics
+            Dictionary of arrays aligned with customer_ids:
+            - 'recipe_codes': int32 (C, n) recipe_encoded, -1 = no recommendation
+            - 'scores': float32 (C, n) fused scores
+            - 'num_methods': int8 (C, n) methods that proposed the recipe
+            - 'method_scores': float32 (C, n, methods) weighted score per method (NaN = absent)
+            plus 'customer_ids', 'methods' and 'recipe_names' (recipe_encoded -> name)
         """
-        print("📊 Evaluating hybrid recommendation system...")
+        methods = list(self.ensemble_weights.keys())
+        n_customers = len(customer_ids)
+        n_candidates = n_recommendations * 2
+
+        recipe_codes = np.full((n_customers, n_recommendations), -1, dtype=np.int32)
+        fused_scores = np.zeros((n_customers, n_recommendations), dtype=np.float32)
+        num_methods = np.zeros((n_customers, n_recommendations), dtype=np.int8)
+        method_scores = np.full((n_customers, n_recommendations, len(methods)), np.nan, dtype=np.float32)
+
+        codes = np.array([-1 if code is None else code for code in
+                          (self._encoded('customer', customer_id) for customer_id in customer_ids)],
+                         dtype=np.int64)
+        known = np.flatnonzero(codes >= 0)
+        codes = codes[known]
+
+        for start in range(0, len(known), batch_size):
+            rows, block = known[start:start + batch_size], codes[start:start + batch_size]
+            seen = self._seen_mask_batch(block)
+
+            # One method scored at a time; only its top 2n per customer is kept
+            items, weighted, entries, method_of = [], [], [], []
+            for method_position, method in enumerate(methods):
+                scores = self._method_scores_batch(method, block, seen)
+                if scores is None:
+                    continue
+                top = self._top_rows(scores, n_candidates)
+                items.append(top)
+                weighted.append(np.take_along_axis(scores, np.maximum(top, 0), axis=1)
+                                * self.ensemble_weights[method])
+                # Order in which recipes enter the fused list (method, then rank), for ties
+                entries.append(np.broadcast_to(method_position * n_candidates + np.arange(top.shape[1]),
+                                               top.shape))
+                method_of.append(np.full(top.shape, method_position))
+                del scores
+            if not items:
+                continue
 
-        # Split data for evaluation
-        train_data, test_data = train_test_split(
-            self.interactions_df,
-            test_size=test_size,
-            random_state=self.config['random_state']
-        )
+            self._fuse_batch(rows, np.hstack(items), np.hstack(weighted), np.hstack(entries),
+                             np.hstack(method_of), n_recommendations, len(methods),
+                             recipe_codes, fused_scores, num_methods, method_scores)
 
-        # Calculate metrics
-        metrics = {}
+        print(f"✅ Generated batch hybrid recommendations for {len(known)}/{n_customers} customers")
+        return {
+            'customer_ids': np.asarray(customer_ids, dtype=object),
+            'recipe_codes': recipe_codes,
+            'scores': fused_scores,
+            'num_methods': num_methods,
+            'method_scores': method_scores,
+            'methods': methods,
+            'recipe_names': self.encoders['recipe'].classes_
+        }
 
-        # RMSE and MAE for rating prediction
-        predictions = []
-        actuals = []
+    def evaluate_model(self, test_size: float = 0.2, k: int = 10) -> Dict[str, float]:
+        """
+        Evaluate the hybrid recommendation system
 
-        for _, row in test_data.iterrows():
-            customer_id = row['customer_id']
-            actual_rating = row['rating']
+        A fresh system with the same configuration is trained on a train
+        split of the loaded interactions and scored on the held-out rows
+        (see evaluation_engine.py).
 
-            # Get hybrid recommendations for this customer
-            recs = self.get_hybrid_recommendations(customer_id, 1)
+        Args:
+            test_size: Proportion of data to use for testing
+            k: Recommendation list length for precision/recall/NDCG
 
-            if recs:
-                predicted_rating = recs[0].score
-                predictions.append(predicted_rating)
-                actuals.append(actual_rating)
+        Returns:
+            Dictionary containing evaluation metrics
+        """
+        from evaluation_engine import evaluate_hybrid_system
 
-        if predictions:
-            metrics['rmse'] = np.sqrt(mean_squared_error(actuals, predictions))
-            metrics['mae'] = mean_absolute_error(actuals, predictions)
-        else:
-            metrics['rmse'] = float('inf')
-            metrics['mae'] = float('inf')
-
-        # Coverage: percentage of items that can be recommended
-        all_recipes = set(self.interactions_df['recipe_name'].unique())
-        recommended_recipes = set()
-
-        sample_customers = self.interactions_df['customer_id'].unique()[
-            :100]  # Sample for efficiency
-        for customer_id in sample_customers:
-            recs = self.get_hybrid_recommendations(customer_id, 10)
-            recommended_recipes.update([rec.recipe_name for rec in recs])
-
-        metrics['coverage'] = len(recommended_recipes) / len(all_recipes)
-
-        # Diversity: average intra-list diversity
-        diversity_scores = []
-        for customer_id in sample_customers[:20]:  # Sample for efficiency
-            recs = self.get_hybrid_recommendations(customer_id, 10)
-            if len(recs) > 1:
-                # Calculate pairwise diversity (simplified)
-                recipe_features = []
-                for rec in recs:
-                    # Get recipe features
-                    recipe_data = self.interactions_df[self.interactions_df['recipe_name']
-                                                       == rec.recipe_name].iloc[0]
-                    features = [
-                        recipe_data.get('estimated_calories', 0),
-                        recipe_data.get('preparation_time_minutes', 0),
-                        recipe_data.get('ingredient_count', 0),
-                        recipe_data.get('difficulty_code', 0),
-                        recipe_data.get('meal_time_code', 0)
-                    ]
-                    recipe_features.append(features)
-
-                if len(recipe_features) > 1:
-                    # Calculate average pairwise distance
-                    distances = []
-                    for i in range(len(recipe_features)):
-                        for j in range(i+1, len(recipe_features)):
-                            dist = np.linalg.norm(
-                                np.array(recipe_features[i]) - np.array(recipe_features[j]))
-                            distances.append(dist)
-
-                    if distances:
-                        diversity_scores.append(np.mean(distances))
-
-        metrics['diversity'] = np.mean(
-            diversity_scores) if diversity_scores else 0
+        print("📊 Evaluating hybrid recommendation system...")
+
+        # Systems restored from a model artifact re-read their data source only here
+        interactions_df = self.interactions_df
+        if interactions_df is None and self.data_source:
+            interactions_df = read_table(self.data_source)
+
+        metrics = evaluate_hybrid_system(interactions_df, self.config, test_size, k)
 
         print("✅ Evaluation completed")
         print(f"   RMSE: {metrics['rmse']:.4f}")
         print(f"   MAE: {metrics['mae']:.4f}")
+        print(f"   Precision@{k}: {metrics[f'precision@{k}']:.4f}")
+        print(f"   Recall@{k}: {metrics[f'recall@{k}']:.4f}")
+        print(f"   NDCG@{k}: {metrics[f'ndcg@{k}']:.4f}")
         print(f"   Coverage: {metrics['coverage']:.4f}")
         print(f"   Diversity: {metrics['diversity']:.4f}")
 
@@ -893,16 +1360,20 @@ class HybridRecommendationSystem:
         save_data = {
             'config': self.config,
             'encoders': self.encoders,
+            'id_registry': self.id_registry,
             'scalers': self.scalers,
             'ensemble_weights': self.ensemble_weights,
             'user_item_matrix': self.user_item_matrix,
             'models': {}
         }
 
-        # Save specific models (exclude large matrices)
+        # Save specific models (array models as .npy files next to the pickle)
+        save_data['array_models'] = {}
         for model_name, model in self.models.items():
-            if model_name in ['user_similarity', 'item_similarity', 'content_similarity']:
-                continue  # Skip large similarity matrices
+            if isinstance(model, tuple(ARRAY_MODEL_TYPES.values())):
+                model.save(f"{filepath}_{model_name}")
+                save_data['array_models'][model_name] = type(model).__name__
+                continue
             elif model_name == 'neural_cf' and TENSORFLOW_AVAILABLE:
                 # Save neural network separately
                 model.save(f"{filepath}_neural_cf.h5")
@@ -926,14 +1397,29 @@ class HybridRecommendationSystem:
 
             self.config = save_data['config']
             self.encoders = save_data['encoders']
+            self.id_registry = save_data.get('id_registry') or IdRegistry(
+                # Models saved with LabelEncoders: same ids, hashed lookups
+                *(IdMap(self.encoders[name].classes_.tolist()) if name in self.encoders else None
+                  for name in ('customer', 'recipe')))
+            self.encoders = {'customer': self.id_registry.customers, 'recipe': self.id_registry.recipes}
             self.scalers = save_data['scalers']
             self.ensemble_weights = save_data['ensemble_weights']
             self.user_item_matrix = save_data['user_item_matrix']
+            if isinstance(self.user_item_matrix, pd.DataFrame):
+                # Models saved before the CSR matrix
+                self.user_item_matrix = sp.csr_matrix(self.user_item_matrix.values)
             self.models = save_data['models']
 
-            # Load neural network if available
+            # Array models are memory-mapped, not read into memory
+            for model_name, type_name in save_data.get('array_models', {}).items():
+                self.models[model_name] = ARRAY_MODEL_TYPES[type_name].load(
+                    f"{filepath}_{model_name}")
+
+            # Load neural network if available (only needed without a NumPy export)
             neural_cf_path = f"{filepath}_neural_cf.h5"
-            if os.path.exists(neural_cf_path) and TENSORFLOW_AVAILABLE:
+            if ('neural_cf_numpy' not in self.models and os.path.exists(neural_cf_path)
+                    and TENSORFLOW_AVAILABLE):
+                import tensorflow as tf
                 self.models['neural_cf'] = tf.keras.models.load_model(
                     neural_cf_path)
 
@@ -942,12 +1428,35 @@ class HybridRecommendationSystem:
         except Exception as e:
             print(f"❌ Error loading model: {e}")
 
+    def save_artifact(self, directory: str) -> str:
+        """Save the trained system as a memory-mappable artifact directory (see model_artifact.py)"""
+        from model_artifact import save_artifact
+
+        print(f"💾 Saving model artifact to {directory}...")
+        save_artifact(self, directory)
+        print("✅ Model artifact saved successfully")
+        return directory
+
+    def load_artifact(self, directory: str) -> bool:
+        """Restore a trained system from an artifact directory, without the CSV"""
+        from model_artifact import load_artifact
+
+        print(f"📁 Loading model artifact from {directory}...")
+        try:
+            manifest = load_artifact(self, directory)
+            print(f"✅ Model artifact loaded ({manifest['ids']['customers']} customers, "
+                  f"{manifest['ids']['recipes']} recipes, {len(self.models)} models)")
+            return True
+        except Exception as e:
+            print(f"❌ Error loading model artifact: {e}")
+            return False
+
     def get_model_info(self) -> Dict[str, Any]:
         """Get information about the trained models"""
         info = {
             'config': self.config,
             'data_shape': {
-                'interactions': len(self.interactions_df) if self.interactions_df is not None else 0,
+                'interactions': self.n_interactions,
                 'customers': len(self.encoders['customer'].classes_) if 'customer' in self.encoders else 0,
                 'recipes': len(self.encoders['recipe'].classes_) if 'recipe' in self.encoders else 0,
                 'user_item_matrix': self.user_item_matrix.shape if self.user_item_matrix is not None else None
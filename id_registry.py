@@ -0,0 +1,376 @@
+"""
+🪪 COMPACT ID REGISTRY
+======================
+
+One dense int32 id space per entity type, shared by the recommenders, the
+SQLite database and the API layer:
+
+    customers:  'CUS00001' -> 0, 'CUS00002' -> 1, ...
+    recipes:    'Bánh khoái' -> 0, ...
+
+IdMap keeps a hash table (key -> id) and a key array (id -> key), so both
+directions are O(1). It is a drop-in replacement for a fitted LabelEncoder
+(classes_, transform, inverse_transform): a map built from scratch assigns
+ids in sorted key order, exactly like LabelEncoder. New keys are appended
+with the next free id, so existing ids never change.
+
+The registry is persisted as a directory next to the data snapshots:
+- manifest.json: format version, sizes, timestamp
+- customers.npy / recipes.npy: unicode key arrays (position = id)
+
+Every serving process shares one registry (get_id_registry()). New keys
+are registered under the registry file lock (snapshots/id_registry.lock,
+model_artifact.artifact_lock): the keys other processes saved meanwhile
+are merged in first, so no two processes hand out the same id.
+
+Usage:
+    registry = load_id_registry(interactions_df)     # shared registry, extended + saved
+    registry.add('customers', 'CUS01301')            # one new key, saved right away
+    registry.customers.encode('CUS00001')            # 0, or -1 if unknown
+    registry.recipes.decode_many(np.array([3, 1]))   # recipe names
+
+Author: AI Assistant
+Date: June 19, 2025
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+REGISTRY_FORMAT = 'id-registry'
+REGISTRY_VERSION = 1
+REGISTRY_DIR = os.path.join('snapshots', 'id_registry')
+MANIFEST_FILE = 'manifest.json'
+
+UNKNOWN_ID = -1
+ENTITY_COLUMNS = {'customers': 'customer_id', 'recipes': 'recipe_name'}
+
+
+class IdMap:
+    """Bidirectional key <-> dense int32 id mapping (append-only)"""
+
+    def __init__(self, keys: Iterable[Any] = ()):
+        self._keys = []
+        self._index: Dict[Any, int] = {}
+        self._classes: Optional[np.ndarray] = None
+        self._lookup: Optional[pd.Index] = None
+        self._lock = threading.Lock()
+        self.extend(keys, sort=False)
+
+    # ------------------------------------------------------------------
+    # LabelEncoder compatibility
+    # ------------------------------------------------------------------
+    def fit(self, values: Iterable[Any]) -> 'IdMap':
+        """Reset the map to the sorted unique values (LabelEncoder.fit)"""
+        with self._lock:
+            self._keys, self._index = [], {}
+            self._invalidate()
+        self.extend(values, sort=True)
+        return self
+
+    def fit_transform(self, values: Iterable[Any]) -> np.ndarray:
+        values = list(values)
+        return self.fit(values).transform(values)
+
+    def transform(self, values: Iterable[Any]) -> np.ndarray:
+        """Ids of known keys; raises ValueError for unknown keys like LabelEncoder"""
+        ids = self.encode_many(values)
+        if (ids == UNKNOWN_ID).any():
+            raise ValueError("y contains previously unseen labels")
+        return ids
+
+    def inverse_transform(self, ids: Iterable[int]) -> np.ndarray:
+        return self.decode_many(ids)
+
+    @property
+    def classes_(self) -> np.ndarray:
+        """Keys ordered by id (object array, cached until the next add)"""
+        classes = self._classes
+        if classes is None or len(classes) != len(self._keys):
+            classes = np.asarray(self._keys, dtype=object) if self._keys else np.zeros(0, dtype=object)
+            self._classes = classes
+        return classes
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._index
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        return self._index.get(key, default)
+
+    def encode(self, key: Any) -> int:
+        """Id of one key, or -1 if unknown"""
+        return self._index.get(key, UNKNOWN_ID)
+
+    def encode_many(self, keys: Iterable[Any]) -> np.ndarray:
+        """int32 ids of many keys (-1 for unknown keys), one hash probe per key"""
+        lookup = self._lookup
+        if lookup is None or len(lookup) != len(self._keys):
+            lookup = pd.Index(self.classes_)
+            self._lookup = lookup
+        if not isinstance(keys, (pd.Series, pd.Index, np.ndarray)):
+            keys = np.asarray(list(keys), dtype=object)
+        return lookup.get_indexer(keys).astype(np.int32)
+
+    def decode(self, key_id: int, default: Any = None) -> Any:
+        """Key of one id, or default for ids out of range"""
+        return self._keys[key_id] if 0 <= key_id < len(self._keys) else default
+
+    def decode_many(self, ids: Iterable[int]) -> np.ndarray:
+        """Keys of many ids (object array); ids must be valid"""
+        return self.classes_[np.asarray(ids, dtype=np.int64)]
+
+    # ------------------------------------------------------------------
+    # Growth
+    # ------------------------------------------------------------------
+    def add(self, key: Any) -> int:
+        """Id of a key, registering it with the next free id if it is new"""
+        key_id = self._index.get(key)
+        if key_id is not None:
+            return key_id
+        with self._lock:
+            key_id = self._index.get(key)
+            if key_id is None:
+                key_id = len(self._keys)
+                self._keys.append(key)
+                self._index[key] = key_id
+            return key_id
+
+    def extend(self, keys: Iterable[Any], sort: bool = True) -> int:
+        """
+        Register every new key
+
+        Args:
+            keys: Keys to register (duplicates and known keys are ignored)
+            sort: Assign the new ids in sorted key order (otherwise first appearance)
+
+        Returns:
+            Number of keys added
+        """
+        unique = pd.unique(pd.Series(list(keys) if not isinstance(keys, pd.Series) else keys,
+                                     dtype=object).dropna())
+        if sort:
+            unique = sorted(unique)
+        with self._lock:
+            new_keys = [key for key in unique if key not in self._index]
+            for key in new_keys:
+                self._index[key] = len(self._keys)
+                self._keys.append(key)
+        return len(new_keys)
+
+    def _invalidate(self):
+        self._classes = None
+        self._lookup = None
+
+    # ------------------------------------------------------------------
+    # Pickling (the lock and lookup caches are rebuilt)
+    # ------------------------------------------------------------------
+    def __getstate__(self) -> Dict[str, Any]:
+        return {'keys': list(self._keys)}
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__init__(state['keys'])
+
+
+class IdRegistry:
+    """Customer and recipe id maps with directory persistence"""
+
+    directory: Optional[str] = None
+
+    def __init__(self, customers: Optional[IdMap] = None, recipes: Optional[IdMap] = None,
+                 directory: Optional[str] = None):
+        self.customers = customers if customers is not None else IdMap()
+        self.recipes = recipes if recipes is not None else IdMap()
+        # Persisted registry new keys are saved to (None: in-memory only)
+        self.directory = directory
+
+    @classmethod
+    def from_interactions(cls, interactions_df: pd.DataFrame) -> 'IdRegistry':
+        """Fresh registry with sorted ids (identical to LabelEncoder codes)"""
+        registry = cls()
+        registry.sync(interactions_df)
+        return registry
+
+    def sync(self, df: Optional[pd.DataFrame]) -> int:
+        """Register the customers/recipes of a DataFrame, returns the number of new ids"""
+        if df is None or df.empty:
+            return 0
+        added = 0
+        for name, column in ENTITY_COLUMNS.items():
+            if column in df:
+                added += getattr(self, name).extend(df[column])
+        return added
+
+    def stats(self) -> Dict[str, int]:
+        return {'customers': len(self.customers), 'recipes': len(self.recipes)}
+
+    # ------------------------------------------------------------------
+    # Registration shared across processes
+    # ------------------------------------------------------------------
+    def register(self, *frames: Optional[pd.DataFrame]) -> int:
+        """
+        Register the keys of DataFrames and save the new ones
+
+        Args:
+            *frames: DataFrames with customer_id and/or recipe_name columns
+
+        Returns:
+            Number of new ids
+        """
+        if not self.directory:
+            return sum(self.sync(df) for df in frames)
+        with self._locked():
+            added = sum(self.sync(df) for df in frames)
+            if added:
+                self.save(self.directory)
+        return added
+
+    def add(self, name: str, key: Any) -> int:
+        """Id of one customer/recipe key ('customers' or 'recipes'), saved right away if new"""
+        id_map: IdMap = getattr(self, name)
+        key_id = id_map.get(key)
+        if key_id is not None or not self.directory:
+            return key_id if key_id is not None else id_map.add(key)
+        with self._locked():
+            key_id = id_map.get(key)
+            if key_id is None:
+                key_id = id_map.add(key)
+                self.save(self.directory)
+        return key_id
+
+    @contextmanager
+    def _locked(self):
+        """Hold the registry file lock with the keys saved by other processes merged in"""
+        from model_artifact import artifact_lock
+
+        with artifact_lock(self.directory):
+            saved = IdRegistry.load(self.directory)
+            if saved is not None:
+                self._merge(saved)
+            yield
+
+    def _merge(self, saved: 'IdRegistry'):
+        """Append the keys another process saved after the ones this registry knows"""
+        for name in ENTITY_COLUMNS:
+            ours, theirs = getattr(self, name), getattr(saved, name)
+            if len(theirs) <= len(ours):
+                continue
+            if list(theirs.classes_[:len(ours)]) != list(ours.classes_):
+                print(f"⚠️ ID registry {name} in {self.directory} diverged from this process")
+            ours.extend(theirs.classes_[len(ours):], sort=False)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def save(self, directory: str = REGISTRY_DIR) -> str:
+        """Write the registry directory atomically, returns its path"""
+        parent_dir = os.path.dirname(os.path.abspath(directory))
+        os.makedirs(parent_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix='.tmp_id_registry_', dir=parent_dir)
+
+        try:
+            for name in ENTITY_COLUMNS:
+                keys = [str(key) for key in getattr(self, name).classes_]
+                np.save(os.path.join(tmp_dir, f"{name}.npy"),
+                        np.asarray(keys, dtype=str) if keys else np.zeros(0, dtype='<U1'))
+
+            manifest = {
+                'format': REGISTRY_FORMAT,
+                'version': REGISTRY_VERSION,
+                'created_at': datetime.now().isoformat(),
+                **self.stats()
+            }
+            with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+            if os.path.exists(directory):
+                stale_dir = f"{tmp_dir}.old"
+                os.rename(directory, stale_dir)
+                os.rename(tmp_dir, directory)
+                shutil.rmtree(stale_dir, ignore_errors=True)
+            else:
+                os.rename(tmp_dir, directory)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        return directory
+
+    @classmethod
+    def open(cls, directory: Optional[str] = REGISTRY_DIR) -> 'IdRegistry':
+        """Persisted registry of a directory (empty if there is none yet); None: in-memory"""
+        if not directory:
+            return cls()
+        from model_artifact import artifact_lock
+
+        with artifact_lock(directory):
+            registry = cls.load(directory) or cls()
+        registry.directory = directory
+        return registry
+
+    @classmethod
+    def load(cls, directory: str = REGISTRY_DIR) -> Optional['IdRegistry']:
+        """Load a saved registry, None if there is no (compatible) registry"""
+        try:
+            with open(os.path.join(directory, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('format') != REGISTRY_FORMAT or manifest.get('version') != REGISTRY_VERSION:
+                return None
+            maps = {name: IdMap(np.load(os.path.join(directory, f"{name}.npy")).tolist())
+                    for name in ENTITY_COLUMNS}
+            return cls(**maps)
+        except (OSError, ValueError):
+            return None
+
+
+_registry: Optional[IdRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_id_registry() -> IdRegistry:
+    """Shared registry of this process (REGISTRY_DIR, loaded on first use)"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = IdRegistry.open(REGISTRY_DIR)
+    return _registry
+
+
+def set_id_registry(registry: IdRegistry):
+    global _registry
+    _registry = registry
+
+
+def load_id_registry(*frames: Optional[pd.DataFrame], directory: Optional[str] = REGISTRY_DIR) -> IdRegistry:
+    """
+    Registry of a directory, extended with the keys of DataFrames
+
+    The shared registry is extended in place for REGISTRY_DIR (ids handed
+    out by this process are kept); other directories get their own registry.
+
+    Args:
+        *frames: DataFrames with customer_id and/or recipe_name columns
+        directory: Registry directory (None: in-memory only)
+
+    Returns:
+        The (shared) IdRegistry
+    """
+    registry = get_id_registry() if directory == REGISTRY_DIR else IdRegistry.open(directory)
+    try:
+        registry.register(*frames)
+    except OSError as e:
+        print(f"⚠️ Could not save ID registry: {e}")
+    return registry
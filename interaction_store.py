@@ -0,0 +1,278 @@
+"""
+📦 COMPACT INTERACTION STORE
+============================
+
+Array-backed replacement for the per-interaction dictionaries built by
+app.preprocess_data().
+
+Layout:
+- Interactions are sorted by customer; offsets[c]:offsets[c + 1] is the
+  CSR-style slice of customer c in every interaction column
+- Interaction columns: item row/index (int32), rating (float32) and
+  dictionary codes (int32) for interaction type, difficulty and meal time
+- Item table: one row per item_index (first occurrence wins), holding
+  recipe/url/difficulty/meal time codes and the precomputed scores
+
+Everything is built with factorize/argsort/bincount - no Python loop runs
+per interaction.
+
+Author: AI Assistant
+Date: June 19, 2025
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from id_registry import IdMap
+
+MISSING_CODE = -1
+
+
+def _encode(values: pd.Series, sort: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """Dictionary-encode a column into (int32 codes, object dictionary)"""
+    codes, uniques = pd.factorize(values, sort=sort)
+    return codes.astype(np.int32), np.asarray(uniques, dtype=object)
+
+
+def _decode(dictionary: np.ndarray, code: int, default: Any = None) -> Any:
+    return dictionary[code] if code >= 0 else default
+
+
+class InteractionStore:
+    """
+    Compact, read-only interaction store
+
+    Customer-level access:
+        store.has_customer('CUS00001')
+        store.interaction_count('CUS00001')
+        rows = store.user_item_rows('CUS00001')   # rows into the item table
+
+    Item-level access:
+        store.item_record(row)                    # dict like the legacy item_features
+    """
+
+    def __init__(self):
+        # Customers
+        self.customer_ids = np.zeros(0, dtype=object)
+        self.customer_index = IdMap()
+        self.offsets = np.zeros(1, dtype=np.int64)
+
+        # Interaction columns (sorted by customer)
+        self.item_rows = np.zeros(0, dtype=np.int32)
+        self.item_indexes = np.zeros(0, dtype=np.int32)
+        self.ratings = np.zeros(0, dtype=np.float32)
+        self.interaction_type_codes = np.zeros(0, dtype=np.int32)
+        self.difficulty_codes = np.zeros(0, dtype=np.int32)
+        self.meal_time_codes = np.zeros(0, dtype=np.int32)
+        self.recipe_codes = np.zeros(0, dtype=np.int32)
+
+        # Shared dictionaries
+        self.interaction_types = np.zeros(0, dtype=object)
+        self.difficulties = np.zeros(0, dtype=object)
+        self.meal_times = np.zeros(0, dtype=object)
+        self.recipe_names = np.zeros(0, dtype=object)
+        self.recipe_urls = np.zeros(0, dtype=object)
+
+        # Item table (one row per item_index, sorted by item_index)
+        self.item_index = np.zeros(0, dtype=np.int32)
+        self.item_recipe_codes = np.zeros(0, dtype=np.int32)
+        self.item_url_codes = np.zeros(0, dtype=np.int32)
+        self.item_difficulty_codes = np.zeros(0, dtype=np.int32)
+        self.item_meal_time_codes = np.zeros(0, dtype=np.int32)
+        self.item_content_scores = np.zeros(0, dtype=np.float64)
+        self.item_cf_scores = np.zeros(0, dtype=np.float64)
+        self.item_first_rows = np.zeros(0, dtype=np.int64)
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_dataframe(cls, interactions_df: pd.DataFrame) -> 'InteractionStore':
+        """Build the store from an interactions DataFrame"""
+        store = cls()
+        if interactions_df is None or interactions_df.empty:
+            return store
+
+        # Dictionary-encode the string columns once for the whole table
+        customer_codes, store.customer_ids = _encode(
+            interactions_df['customer_id'], sort=True)
+        recipe_codes, store.recipe_names = _encode(interactions_df['recipe_name'])
+        url_codes, store.recipe_urls = _encode(interactions_df['recipe_url'])
+        type_codes, store.interaction_types = _encode(
+            interactions_df['interaction_type'])
+        difficulty_codes, store.difficulties = _encode(
+            interactions_df['difficulty'])
+        meal_time_codes, store.meal_times = _encode(interactions_df['meal_time'])
+
+        item_index_values = interactions_df['item_index'].to_numpy(dtype=np.int64)
+
+        # Item table: first occurrence of every item_index, ordered by item_index
+        unique_items, first_rows = np.unique(item_index_values, return_index=True)
+        store.item_index = unique_items.astype(np.int32)
+        store.item_first_rows = first_rows.astype(np.int64)
+        store.item_recipe_codes = recipe_codes[first_rows]
+        store.item_url_codes = url_codes[first_rows]
+        store.item_difficulty_codes = difficulty_codes[first_rows]
+        store.item_meal_time_codes = meal_time_codes[first_rows]
+        store.item_content_scores = interactions_df['content_score'].to_numpy(
+            dtype=np.float64)[first_rows]
+        store.item_cf_scores = interactions_df['cf_score'].to_numpy(
+            dtype=np.float64)[first_rows]
+
+        # Interaction columns grouped by customer (stable keeps the file order)
+        order = np.argsort(customer_codes, kind='stable')
+        counts = np.bincount(customer_codes, minlength=len(store.customer_ids))
+        store.offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+
+        store.item_indexes = item_index_values[order].astype(np.int32)
+        store.item_rows = np.searchsorted(
+            store.item_index, store.item_indexes).astype(np.int32)
+        store.ratings = interactions_df['rating'].to_numpy(dtype=np.float32)[order]
+        store.interaction_type_codes = type_codes[order]
+        store.difficulty_codes = difficulty_codes[order]
+        store.meal_time_codes = meal_time_codes[order]
+        store.recipe_codes = recipe_codes[order]
+
+        store.customer_index = IdMap(store.customer_ids)
+        return store
+
+    # ------------------------------------------------------------------
+    # Customer access
+    # ------------------------------------------------------------------
+    @property
+    def n_customers(self) -> int:
+        return len(self.customer_ids)
+
+    @property
+    def n_items(self) -> int:
+        return len(self.item_index)
+
+    @property
+    def n_interactions(self) -> int:
+        return len(self.ratings)
+
+    def customer_row(self, customer_id: str) -> int:
+        """Row of a customer, or -1 for unknown customers"""
+        return self.customer_index.encode(customer_id)
+
+    def has_customer(self, customer_id: str) -> bool:
+        return customer_id in self.customer_index
+
+    def customer_slice(self, customer_id: str) -> slice:
+        row = self.customer_row(customer_id)
+        if row < 0:
+            return slice(0, 0)
+        return slice(int(self.offsets[row]), int(self.offsets[row + 1]))
+
+    def interaction_count(self, customer_id: str) -> int:
+        span = self.customer_slice(customer_id)
+        return span.stop - span.start
+
+    def user_item_rows(self, customer_id: str) -> np.ndarray:
+        """Item table rows the customer has interacted with"""
+        return self.item_rows[self.customer_slice(customer_id)]
+
+    def seen_mask(self, customer_id: str) -> np.ndarray:
+        """Boolean mask over the item table of items the customer interacted with"""
+        mask = np.zeros(self.n_items, dtype=bool)
+        mask[self.user_item_rows(customer_id)] = True
+        return mask
+
+    def user_profile(self, customer_id: str) -> Dict[str, Any]:
+        """
+        Summarize a customer's history
+
+        Returns:
+            Dictionary with interaction_count, avg_rating and the most common
+            meal times and difficulties (up to 3 each)
+        """
+        span = self.customer_slice(customer_id)
+        ratings = self.ratings[span]
+
+        return {
+            'interaction_count': len(ratings),
+            'avg_rating': float(ratings.mean()) if len(ratings) else 0.0,
+            'favorite_meal_times': self._most_common(
+                self.meal_time_codes[span], self.meal_times),
+            'top_difficulties': self._most_common(
+                self.difficulty_codes[span], self.difficulties)
+        }
+
+    @staticmethod
+    def _most_common(codes: np.ndarray, dictionary: np.ndarray, n: int = 3) -> List[str]:
+        codes = codes[codes >= 0]
+        if len(codes) == 0:
+            return []
+        counts = np.bincount(codes, minlength=len(dictionary))
+        ranked = np.argsort(-counts, kind='stable')[:n]
+        return [dictionary[code] for code in ranked if counts[code] > 0]
+
+    # ------------------------------------------------------------------
+    # Item access
+    # ------------------------------------------------------------------
+    def item_row(self, item_index: int) -> int:
+        """Row of an item_index in the item table, or -1"""
+        row = int(np.searchsorted(self.item_index, item_index))
+        if row < self.n_items and self.item_index[row] == item_index:
+            return row
+        return -1
+
+    def item_scores(self) -> np.ndarray:
+        """Precomputed cf_score + content_score for every item"""
+        return self.item_cf_scores + self.item_content_scores
+
+    def item_record(self, row: int) -> Dict[str, Any]:
+        """Legacy item_features-style dictionary for one item row"""
+        return {
+            'item_index': int(self.item_index[row]),
+            'recipe_name': _decode(self.recipe_names, self.item_recipe_codes[row]),
+            'recipe_url': _decode(self.recipe_urls, self.item_url_codes[row]),
+            'difficulty': _decode(self.difficulties, self.item_difficulty_codes[row]),
+            'meal_time': _decode(self.meal_times, self.item_meal_time_codes[row]),
+            'content_score': float(self.item_content_scores[row]),
+            'cf_score': float(self.item_cf_scores[row])
+        }
+
+    def recipe_item_rows(self) -> np.ndarray:
+        """
+        Representative item row per recipe code
+
+        The representative is the first item (in file order) carrying the
+        recipe name, matching the legacy item_features scan.
+        """
+        representative = np.full(len(self.recipe_names), MISSING_CODE, dtype=np.int64)
+        if self.n_items == 0:
+            return representative
+
+        # Order items by first appearance in the interaction file
+        order = np.argsort(self.item_first_rows, kind='stable')
+        recipe_codes = self.item_recipe_codes[order]
+        valid = recipe_codes >= 0
+        # Reverse so the earliest item is written last and wins
+        representative[recipe_codes[valid][::-1]] = order[valid][::-1]
+        return representative
+
+    def recipe_rating_stats(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Per recipe code: (rating count, rating sum)"""
+        valid = self.recipe_codes >= 0
+        n_recipes = len(self.recipe_names)
+        counts = np.bincount(self.recipe_codes[valid], minlength=n_recipes)
+        sums = np.bincount(self.recipe_codes[valid],
+                           weights=self.ratings[valid].astype(np.float64),
+                           minlength=n_recipes)
+        return counts, sums
+
+    def memory_usage(self) -> int:
+        """Approximate bytes held by the array columns"""
+        return int(sum(value.nbytes for value in vars(self).values()
+                       if isinstance(value, np.ndarray)))
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        return {
+            'customers': self.n_customers,
+            'items': self.n_items,
+            'interactions': self.n_interactions,
+            'memory_bytes': self.memory_usage()
+        }
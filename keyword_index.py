@@ -0,0 +1,317 @@
+"""
+🔎 KEYWORD RULE INDEX
+=====================
+
+Compiles the keyword filter rules used by the recommendation routes
+(meal time, age group, nutrition type) into boolean masks over the item
+table, once per data load instead of once per request.
+
+A rule matches an item when
+
+    (its recipe name contains one of the keywords  OR  any_of attributes match)
+    AND all_of attributes match
+
+where attributes are item columns of the interaction store (difficulty,
+meal_time). All keywords of all rules are matched in a single pass per
+lowercased recipe name with an Aho-Corasick automaton; each rule then becomes
+a recipe bitmap gathered into item space.
+
+New rules can be added without touching the routes:
+    register_rule('nutrition:high-protein', ['thịt', 'cá', 'trứng', 'đậu'],
+                  description='Giàu đạm')
+or by listing them in keyword_rules.json:
+    {"nutrition:high-protein": {"keywords": ["thịt", "cá"], "description": "Giàu đạm"}}
+
+Author: AI Assistant
+Date: June 19, 2025
+"""
+
+import json
+import os
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+import numpy as np
+
+from interaction_store import InteractionStore
+
+RULES_FILE = 'keyword_rules.json'
+
+# Item attributes a rule can test, mapped to (dictionary, item code column) in the store
+ATTRIBUTE_COLUMNS = {
+    'difficulty': ('difficulties', 'item_difficulty_codes'),
+    'meal_time': ('meal_times', 'item_meal_time_codes')
+}
+
+
+@dataclass
+class FilterRule:
+    """Keyword + attribute filter over recipes"""
+    name: str
+    keywords: List[str] = field(default_factory=list)
+    any_of: Dict[str, List[str]] = field(default_factory=dict)
+    all_of: Dict[str, List[str]] = field(default_factory=dict)
+    description: str = ''
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton returning every pattern found in a text"""
+
+    def __init__(self, patterns: Sequence[str]):
+        self.patterns = list(patterns)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Set[int]] = [set()]
+
+        for pattern_id, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                if char not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(set())
+                    self._goto[state][char] = len(self._goto) - 1
+                state = self._goto[state][char]
+            self._output[state].add(pattern_id)
+
+        # Breadth-first failure links
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] |= self._output[self._fail[next_state]]
+
+    def find(self, text: str) -> Set[int]:
+        """Ids of all patterns occurring in text"""
+        found: Set[int] = set()
+        state = 0
+        for char in text:
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            found |= self._output[state]
+        return found
+
+
+# ----------------------------------------------------------------------
+# Rule registry
+# ----------------------------------------------------------------------
+DEFAULT_RULES = [
+    FilterRule('meal:breakfast', ['sáng', 'điểm tâm'], any_of={'meal_time': ['breakfast']}),
+    FilterRule('meal:lunch', ['trưa'], any_of={'meal_time': ['lunch']}),
+    FilterRule('meal:dinner', ['tối', 'chiều'], any_of={'meal_time': ['dinner']}),
+    FilterRule('difficulty:easy', all_of={'difficulty': ['Dễ']}),
+
+    FilterRule('age:children', ['trứng', 'cháo', 'soup', 'canh', 'bánh', 'sữa', 'rau củ'],
+               any_of={'difficulty': ['Dễ']}),
+    FilterRule('age:teenagers', ['nướng', 'chiên', 'pizza', 'burger', 'mì', 'bánh mì',
+                                 'snack', 'fast'],
+               any_of={'meal_time': ['lunch', 'dinner']}),
+    FilterRule('age:adults', ['salad', 'gỏi', 'nướng', 'xào', 'hầm', 'curry', 'thịt', 'cá', 'tôm'],
+               any_of={'difficulty': ['Trung bình', 'Khó']}),
+    FilterRule('age:elderly', ['canh', 'soup', 'cháo', 'hầm', 'luộc', 'hấp', 'rau', 'cá'],
+               any_of={'meal_time': ['breakfast', 'lunch']},
+               all_of={'difficulty': ['Dễ', 'Trung bình']}),
+
+    FilterRule('nutrition:weight-loss', ['salad', 'gỏi', 'canh', 'soup', 'luộc', 'hấp', 'nướng',
+                                         'thịt nạc', 'rau', 'cá'],
+               any_of={'difficulty': ['Dễ']},
+               description="Giảm cân, ít chất béo, nhiều chất xơ, protein nạc"),
+    FilterRule('nutrition:blood-boost', ['thịt đỏ', 'gan', 'rau dền', 'rau chân vịt', 'đậu',
+                                         'trứng', 'cà chua'],
+               description="Bổ máu, tăng cường sắt, vitamin B12, axit folic"),
+    FilterRule('nutrition:brain-boost', ['cá', 'hạt', 'trứng', 'bơ', 'chocolate', 'óc chó',
+                                         'cà phê'],
+               description="Tăng cường trí não, omega-3, vitamin E, choline"),
+    FilterRule('nutrition:digestive-support', ['cháo', 'soup', 'canh', 'yogurt', 'gừng', 'nghệ',
+                                               'yến mạch'],
+               any_of={'difficulty': ['Dễ']},
+               description="Hỗ trợ tiêu hóa, dễ hấp thụ, kháng viêm")
+]
+
+_rules: Dict[str, FilterRule] = {rule.name: rule for rule in DEFAULT_RULES}
+_rules_version = 0
+_rules_lock = threading.Lock()
+
+
+def register_rule(name: str, keywords: Sequence[str] = (), any_of: Optional[Dict[str, List[str]]] = None,
+                  all_of: Optional[Dict[str, List[str]]] = None, description: str = '') -> FilterRule:
+    """
+    Add or replace a filter rule (compiled indexes pick it up on next use)
+
+    Args:
+        name: Rule name, e.g. 'nutrition:high-protein'
+        keywords: Recipe name keywords (case-insensitive)
+        any_of: Attribute values accepted instead of a keyword hit
+        all_of: Attribute values every match must have
+        description: Human readable focus text
+
+    Returns:
+        The registered rule
+    """
+    global _rules_version
+    for attributes in (any_of or {}, all_of or {}):
+        unknown = set(attributes) - set(ATTRIBUTE_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown rule attributes: {sorted(unknown)}")
+
+    rule = FilterRule(name, [keyword.lower() for keyword in keywords],
+                      dict(any_of or {}), dict(all_of or {}), description)
+    with _rules_lock:
+        _rules[name] = rule
+        _rules_version += 1
+    return rule
+
+
+def load_rules(path: str = RULES_FILE) -> int:
+    """Register every rule listed in a JSON file, returns the number loaded"""
+    if not os.path.exists(path):
+        return 0
+
+    with open(path, 'r', encoding='utf-8') as f:
+        definitions = json.load(f)
+
+    for name, definition in definitions.items():
+        register_rule(name, definition.get('keywords', []), definition.get('any_of'),
+                      definition.get('all_of'), definition.get('description', ''))
+    return len(definitions)
+
+
+def get_rule(name: str) -> Optional[FilterRule]:
+    return _rules.get(name)
+
+
+def list_rules() -> List[Dict[str, Any]]:
+    return [vars(rule).copy() for rule in _rules.values()]
+
+
+# ----------------------------------------------------------------------
+# Compiled index
+# ----------------------------------------------------------------------
+class KeywordIndex:
+    """Per-rule item masks compiled from the rule registry and an InteractionStore"""
+
+    def __init__(self, store: InteractionStore):
+        self.store = store
+        self.recipe_masks: Dict[str, np.ndarray] = {}
+        self.item_masks: Dict[str, np.ndarray] = {}
+        self._compiled_version = -1
+        self._lock = threading.Lock()
+
+    def _compile(self):
+        """Match every rule keyword against every recipe name in one pass"""
+        rules = dict(_rules)
+        version = _rules_version
+
+        patterns = sorted({keyword for rule in rules.values() for keyword in rule.keywords})
+        pattern_ids = {pattern: pattern_id for pattern_id, pattern in enumerate(patterns)}
+        matcher = KeywordMatcher(patterns)
+
+        recipe_names = self.store.recipe_names
+        hits = np.zeros((len(recipe_names), max(len(patterns), 1)), dtype=bool)
+        for recipe_code, name in enumerate(recipe_names):
+            found = matcher.find(str(name).lower())
+            if found:
+                hits[recipe_code, list(found)] = True
+
+        item_recipe_codes = self.store.item_recipe_codes
+        known_recipes = item_recipe_codes >= 0
+
+        recipe_masks, item_masks = {}, {}
+        for name, rule in rules.items():
+            ids = [pattern_ids[keyword] for keyword in rule.keywords]
+            recipe_mask = hits[:, ids].any(axis=1) if ids else np.zeros(len(recipe_names), dtype=bool)
+
+            # Keyword hits gathered from recipe space into item space
+            item_mask = np.zeros(self.store.n_items, dtype=bool)
+            item_mask[known_recipes] = recipe_mask[item_recipe_codes[known_recipes]]
+
+            if rule.any_of:
+                for attribute, values in rule.any_of.items():
+                    item_mask |= self._attribute_mask(attribute, values)
+            elif not rule.keywords:
+                item_mask[:] = True
+            for attribute, values in rule.all_of.items():
+                item_mask &= self._attribute_mask(attribute, values)
+
+            recipe_masks[name] = recipe_mask
+            item_masks[name] = item_mask
+
+        self.recipe_masks, self.item_masks = recipe_masks, item_masks
+        self._compiled_version = version
+
+    def _attribute_mask(self, attribute: str, values: List[str]) -> np.ndarray:
+        dictionary_name, codes_name = ATTRIBUTE_COLUMNS[attribute]
+        dictionary = getattr(self.store, dictionary_name)
+        codes = np.flatnonzero(np.isin(dictionary, values))
+        return np.isin(getattr(self.store, codes_name), codes)
+
+    def _ensure_compiled(self):
+        if self._compiled_version != _rules_version:
+            with self._lock:
+                if self._compiled_version != _rules_version:
+                    self._compile()
+
+    @property
+    def rules_version(self) -> int:
+        """Rule registry version the masks are compiled for (compiles if stale)"""
+        self._ensure_compiled()
+        return self._compiled_version
+
+    def has_rule(self, name: str) -> bool:
+        return name in _rules
+
+    def item_mask(self, name: str) -> Optional[np.ndarray]:
+        """Boolean mask over the item table, None for unknown rules"""
+        self._ensure_compiled()
+        return self.item_masks.get(name)
+
+    def matches(self, name: str, records: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Which recommendation records satisfy a rule
+
+        Args:
+            name: Rule name
+            records: Dictionaries carrying an item_index
+
+        Returns:
+            Boolean array aligned with records (all False for unknown rules)
+        """
+        mask = self.item_mask(name)
+        if mask is None or not records or self.store.n_items == 0:
+            return np.zeros(len(records), dtype=bool)
+
+        item_indexes = np.fromiter((record['item_index'] for record in records),
+                                   dtype=np.int64, count=len(records))
+        rows = np.minimum(np.searchsorted(self.store.item_index, item_indexes),
+                          self.store.n_items - 1)
+        return (self.store.item_index[rows] == item_indexes) & mask[rows]
+
+    def stats(self) -> Dict[str, Any]:
+        self._ensure_compiled()
+        return {
+            'rules': len(self.item_masks),
+            'rules_version': self._compiled_version,
+            'matching_items': {name: int(mask.sum()) for name, mask in self.item_masks.items()}
+        }
+
+
+_index: Optional[KeywordIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_keyword_index(store: InteractionStore) -> KeywordIndex:
+    """Shared index for a store, rebuilt when the store (the recipe catalog) changes"""
+    global _index
+    if _index is None or _index.store is not store:
+        with _index_lock:
+            if _index is None or _index.store is not store:
+                _index = KeywordIndex(store)
+    return _index
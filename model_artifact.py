@@ -0,0 +1,303 @@
+"""
+📦 WARM-START MODEL ARTIFACT
+============================
+
+Versioned, memory-mappable snapshot of a trained HybridRecommendationSystem.
+Loading it restores everything the recommenders need for serving without
+reading or preprocessing the interactions CSV.
+
+Layout of an artifact directory:
+- manifest.json: format version, config, ensemble weights, shapes, model list
+- ids/: customer and recipe ID maps (id_registry.IdRegistry)
+- user_item_matrix.{data,indices,indptr}.npy: CSR ratings (customer x recipe)
+- content_features.{data,indices,indptr}.npy: CSR TF-IDF rows per recipe
+- recipe_features.npy: scaled numerical features per recipe
+- models/<name>.*: array models (neighbor tables, factor arrays, NumPy NCF, ANN indexes)
+- objects.pkl: the remaining small objects (TF-IDF vocabulary, scalers, ...)
+
+Arrays are memory-mapped read-only, so a load costs a few small file reads
+regardless of the number of interactions.
+
+A published artifact (shared by every serving process) is a symlink to one
+immutable version directory:
+
+    hybrid_model_artifact -> hybrid_model_artifact.versions/<generation_id>
+
+Publishing moves the new version next to the others and replaces the
+symlink with a single rename, under an inter-process file lock
+(hybrid_model_artifact.lock), so readers always see a complete artifact and
+concurrent publishers cannot interleave.
+
+Usage:
+    save_artifact(system, 'hybrid_model_artifact')
+    load_artifact(system, 'hybrid_model_artifact')   # instead of load_data()
+    publish_artifact('staging_dir', 'hybrid_model_artifact')
+
+Author: AI Assistant
+Date: June 19, 2025
+"""
+
+import json
+import os
+import pickle
+import shutil
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: publishes are not serialized across processes
+    fcntl = None
+
+import numpy as np
+import scipy.sparse as sp
+
+from id_registry import IdRegistry
+
+ARTIFACT_FORMAT = 'hybrid-model-artifact'
+ARTIFACT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+CSR_PARTS = ['data', 'indices', 'indptr']
+
+# Published versions kept next to the current one (older processes may still map them)
+VERSIONS_SUFFIX = '.versions'
+KEEP_VERSIONS = 3
+
+
+def _save_csr(matrix: sp.csr_matrix, prefix: str):
+    matrix = sp.csr_matrix(matrix)
+    for part in CSR_PARTS:
+        np.save(f"{prefix}.{part}.npy", np.ascontiguousarray(getattr(matrix, part)))
+
+
+def _load_csr(prefix: str, shape, mmap_mode: Optional[str]) -> sp.csr_matrix:
+    data, indices, indptr = (np.load(f"{prefix}.{part}.npy", mmap_mode=mmap_mode) for part in CSR_PARTS)
+    return sp.csr_matrix((data, indices, indptr), shape=tuple(shape), copy=False)
+
+
+def read_manifest(directory: str) -> Optional[Dict[str, Any]]:
+    """Manifest of a compatible artifact, None if missing or of another version"""
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('format') != ARTIFACT_FORMAT or manifest.get('version') != ARTIFACT_VERSION:
+        return None
+    return manifest
+
+
+def save_artifact(system, directory: str) -> str:
+    """
+    Write a trained system as an artifact directory (atomically replaced)
+
+    Args:
+        system: Trained HybridRecommendationSystem
+        directory: Output directory
+
+    Returns:
+        Path of the artifact directory
+    """
+    from hybrid_recommendation_system import ARRAY_MODEL_TYPES
+
+    parent_dir = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix='.tmp_artifact_', dir=parent_dir)
+
+    try:
+        system.id_registry.save(os.path.join(tmp_dir, 'ids'))
+        _save_csr(system.user_item_matrix, os.path.join(tmp_dir, 'user_item_matrix'))
+        _save_csr(system.content_features, os.path.join(tmp_dir, 'content_features'))
+        np.save(os.path.join(tmp_dir, 'recipe_features.npy'),
+                np.ascontiguousarray(system.recipe_features, dtype=np.float64))
+
+        # Array models as .npy files; everything else (small) in one pickle
+        os.makedirs(os.path.join(tmp_dir, 'models'))
+        array_models, objects = {}, {'scalers': system.scalers, 'models': {}}
+        for model_name, model in system.models.items():
+            if isinstance(model, tuple(ARRAY_MODEL_TYPES.values())):
+                model.save(os.path.join(tmp_dir, 'models', model_name))
+                array_models[model_name] = type(model).__name__
+            elif model_name != 'neural_cf':
+                # The Keras model is replaced by its NumPy export (neural_cf_numpy)
+                objects['models'][model_name] = model
+        with open(os.path.join(tmp_dir, 'objects.pkl'), 'wb') as f:
+            pickle.dump(objects, f)
+
+        manifest = {
+            'format': ARTIFACT_FORMAT,
+            'version': ARTIFACT_VERSION,
+            'created_at': datetime.now().isoformat(),
+            'generation_id': system.generation_id,
+            'data_source': system.data_source,
+            'n_interactions': system.n_interactions,
+            'config': system.config,
+            'ensemble_weights': system.ensemble_weights,
+            'user_item_matrix_shape': list(system.user_item_matrix.shape),
+            'content_features_shape': list(system.content_features.shape),
+            'array_models': array_models,
+            'ids': system.id_registry.stats()
+        }
+        # Manifest is written last: an artifact without one is never loaded
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2, default=str)
+
+        _replace_directory(tmp_dir, directory)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    return directory
+
+
+def _replace_directory(source_dir: str, directory: str):
+    """Move a directory into place, replacing a private (unpublished) one"""
+    if os.path.exists(directory):
+        stale_dir = f"{source_dir.rstrip(os.sep)}.old"
+        os.rename(directory, stale_dir)
+        os.rename(source_dir, directory)
+        shutil.rmtree(stale_dir, ignore_errors=True)
+    else:
+        os.rename(source_dir, directory)
+
+
+@contextmanager
+def artifact_lock(path: str, blocking: bool = True):
+    """
+    Exclusive inter-process lock on f"{path}.lock"
+
+    Args:
+        path: Locked path (the lock file is created next to it)
+        blocking: Wait for the lock; with False the context yields False
+                  when another process holds it
+
+    Yields:
+        True if the lock is held
+    """
+    if fcntl is None:
+        yield True
+        return
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(f"{path}.lock", 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def publish_artifact(source_dir: str, directory: str) -> str:
+    """
+    Publish a complete artifact directory as the shared artifact
+
+    The artifact becomes directory.versions/<generation_id> and the
+    directory symlink is switched to it with one atomic rename, under the
+    artifact lock. An artifact older than the published one is discarded,
+    so concurrent publishers always leave the newest generation in place.
+    Arrays memory-mapped from a previous version stay valid.
+
+    Args:
+        source_dir: Artifact written by save_artifact() (e.g. a staging directory)
+        directory: Published artifact path (a symlink to the current version)
+
+    Returns:
+        Path of the published directory
+    """
+    directory = directory.rstrip(os.sep)
+    versions_dir = directory + VERSIONS_SUFFIX
+    manifest = read_manifest(source_dir) or {}
+    version = manifest.get('generation_id') or f"{datetime.now():%Y%m%d-%H%M%S-%f}"
+
+    with artifact_lock(directory):
+        published = read_manifest(directory) or {}
+        if published.get('generation_id') and published['generation_id'] > version:
+            print(f"⚠️ Artifact {version} is older than the published {published['generation_id']}, not published")
+            shutil.rmtree(source_dir, ignore_errors=True)
+            return directory
+
+        os.makedirs(versions_dir, exist_ok=True)
+        target = os.path.join(versions_dir, version)
+        if os.path.exists(target):
+            shutil.rmtree(target)
+        os.rename(source_dir, target)
+
+        # Artifact directory written before versioning: keep it as a version
+        if os.path.isdir(directory) and not os.path.islink(directory):
+            os.rename(directory, os.path.join(versions_dir, f"unversioned-{datetime.now():%Y%m%d-%H%M%S}"))
+
+        link = f"{directory}.{os.getpid()}.link"
+        if os.path.lexists(link):
+            os.remove(link)
+        os.symlink(os.path.relpath(target, os.path.dirname(os.path.abspath(directory))), link)
+        os.replace(link, directory)
+
+        _prune_versions(versions_dir, keep=target)
+    return directory
+
+
+def _prune_versions(versions_dir: str, keep: str):
+    """Remove all but the KEEP_VERSIONS newest versions (never the published one)"""
+    versions = sorted((os.path.join(versions_dir, name) for name in os.listdir(versions_dir)),
+                      key=os.path.getmtime, reverse=True)
+    for version_dir in versions[KEEP_VERSIONS:]:
+        if version_dir != keep:
+            shutil.rmtree(version_dir, ignore_errors=True)
+
+
+def load_artifact(system, directory: str, mmap_mode: Optional[str] = 'r') -> Dict[str, Any]:
+    """
+    Restore a trained system from an artifact directory
+
+    Args:
+        system: HybridRecommendationSystem to fill
+        directory: Artifact directory written by save_artifact()
+        mmap_mode: np.load mmap mode for the arrays (None reads them into memory)
+
+    Returns:
+        The artifact manifest
+    """
+    from hybrid_recommendation_system import ARRAY_MODEL_TYPES
+
+    # One version throughout, even if a new one is published meanwhile
+    directory = os.path.realpath(directory)
+    manifest = read_manifest(directory)
+    if manifest is None:
+        raise FileNotFoundError(f"No compatible model artifact in {directory}")
+
+    registry = IdRegistry.load(os.path.join(directory, 'ids'))
+    if registry is None:
+        raise FileNotFoundError(f"Model artifact {directory} has no ID maps")
+
+    with open(os.path.join(directory, 'objects.pkl'), 'rb') as f:
+        objects = pickle.load(f)
+
+    system.config = manifest['config']
+    system.ensemble_weights = manifest['ensemble_weights']
+    system.data_source = manifest.get('data_source')
+    system.generation_id = manifest.get('generation_id')
+    system.n_interactions = manifest.get('n_interactions', 0)
+    system.id_registry = registry
+    system.encoders = {'customer': registry.customers, 'recipe': registry.recipes}
+    system.scalers = objects['scalers']
+    system.user_item_matrix = _load_csr(os.path.join(directory, 'user_item_matrix'),
+                                        manifest['user_item_matrix_shape'], mmap_mode)
+    system.content_features = _load_csr(os.path.join(directory, 'content_features'),
+                                        manifest['content_features_shape'], mmap_mode)
+    system.recipe_features = np.load(os.path.join(directory, 'recipe_features.npy'), mmap_mode=mmap_mode)
+
+    system.models = objects['models']
+    for model_name, type_name in manifest['array_models'].items():
+        system.models[model_name] = ARRAY_MODEL_TYPES[type_name].load(
+            os.path.join(directory, 'models', model_name), mmap_mode=mmap_mode)
+
+    # Serving reads the arrays above; the raw interactions are not loaded
+    system.interactions_df = None
+    return manifest
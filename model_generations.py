@@ -0,0 +1,216 @@
+"""
+🔄 MODEL GENERATIONS
+====================
+
+Double-buffered model generations for the hybrid recommendation service.
+
+A generation is an immutable snapshot: one trained HybridRecommendationSystem
+plus its id, source and validation report. Requests read the current
+generation once and use it until they finish; retraining builds the next
+generation off the request path, validates it and swaps it in with a single
+reference assignment. In-flight requests keep the old generation alive
+until they complete.
+
+    current ──► generation A (serving)
+    build   ──► generation B (training / loading, validated)
+    swap    ──► current = B; A is released when its last request ends
+
+Only one build runs at a time; a build that fails or does not validate
+leaves the current generation in place.
+
+Usage:
+    manager = GenerationManager()
+    manager.build_and_swap(build_function)            # build + validate + swap
+    generation = manager.current()                    # once per request
+
+Author: AI Assistant
+Date: June 19, 2025
+"""
+
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+# Customers recommended for during validation
+VALIDATION_SAMPLE_SIZE = 5
+
+
+def new_generation_id() -> str:
+    """Sortable, unique generation id, e.g. '20261017-153012-a1b2c3'"""
+    return f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+
+
+@dataclass(frozen=True)
+class ModelGeneration:
+    """One trained system with its identity (never modified once published)"""
+    generation_id: str
+    system: Any
+    source: str                                   # 'artifact', 'legacy_model' or 'trained'
+    created_at: datetime = field(default_factory=datetime.now)
+    artifact_dir: Optional[str] = None            # staging artifact to publish on swap
+    validation: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def age_hours(self) -> float:
+        return (datetime.now() - self.created_at).total_seconds() / 3600
+
+    def info(self) -> Dict[str, Any]:
+        """JSON-friendly summary"""
+        return {
+            'generation_id': self.generation_id,
+            'source': self.source,
+            'created_at': self.created_at.isoformat(),
+            'age_hours': round(self.age_hours, 3),
+            'validation': self.validation
+        }
+
+
+def validate_system(system, sample_size: int = VALIDATION_SAMPLE_SIZE) -> Dict[str, Any]:
+    """
+    Check that a trained system can serve before it is swapped in
+
+    Runs hybrid recommendations for a few customers with interactions, which
+    also builds the lazily created serving objects (MF/NCF exports, candidate
+    pipeline) so the generation is complete before it takes traffic.
+
+    Args:
+        system: Trained HybridRecommendationSystem
+        sample_size: Customers to recommend for
+
+    Returns:
+        Dictionary with 'ok', 'errors', 'customers_checked' and 'seconds'
+    """
+    start_time = time.time()
+    errors: List[str] = []
+    checked = 0
+
+    if system.user_item_matrix is None or not system.models:
+        errors.append('system has no trained models')
+    else:
+        matrix = system.user_item_matrix
+        active = np.flatnonzero(np.diff(matrix.indptr))
+        step = max(len(active) // sample_size, 1)
+        recipe_names = set(system.encoders['recipe'].classes_)
+
+        for row in active[::step][:sample_size]:
+            customer_id = system.encoders['customer'].decode(int(row))
+            try:
+                recommendations = system.get_hybrid_recommendations(customer_id, 5)
+            except Exception as e:
+                errors.append(f"{customer_id}: {e}")
+                continue
+            checked += 1
+            unknown = [rec.recipe_name for rec in recommendations if rec.recipe_name not in recipe_names]
+            if unknown:
+                errors.append(f"{customer_id}: unknown recipes {unknown[:3]}")
+        if len(active) and checked == 0:
+            errors.append('no customer could be served')
+
+    return {
+        'ok': not errors,
+        'errors': errors,
+        'customers_checked': checked,
+        'seconds': round(time.time() - start_time, 3)
+    }
+
+
+class GenerationManager:
+    """Holds the current generation and swaps in validated new ones"""
+
+    def __init__(self, history_size: int = 5):
+        self._current: Optional[ModelGeneration] = None
+        self._swap_lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self.history = deque(maxlen=history_size)
+        self.last_build: Dict[str, Any] = {}
+
+    def current(self) -> Optional[ModelGeneration]:
+        """Generation serving right now (read once per request)"""
+        return self._current
+
+    def is_building(self) -> bool:
+        return self._build_lock.locked()
+
+    def swap(self, generation: ModelGeneration) -> Optional[ModelGeneration]:
+        """Make a generation current, returns the previous one"""
+        with self._swap_lock:
+            previous, self._current = self._current, generation
+            if previous is not None:
+                self.history.appendleft(previous.info())
+        return previous
+
+    def build_and_swap(self, build: Callable[[], Optional[ModelGeneration]],
+                       before_swap: Optional[Callable[[ModelGeneration], None]] = None,
+                       after_swap: Optional[Callable[[ModelGeneration], None]] = None,
+                       validate: bool = True) -> Dict[str, Any]:
+        """
+        Build a generation, validate it and swap it in (in the calling thread)
+
+        Args:
+            build: Returns the new generation (None or an exception = failure)
+            before_swap: Optional hook after validation, before the swap
+                         (e.g. publish the generation's artifact)
+            after_swap: Optional hook after the swap (e.g. clear caches)
+            validate: Run validate_system() before swapping
+
+        Returns:
+            Build report: success, status, generation_id, seconds, validation, error
+        """
+        if not self._build_lock.acquire(blocking=False):
+            return {'success': False, 'status': 'busy', 'error': 'A model generation is already being built'}
+
+        start_time = time.time()
+        report: Dict[str, Any] = {'started_at': datetime.now().isoformat()}
+        try:
+            generation = build()
+            if generation is None:
+                raise RuntimeError('build returned no generation')
+
+            if validate:
+                generation = replace(generation, validation=validate_system(generation.system))
+                if not generation.validation['ok']:
+                    raise RuntimeError(f"validation failed: {'; '.join(generation.validation['errors'][:3])}")
+
+            if before_swap is not None:
+                before_swap(generation)
+            previous = self.swap(generation)
+            if after_swap is not None:
+                after_swap(generation)
+
+            report.update({
+                'success': True,
+                'status': 'swapped',
+                'generation_id': generation.generation_id,
+                'previous_generation_id': previous.generation_id if previous else None,
+                'validation': generation.validation
+            })
+            print(f"🔄 Model generation {generation.generation_id} is now serving")
+        except Exception as e:
+            current = self._current
+            report.update({
+                'success': False,
+                'status': 'failed',
+                'error': str(e),
+                'generation_id': current.generation_id if current else None
+            })
+            print(f"❌ Model generation build failed: {e}")
+        finally:
+            report['seconds'] = round(time.time() - start_time, 3)
+            self.last_build = report
+            self._build_lock.release()
+        return report
+
+    def status(self) -> Dict[str, Any]:
+        current = self._current
+        return {
+            'current': current.info() if current else None,
+            'building': self.is_building(),
+            'last_build': self.last_build,
+            'history': list(self.history)
+        }
@@ -0,0 +1,122 @@
+"""
+🧭 TOP-K NEIGHBOR TABLES
+========================
+
+Truncated similarity tables for the hybrid recommender: instead of a dense
+N x N cosine matrix, every row keeps only its K most similar rows.
+
+    table.indices   int32   (N, K)   neighbor rows, best first, -1 = empty slot
+    table.scores    float32 (N, K)   cosine similarities, 0.0 for empty slots
+
+Similarities are computed one block of rows at a time, so building a table
+needs O(block_size x N) memory and the result is O(N x K) - linear in the
+number of users or recipes.
+
+Tables are persisted as two .npy files and can be loaded memory-mapped:
+    table = build_neighbor_table(user_item_matrix, k=50)
+    table.save('hybrid_recommendation_model.pkl_user_neighbors')
+    table = NeighborTable.load('hybrid_recommendation_model.pkl_user_neighbors')
+
+Author: AI Assistant
+Date: June 19, 2025
+"""
+
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.preprocessing import normalize
+
+EMPTY_NEIGHBOR = -1
+
+
+@dataclass
+class NeighborTable:
+    """Top-K neighbors (indices + similarities) of every row"""
+    indices: np.ndarray
+    scores: np.ndarray
+
+    @property
+    def n_rows(self) -> int:
+        return self.indices.shape[0]
+
+    @property
+    def k(self) -> int:
+        return self.indices.shape[1]
+
+    def neighbors(self, row: int, k: Optional[int] = None,
+                  min_score: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Neighbors of one row, best first
+
+        Args:
+            row: Row to look up
+            k: Optional cap on the number of neighbors
+            min_score: Optional minimum similarity
+
+        Returns:
+            (int32 neighbor rows, float32 similarities) without empty slots
+        """
+        indices, scores = self.indices[row, :k], self.scores[row, :k]
+        keep = indices != EMPTY_NEIGHBOR
+        if min_score is not None:
+            keep &= scores >= min_score
+        return indices[keep], scores[keep]
+
+    def save(self, prefix: str):
+        """Write <prefix>.indices.npy and <prefix>.scores.npy"""
+        np.save(f"{prefix}.indices.npy", np.ascontiguousarray(self.indices))
+        np.save(f"{prefix}.scores.npy", np.ascontiguousarray(self.scores))
+
+    @classmethod
+    def load(cls, prefix: str, mmap_mode: Optional[str] = 'r') -> 'NeighborTable':
+        """Load a saved table (memory-mapped read-only by default)"""
+        return cls(np.load(f"{prefix}.indices.npy", mmap_mode=mmap_mode),
+                   np.load(f"{prefix}.scores.npy", mmap_mode=mmap_mode))
+
+
+def build_neighbor_table(matrix, k: int, block_size: int = 1024) -> NeighborTable:
+    """
+    Cosine top-K neighbors of every row of a (sparse or dense) matrix
+
+    A row is never its own neighbor; neighbors with a similarity <= 0 are
+    left as empty slots.
+
+    Args:
+        matrix: (N, D) feature matrix, e.g. the CSR user-item matrix
+        k: Neighbors kept per row
+        block_size: Rows per similarity block
+
+    Returns:
+        NeighborTable with (N, min(k, N - 1)) arrays
+    """
+    rows = sp.csr_matrix(matrix, dtype=np.float64) if sp.issparse(matrix) \
+        else np.asarray(matrix, dtype=np.float64)
+    rows = normalize(rows)
+    n_rows = rows.shape[0]
+    k = max(min(int(k), n_rows - 1), 0)
+
+    indices = np.full((n_rows, k), EMPTY_NEIGHBOR, dtype=np.int32)
+    scores = np.zeros((n_rows, k), dtype=np.float32)
+    if k == 0:
+        return NeighborTable(indices, scores)
+
+    for start in range(0, n_rows, block_size):
+        stop = min(start + block_size, n_rows)
+        block = rows[start:stop] @ rows.T
+        block = block.toarray() if sp.issparse(block) else np.asarray(block)
+        block[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+
+        # k best per row, then sorted best first
+        top = np.sort(np.argpartition(-block, k - 1, axis=1)[:, :k], axis=1)
+        top_scores = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        similar = top_scores > 0
+        indices[start:stop] = np.where(similar, top, EMPTY_NEIGHBOR)
+        scores[start:stop] = np.where(similar, top_scores, 0.0)
+
+    return NeighborTable(indices, scores)
@@ -0,0 +1,143 @@
+"""
+🧠 NUMPY NEURAL CF INFERENCE
+============================
+
+TensorFlow-free inference for the neural collaborative filtering model
+trained by HybridRecommendationSystem.train_deep_learning():
+
+    [user_embedding | item_embedding | recipe_features] -> Dense(128, relu)
+        -> Dense(64, relu) -> Dense(32, relu) -> Dense(1)
+
+The first Dense layer is split by input block. Its item side
+(item_embedding @ W_item + features @ W_features + b) and its user side
+(user_embedding @ W_user) are precomputed once, so scoring B users against
+all recipes is one broadcast add plus three small matmuls:
+
+    h1 = relu(user_pre[users][:, None, :] + item_pre[None, :, :])
+
+Weights are exported from the Keras model once after training and saved as
+a single .npz file; serving only needs NumPy.
+
+Usage:
+    engine = NeuralCFInference.from_keras(keras_model, recipe_features)
+    scores = engine.scores(np.array([customer_encoded]))   # (1, n_recipes)
+    engine.save('hybrid_recommendation_model.pkl_neural_cf_numpy')
+
+Author: AI Assistant
+Date: June 19, 2025
+"""
+
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+ACTIVATIONS: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0, out=x),
+    'sigmoid': lambda x: 1.0 / (1.0 + np.exp(-x)),
+    'tanh': np.tanh
+}
+
+
+@dataclass
+class NeuralCFInference:
+    """Precomputed NumPy forward pass of the neural CF model"""
+    user_pre: np.ndarray                                   # (n_users, h1) user side of layer 1
+    item_pre: np.ndarray                                   # (n_items, h1) item side + bias of layer 1
+    layers: List[Tuple[np.ndarray, np.ndarray, str]]       # (kernel, bias, activation) after layer 1
+    first_activation: str = 'relu'
+
+    @classmethod
+    def from_weights(cls, user_embeddings: np.ndarray, item_embeddings: np.ndarray,
+                     item_features: np.ndarray,
+                     dense_layers: List[Tuple[np.ndarray, np.ndarray, str]]) -> 'NeuralCFInference':
+        """
+        Build the engine from raw weights
+
+        Args:
+            user_embeddings: (n_users, d_user) embedding table
+            item_embeddings: (n_items, d_item) embedding table
+            item_features: (n_items, n_features) features fed with every item
+            dense_layers: (kernel, bias, activation) of every Dense layer in order;
+                          the first kernel's rows follow the [user | item | features] order
+
+        Returns:
+            NeuralCFInference
+        """
+        kernel, bias, activation = dense_layers[0]
+        d_user, d_item = user_embeddings.shape[1], item_embeddings.shape[1]
+        w_user = kernel[:d_user]
+        w_item = kernel[d_user:d_user + d_item]
+        w_features = kernel[d_user + d_item:]
+
+        user_pre = user_embeddings.astype(np.float32) @ w_user.astype(np.float32)
+        item_pre = (item_embeddings.astype(np.float32) @ w_item.astype(np.float32)
+                    + item_features.astype(np.float32) @ w_features.astype(np.float32)
+                    + bias.astype(np.float32))
+        layers = [(k.astype(np.float32), b.astype(np.float32), a) for k, b, a in dense_layers[1:]]
+        return cls(user_pre, item_pre, layers, activation)
+
+    @classmethod
+    def from_keras(cls, model, item_features: np.ndarray) -> 'NeuralCFInference':
+        """
+        Export a trained Keras neural CF model (no TensorFlow import needed here)
+
+        Args:
+            model: Keras model with 'user_embedding' / 'item_embedding' layers
+            item_features: (n_items, n_features) recipe features used in training
+
+        Returns:
+            NeuralCFInference
+        """
+        user_embeddings = model.get_layer('user_embedding').get_weights()[0]
+        item_embeddings = model.get_layer('item_embedding').get_weights()[0]
+        dense_layers = []
+        for layer in model.layers:
+            if type(layer).__name__ == 'Dense':
+                kernel, bias = layer.get_weights()
+                dense_layers.append((kernel, bias, layer.get_config().get('activation', 'linear')))
+        return cls.from_weights(user_embeddings, item_embeddings, item_features, dense_layers)
+
+    @property
+    def n_items(self) -> int:
+        return self.item_pre.shape[0]
+
+    def scores(self, user_rows: np.ndarray, item_rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Predicted ratings for a block of users
+
+        Args:
+            user_rows: Encoded customer ids
+            item_rows: Optional encoded recipe ids (default: all recipes)
+
+        Returns:
+            float32 (len(user_rows), n_items or len(item_rows))
+        """
+        item_pre = self.item_pre if item_rows is None else self.item_pre[item_rows]
+        hidden = self.user_pre[np.asarray(user_rows, dtype=np.int64)][:, None, :] + item_pre[None, :, :]
+        hidden = ACTIVATIONS[self.first_activation](hidden)
+        for kernel, bias, activation in self.layers:
+            hidden = ACTIVATIONS[activation](hidden @ kernel + bias)
+        return hidden[..., 0]
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def save(self, prefix: str):
+        """Write every array to <prefix>.npz"""
+        arrays = {'user_pre': self.user_pre, 'item_pre': self.item_pre,
+                  'activations': np.array([self.first_activation] + [a for _, _, a in self.layers])}
+        for position, (kernel, bias, _) in enumerate(self.layers):
+            arrays[f'kernel_{position}'] = kernel
+            arrays[f'bias_{position}'] = bias
+        np.savez(f"{prefix}.npz", **arrays)
+
+    @classmethod
+    def load(cls, prefix: str, mmap_mode: Optional[str] = None) -> 'NeuralCFInference':
+        """Load a saved engine (the .npz is small and read into memory)"""
+        with np.load(f"{prefix}.npz") as data:
+            activations = [str(activation) for activation in data['activations']]
+            layers = [(data[f'kernel_{position}'], data[f'bias_{position}'], activation)
+                      for position, activation in enumerate(activations[1:])]
+            return cls(data['user_pre'], data['item_pre'], layers, activations[0])
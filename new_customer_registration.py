@@ -16,6 +16,11 @@ import os
 from datetime import datetime
 import uuid
 import re
+from data_snapshot import read_table
+from sampling import gumbel_top_k, make_rng
+from id_registry import get_id_registry
+from recipe_catalog import get_recipe_catalog, int_value
+from popularity_index import age_group_of, get_popularity_index
 
 # Import hybrid recommendation system
 try:
@@ -132,7 +137,7 @@ def save_customer_to_csv(customer_data, filename='customers_data.csv'):
     try:
         # Load existing data or create new DataFrame
         if os.path.exists(filename):
-            df = pd.read_csv(filename)
+            df = read_table(filename)
         else:
             df = pd.DataFrame()
 
@@ -142,6 +147,9 @@ def save_customer_to_csv(customer_data, filename='customers_data.csv'):
 
         # Save to CSV
         df.to_csv(filename, index=False, encoding='utf-8')
+
+        # Rebuild the snapshot so readers keep using it instead of the CSV
+        read_table(filename, refresh=True)
         return True
 
     except Exception as e:
@@ -149,11 +157,17 @@ def save_customer_to_csv(customer_data, filename='customers_data.csv'):
         return False
 
 
-def get_initial_recommendations(customer_data, randomize=False):
+# Interaction columns used for filtering and rating aggregation (details come from the catalog)
+RECOMMENDATION_COLUMNS = ['customer_id', 'recipe_name', 'rating',
+                          'nutrition_category', 'meal_time', 'estimated_price_vnd']
+
+
+def get_initial_recommendations(customer_data, randomize=False, rng=None):
     """Get initial recommendations for new customer based on profile"""
     try:
-        # Load interactions data to find similar customers
-        interactions_df = pd.read_csv('interactions_enhanced_final.csv')
+        # Load only the interaction columns the filters and ratings need
+        interactions_df = read_table('interactions_enhanced_final.csv',
+                                     columns=RECOMMENDATION_COLUMNS)
 
         recommendations = []        # Basic demographic-based recommendations
         age = int(customer_data.get('age', 25))
@@ -281,28 +295,28 @@ def get_initial_recommendations(customer_data, randomize=False):
 
         # Add randomization if requested
         if randomize:
-            # Get top 20 recipes and randomize selection
+            # Get top 20 recipes and randomly pick 5 of them (uniform weights)
             top_recipes = recipe_ratings.head(20)
-            recipe_ratings = top_recipes.sample(frac=1).reset_index(drop=True)
+            picks = gumbel_top_k(np.ones(len(top_recipes)), 5, make_rng(rng))
+            recipe_ratings = top_recipes.iloc[picks].reset_index(drop=True)
 
-        # Get top 5 recommendations
-        final_filtered_df = budget_filtered_df if budget_range and budget_range != 'medium' else meal_filtered_df
+        # Get top 5 recommendations, details from the shared recipe catalog
+        catalog = get_recipe_catalog()
         for _, row in recipe_ratings.head(5).iterrows():
             recipe_name = row['recipe_name']
-            recipe_info = final_filtered_df[final_filtered_df['recipe_name']
-                                            == recipe_name].iloc[0]
+            recipe_info = catalog.details(recipe_name) or {}
 
             recommendations.append({
                 'recipe_name': recipe_name,
                 'avg_rating': round(row['avg_rating'], 2),
                 'rating_count': int(row['rating_count']),
                 'nutrition_category': recipe_info.get('nutrition_category', 'balanced'),
-                'estimated_calories': int(recipe_info.get('estimated_calories', 0)),
-                'preparation_time_minutes': int(recipe_info.get('preparation_time_minutes', 0)),
+                'estimated_calories': int_value(recipe_info.get('estimated_calories')),
+                'preparation_time_minutes': int_value(recipe_info.get('preparation_time_minutes')),
                 'difficulty': recipe_info.get('difficulty', 'Dễ'),
                 'meal_time': recipe_info.get('meal_time', 'lunch'),
                 'recipe_url': recipe_info.get('recipe_url', ''),
-                'estimated_price_vnd': int(recipe_info.get('estimated_price_vnd', 0))
+                'estimated_price_vnd': int_value(recipe_info.get('estimated_price_vnd'))
             })
 
         return recommendations
@@ -367,11 +381,19 @@ def add_new_customer_routes(app):
                         'success': False,
                         'error': 'Không thể lưu thông tin khách hàng'
                     }), 500
+                # Dense id right away, saved to the registry shared by every worker
+                get_id_registry().add('customers', customer_id)
+                # Cold-start leaderboards of the customer's region and age group
+                popularity_index = get_popularity_index()
+                if popularity_index is not None:
+                    popularity_index.register_customer(
+                        customer_id, region=customer_data['location'] or None,
+                        age_group=age_group_of(customer_data['age']))
 
             # Get recommendations
             randomize = data.get('randomize', False)
             initial_recommendations = get_initial_recommendations(
-                customer_data, randomize=randomize)
+                customer_data, randomize=randomize, rng=make_rng(data.get('timestamp')))
 
             return jsonify({
                 'success': True,
@@ -403,7 +425,7 @@ def add_new_customer_routes(app):
 
             # Check in customers CSV
             if os.path.exists('customers_data.csv'):
-                df = pd.read_csv('customers_data.csv')
+                df = read_table('customers_data.csv')
                 exists = email in df['email'].str.lower().values
                 return jsonify({'exists': exists})
 
@@ -417,7 +439,7 @@ def add_new_customer_routes(app):
         """Get customer information"""
         try:
             if os.path.exists('customers_data.csv'):
-                df = pd.read_csv('customers_data.csv')
+                df = read_table('customers_data.csv')
                 customer = df[df['customer_id'] == customer_id]
 
                 if not customer.empty:
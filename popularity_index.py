@@ -0,0 +1,390 @@
+"""
+🏆 POPULARITY INDEX
+===================
+
+Precomputed popularity leaderboards for cold-start recommendations.
+
+Per recipe the index keeps the rating count and rating sum - globally and per
+customer segment (region, age_group). From those it keeps pre-sorted
+leaderboards (arrays of recipe codes) for every feature type:
+
+    None (all), 'breakfast', 'lunch', 'dinner', 'easy'
+
+A cold-start request becomes a slice of one of these arrays. A new
+interaction updates the counters of the segments it touches and moves the
+one rated recipe within their leaderboards (no re-sort); leaderboards are
+replaced, never modified, and read under the index lock.
+
+Recorded interactions only live in the memory of the process that received
+them: they are not written to the interactions CSV, so every gunicorn worker
+keeps its own counters and all of them start again from the CSV on restart.
+
+Feature types are the compiled keyword_index rules ('meal:breakfast', ...,
+'difficulty:easy') evaluated on each recipe's representative item, so rules
+registered at runtime or in keyword_rules.json apply to cold-start traffic
+too; the leaderboards are re-ranked when the rule registry changes.
+
+Usage:
+    index = PopularityIndex.from_store(interaction_store, customers_df)
+    index.top('breakfast', count=5)                         # global leaderboard
+    index.top('easy', count=5, region='Đà Nẵng')            # segment first, then global
+    index.register_customer('CUS01301', region='Huế', age_group=age_group_of(29))
+    index.record_interaction('CUS00001', 'Bánh khoái', 4.5)  # incremental update
+
+app.py publishes its index with set_popularity_index(); registration and
+the interaction route update it through get_popularity_index().
+
+Author: AI Assistant
+Date: June 19, 2025
+"""
+
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from id_registry import IdMap
+from interaction_store import InteractionStore
+from keyword_index import KeywordIndex, get_keyword_index
+
+FEATURE_TYPES = [None, 'breakfast', 'lunch', 'dinner', 'easy']
+SEGMENT_FIELDS = ['region', 'age_group']
+
+# Feature type -> keyword_index rule
+FEATURE_RULES = {
+    'breakfast': 'meal:breakfast',
+    'lunch': 'meal:lunch',
+    'dinner': 'meal:dinner',
+    'easy': 'difficulty:easy'
+}
+
+# Customer age_group buckets (as in customers_data.csv)
+AGE_GROUPS = [(18, 24, '18-24'), (25, 34, '25-34'), (35, 44, '35-44'),
+              (45, 54, '45-54'), (55, 64, '55-64')]
+OLDEST_AGE_GROUP = '65+'
+
+GLOBAL_SEGMENT = None
+SegmentKey = Optional[Tuple[str, str]]
+
+
+def age_group_of(age: Any) -> Optional[str]:
+    """age_group bucket of an age (None when unknown or under 18)"""
+    try:
+        age = int(age)
+    except (TypeError, ValueError):
+        return None
+    for low, high, age_group in AGE_GROUPS:
+        if low <= age <= high:
+            return age_group
+    return OLDEST_AGE_GROUP if age > AGE_GROUPS[-1][1] else None
+
+
+def popularity_scores(counts: np.ndarray, sums: np.ndarray) -> np.ndarray:
+    """avg_rating * (1 + 0.1 * interaction_count), 0 for recipes without ratings"""
+    avg_ratings = np.divide(sums, counts, out=np.zeros(len(counts)), where=counts > 0)
+    return avg_ratings * (1 + counts * 0.1)
+
+
+class PopularityIndex:
+    """Per-recipe popularity counters with pre-sorted leaderboards"""
+
+    def __init__(self, recipe_names: np.ndarray, recipe_records: List[Optional[Dict[str, Any]]],
+                 representative_items: np.ndarray, keyword_index: KeywordIndex):
+        self.recipe_names = recipe_names
+        self.recipe_index = IdMap(recipe_names)
+        self.recipe_records = recipe_records
+        self.representative_items = representative_items
+        self.keyword_index = keyword_index
+        self.feature_masks = self._build_feature_masks()
+        self._rules_version = keyword_index.rules_version
+
+        # Segment key -> per-recipe counters and popularity scores
+        self.counts: Dict[SegmentKey, np.ndarray] = {}
+        self.sums: Dict[SegmentKey, np.ndarray] = {}
+        self.scores: Dict[SegmentKey, np.ndarray] = {}
+        # (segment key, feature type) -> recipe codes sorted by popularity
+        self.leaderboards: Dict[Tuple[SegmentKey, Optional[str]], np.ndarray] = {}
+        # customer_id -> {'region': ..., 'age_group': ...}
+        self.customer_segments: Dict[str, Dict[str, str]] = {}
+
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_store(cls, store: InteractionStore, customers_df: Optional[pd.DataFrame] = None,
+                   keyword_index: Optional[KeywordIndex] = None) -> 'PopularityIndex':
+        """
+        Build the index from the interaction store
+
+        Args:
+            store: Interaction store built by app.preprocess_data()
+            customers_df: Optional customer table with region/age_group columns
+            keyword_index: Compiled filter rules of the store (default: the shared index)
+
+        Returns:
+            PopularityIndex with every leaderboard ranked
+        """
+        n_recipes = len(store.recipe_names)
+        representative_items = store.recipe_item_rows()
+
+        # Recipe details taken from the representative item of each recipe
+        recipe_records: List[Optional[Dict[str, Any]]] = [None] * n_recipes
+        for recipe_code in np.flatnonzero(representative_items >= 0):
+            record = store.item_record(representative_items[recipe_code])
+            del record['content_score'], record['cf_score']
+            recipe_records[recipe_code] = record
+
+        index = cls(store.recipe_names, recipe_records, representative_items,
+                    keyword_index or get_keyword_index(store))
+
+        counts, sums = store.recipe_rating_stats()
+        index.counts[GLOBAL_SEGMENT] = counts.astype(np.int64)
+        index.sums[GLOBAL_SEGMENT] = sums.astype(np.float64)
+
+        if customers_df is not None and not customers_df.empty and 'customer_id' in customers_df:
+            index._build_segments(store, customers_df)
+
+        for segment_key in index.counts:
+            index._rank(segment_key)
+        return index
+
+    def _build_feature_masks(self) -> Dict[Optional[str], np.ndarray]:
+        """Boolean mask over recipe codes for every feature type (rule mask of the representative item)"""
+        present = self.representative_items >= 0
+        item_rows = np.maximum(self.representative_items, 0)
+
+        masks: Dict[Optional[str], np.ndarray] = {None: present}
+        for feature_type, rule_name in FEATURE_RULES.items():
+            item_mask = self.keyword_index.item_mask(rule_name)
+            if item_mask is None or len(item_mask) == 0:
+                masks[feature_type] = np.zeros(len(present), dtype=bool)
+            else:
+                masks[feature_type] = present & item_mask[item_rows]
+        return masks
+
+    def _refresh_rules(self):
+        """Re-rank every leaderboard when the filter rules changed since the last build"""
+        if self.keyword_index.rules_version == self._rules_version:
+            return
+        with self._lock:
+            version = self.keyword_index.rules_version
+            if version == self._rules_version:
+                return
+            self.feature_masks = self._build_feature_masks()
+            for segment_key in self.counts:
+                self._rank(segment_key)
+            self._rules_version = version
+
+    def _build_segments(self, store: InteractionStore, customers_df: pd.DataFrame):
+        """Per-segment counters, one bincount per segment field"""
+        customers = customers_df.drop_duplicates('customer_id').set_index('customer_id')
+        n_recipes = len(self.recipe_names)
+
+        # Customer row of every interaction (interactions are grouped by customer)
+        interaction_customers = np.repeat(
+            np.arange(store.n_customers), np.diff(store.offsets))
+        valid_recipes = store.recipe_codes >= 0
+
+        for field in SEGMENT_FIELDS:
+            if field not in customers:
+                continue
+
+            values = customers[field]
+            for customer_id, value in values.dropna().items():
+                self.customer_segments.setdefault(customer_id, {})[field] = str(value)
+
+            segment_codes, segment_values = pd.factorize(
+                values.reindex(store.customer_ids).astype(object))
+            interaction_segments = segment_codes[interaction_customers]
+            valid = valid_recipes & (interaction_segments >= 0)
+
+            flat = interaction_segments[valid].astype(np.int64) * n_recipes + store.recipe_codes[valid]
+            n_cells = len(segment_values) * n_recipes
+            counts = np.bincount(flat, minlength=n_cells).reshape(-1, n_recipes)
+            sums = np.bincount(flat, weights=store.ratings[valid].astype(np.float64),
+                               minlength=n_cells).reshape(-1, n_recipes)
+
+            for segment_code, segment_value in enumerate(segment_values):
+                segment_key = (field, str(segment_value))
+                self.counts[segment_key] = counts[segment_code].astype(np.int64)
+                self.sums[segment_key] = sums[segment_code]
+
+    def _rank(self, segment_key: SegmentKey):
+        """Re-sort the leaderboards of one segment"""
+        counts = self.counts[segment_key]
+        scores = self.scores[segment_key] = popularity_scores(counts, self.sums[segment_key])
+
+        # Stable sort keeps recipe order for ties, like the legacy list.sort
+        order = np.argsort(-scores, kind='stable')
+        order = order[(counts[order] > 0) & self.feature_masks[None][order]]
+
+        for feature_type in FEATURE_TYPES:
+            leaderboard = order[self.feature_masks[feature_type][order]]
+            self.leaderboards[(segment_key, feature_type)] = leaderboard
+
+    def _rerank_recipe(self, segment_key: SegmentKey, recipe_code: int):
+        """Move one recipe whose counters changed to its new place in the segment's leaderboards"""
+        counts, sums, scores = self.counts[segment_key], self.sums[segment_key], self.scores[segment_key]
+        scores[recipe_code] = popularity_scores(counts[recipe_code:recipe_code + 1],
+                                                sums[recipe_code:recipe_code + 1])[0]
+        score = scores[recipe_code]
+        listed = counts[recipe_code] > 0
+
+        for feature_type in FEATURE_TYPES:
+            key = (segment_key, feature_type)
+            leaderboard = self.leaderboards[key]
+            others = leaderboard[leaderboard != recipe_code]
+            if not (listed and self.feature_masks[feature_type][recipe_code]):
+                self.leaderboards[key] = others
+                continue
+
+            # Same order as _rank: score descending, ties by lower recipe code
+            other_scores = scores[others]
+            position = int(np.count_nonzero(
+                (other_scores > score) | ((other_scores == score) & (others < recipe_code))))
+            self.leaderboards[key] = np.insert(others, position, recipe_code)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def segment_of(self, customer_id: str) -> Dict[str, str]:
+        """Known region/age_group of a customer (empty for anonymous users)"""
+        return self.customer_segments.get(customer_id, {})
+
+    def leaderboard(self, feature_type: Optional[str] = None,
+                    segment_key: SegmentKey = GLOBAL_SEGMENT) -> np.ndarray:
+        """Recipe codes of one leaderboard, best first (empty if unknown)"""
+        return self.leaderboards.get((segment_key, feature_type), np.zeros(0, dtype=np.int64))
+
+    def top(self, feature_type: Optional[str] = None, count: int = 5,
+            region: Optional[str] = None, age_group: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Most popular recipes for a feature type
+
+        Segment leaderboards are used first (region, then age_group) and the
+        global leaderboard fills the remaining slots.
+
+        Args:
+            feature_type: None, 'breakfast', 'lunch', 'dinner' or 'easy'
+            count: Number of recipes to return
+            region: Optional customer region
+            age_group: Optional customer age group
+
+        Returns:
+            Recommendation dictionaries (fresh copies, safe to modify)
+        """
+        self._refresh_rules()
+        if feature_type not in self.feature_masks:
+            feature_type = None
+
+        segment_keys: List[SegmentKey] = []
+        if region:
+            segment_keys.append(('region', region))
+        if age_group:
+            segment_keys.append(('age_group', age_group))
+        segment_keys.append(GLOBAL_SEGMENT)
+
+        # Leaderboards and counters read consistently with concurrent record_interaction calls
+        picked: List[Tuple[int, int, float]] = []
+        selected = set()
+        with self._lock:
+            for segment_key in segment_keys:
+                leaderboard = self.leaderboard(feature_type, segment_key)
+                if len(leaderboard) == 0:
+                    continue
+
+                counts = self.counts[segment_key]
+                sums = self.sums[segment_key]
+                for recipe_code in leaderboard[:count + len(selected)]:
+                    if len(picked) >= count:
+                        break
+                    if recipe_code in selected:
+                        continue
+                    selected.add(recipe_code)
+                    picked.append((recipe_code, int(counts[recipe_code]), float(sums[recipe_code])))
+
+        recommendations = []
+        for recipe_code, interaction_count, rating_sum in picked:
+            avg_rating = rating_sum / interaction_count
+            recommendation = dict(self.recipe_records[recipe_code])
+            recommendation.update({
+                'predicted_rating': avg_rating * (1 + interaction_count * 0.1),
+                'avg_rating': avg_rating,
+                'interaction_count': interaction_count
+            })
+            recommendations.append(recommendation)
+        return recommendations
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+    def register_customer(self, customer_id: str, region: Optional[str] = None,
+                          age_group: Optional[str] = None):
+        """Remember the segments of a (new) customer"""
+        segments = {field: str(value) for field, value in
+                    (('region', region), ('age_group', age_group)) if value}
+        with self._lock:
+            self.customer_segments.setdefault(customer_id, {}).update(segments)
+
+    def record_interaction(self, customer_id: str, recipe_name: str, rating: float) -> bool:
+        """
+        Count a new rating and move the recipe in the affected leaderboards
+
+        The update is kept in this process only (see the module docstring).
+
+        Args:
+            customer_id: Customer who rated the recipe
+            recipe_name: Rated recipe (must be known to the index)
+            rating: Rating value
+
+        Returns:
+            True if the interaction was counted
+        """
+        recipe_code = self.recipe_index.get(recipe_name)
+        if recipe_code is None or self.recipe_records[recipe_code] is None:
+            return False
+
+        self._refresh_rules()
+        n_recipes = len(self.recipe_names)
+        segment_keys: List[SegmentKey] = [GLOBAL_SEGMENT]
+        segment_keys += [(field, value) for field, value in self.segment_of(customer_id).items()]
+
+        with self._lock:
+            for segment_key in segment_keys:
+                if segment_key not in self.counts:
+                    self.counts[segment_key] = np.zeros(n_recipes, dtype=np.int64)
+                    self.sums[segment_key] = np.zeros(n_recipes, dtype=np.float64)
+                    self._rank(segment_key)
+                self.counts[segment_key][recipe_code] += 1
+                self.sums[segment_key][recipe_code] += float(rating)
+                self._rerank_recipe(segment_key, recipe_code)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'recipes': len(self.recipe_names),
+            'segments': len(self.counts) - 1,
+            'leaderboards': len(self.leaderboards),
+            'customers_with_segments': len(self.customer_segments)
+        }
+
+
+# ----------------------------------------------------------------------
+# Shared index instance
+# ----------------------------------------------------------------------
+_popularity_index: Optional[PopularityIndex] = None
+
+
+def set_popularity_index(index: Optional[PopularityIndex]) -> Optional[PopularityIndex]:
+    """Publish the index built by app.preprocess_data()"""
+    global _popularity_index
+    _popularity_index = index
+    return index
+
+
+def get_popularity_index() -> Optional[PopularityIndex]:
+    """Shared index (None until the app has built one)"""
+    return _popularity_index
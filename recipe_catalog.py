@@ -0,0 +1,225 @@
+"""
+📖 RECIPE CATALOG
+=================
+
+Columnar recipe feature store: one row per recipe, stored as NumPy columns,
+with O(1) lookup by recipe_name (hash index) and by item_index (dense array).
+
+Recipe details (calories, preparation time, price, URL, ...) are taken from
+the first interaction row of each recipe - the same row the old
+`interactions_df[interactions_df['recipe_name'] == name].iloc[0]` scans found.
+
+Usage:
+    catalog = get_recipe_catalog()
+    rows = catalog.rows_of(['Phở bò', 'Bún chả'])
+    calories = catalog.column('estimated_calories')[rows]      # array gather
+    catalog.enrich(recommendations)                              # adds fields in place
+
+Author: AI Assistant
+Date: June 19, 2025
+"""
+
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from data_snapshot import read_table
+
+# Columns kept in the catalog when present in the interaction data
+STRING_COLUMNS = ['recipe_name', 'recipe_url', 'difficulty', 'meal_time',
+                  'nutrition_category']
+NUMERIC_COLUMNS = ['item_index', 'difficulty_code', 'meal_time_code',
+                   'estimated_calories', 'preparation_time_minutes',
+                   'ingredient_count', 'estimated_price_vnd']
+
+# Fields added to API responses by enrich()
+ENRICH_FIELDS = ['estimated_calories', 'preparation_time_minutes',
+                 'ingredient_count', 'estimated_price_vnd']
+
+# Catalog columns returned as int (default when missing or NaN)
+INT_FIELDS = {'estimated_calories': 0, 'preparation_time_minutes': 0,
+              'ingredient_count': 0, 'estimated_price_vnd': 0}
+
+
+class RecipeCatalog:
+    """One row per recipe, NumPy columns plus name/item_index indexes"""
+
+    def __init__(self, columns: Dict[str, np.ndarray], item_to_row: np.ndarray, version: int = 1):
+        self.columns = columns
+        self.recipe_names = columns['recipe_name']
+        self.name_index: Dict[str, int] = {
+            name: row for row, name in enumerate(self.recipe_names)}
+        self.item_to_row = item_to_row
+        self.version = version
+
+    @classmethod
+    def from_dataframe(cls, interactions_df: pd.DataFrame, version: int = 1) -> 'RecipeCatalog':
+        """Build the catalog from interaction rows (first row per recipe wins)"""
+        if interactions_df is None or interactions_df.empty or 'recipe_name' not in interactions_df:
+            return cls.empty()
+
+        valid = interactions_df[interactions_df['recipe_name'].notna()]
+        first_rows = valid.drop_duplicates('recipe_name', keep='first')
+
+        columns = {}
+        for name in STRING_COLUMNS:
+            if name in first_rows:
+                columns[name] = first_rows[name].to_numpy(dtype=object)
+        for name in NUMERIC_COLUMNS:
+            if name in first_rows:
+                columns[name] = first_rows[name].to_numpy()
+
+        # Every item_index maps to the catalog row of its recipe
+        item_to_row = np.full(0, -1, dtype=np.int32)
+        if 'item_index' in valid:
+            item_indexes = valid['item_index'].to_numpy(dtype=np.int64)
+            name_codes = pd.Index(first_rows['recipe_name']).get_indexer(valid['recipe_name'])
+            item_to_row = np.full(int(item_indexes.max()) + 1 if len(item_indexes) else 0,
+                                  -1, dtype=np.int32)
+            # Reverse so the first interaction of an item wins
+            item_to_row[item_indexes[::-1]] = name_codes[::-1]
+
+        return cls(columns, item_to_row, version=version)
+
+    @classmethod
+    def empty(cls) -> 'RecipeCatalog':
+        return cls({'recipe_name': np.zeros(0, dtype=object)}, np.full(0, -1, dtype=np.int32))
+
+    def __len__(self) -> int:
+        return len(self.recipe_names)
+
+    def __contains__(self, recipe_name: str) -> bool:
+        return recipe_name in self.name_index
+
+    def has_column(self, name: str) -> bool:
+        return name in self.columns
+
+    def column(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+    def row_of(self, recipe_name: str) -> int:
+        """Catalog row of a recipe, or -1"""
+        return self.name_index.get(recipe_name, -1)
+
+    def rows_of(self, recipe_names: Iterable[str]) -> np.ndarray:
+        """Catalog rows for many recipes (-1 for unknown names)"""
+        return np.fromiter((self.name_index.get(name, -1) for name in recipe_names),
+                           dtype=np.int64)
+
+    def rows_for_items(self, item_indexes) -> np.ndarray:
+        """Catalog rows for item_index values (-1 when unknown)"""
+        item_indexes = np.asarray(item_indexes, dtype=np.int64)
+        rows = np.full(item_indexes.shape, -1, dtype=np.int64)
+        known = (item_indexes >= 0) & (item_indexes < len(self.item_to_row))
+        rows[known] = self.item_to_row[item_indexes[known]]
+        return rows
+
+    def mask_for_names(self, recipe_names: Iterable[str]) -> np.ndarray:
+        """Boolean mask over catalog rows for a set of recipe names"""
+        mask = np.zeros(len(self), dtype=bool)
+        rows = self.rows_of(recipe_names)
+        mask[rows[rows >= 0]] = True
+        return mask
+
+    def details(self, recipe_name: str, fields: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """All (or selected) catalog fields of one recipe, or None"""
+        row = self.row_of(recipe_name)
+        if row < 0:
+            return None
+        return self.record(row, fields)
+
+    def record(self, row: int, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Catalog fields of one row as Python values"""
+        names = fields or list(self.columns)
+        return {name: _to_python(self.columns[name][row])
+                for name in names if name in self.columns}
+
+    def enrich(self, records: List[Dict[str, Any]], fields: Optional[List[str]] = None,
+               name_key: str = 'recipe_name') -> List[Dict[str, Any]]:
+        """
+        Add catalog fields to response dictionaries in place
+
+        Args:
+            records: Dictionaries carrying a recipe name
+            fields: Catalog columns to add (defaults to ENRICH_FIELDS)
+            name_key: Key holding the recipe name in each record
+
+        Returns:
+            The same list, for chaining
+        """
+        fields = [name for name in (fields or ENRICH_FIELDS) if name in self.columns]
+        if not records or not fields or len(self) == 0:
+            return records
+
+        rows = self.rows_of(record.get(name_key) for record in records)
+        # One gather per column for the whole response
+        gathered = {name: self.columns[name][np.maximum(rows, 0)] for name in fields}
+        for position, record in enumerate(records):
+            if rows[position] < 0:
+                continue
+            for name in fields:
+                value = gathered[name][position]
+                record[name] = int_value(value, INT_FIELDS[name]) if name in INT_FIELDS \
+                    else _to_python(value)
+        return records
+
+
+def int_value(value: Any, default: int = 0) -> int:
+    """Integer value of a catalog field (default when missing or NaN)"""
+    if value is None or pd.isna(value):
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _to_python(value: Any) -> Any:
+    """Convert NumPy scalars so results stay JSON serializable"""
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    return value
+
+
+# ----------------------------------------------------------------------
+# Shared catalog instance
+# ----------------------------------------------------------------------
+_catalog: Optional[RecipeCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def set_recipe_catalog(catalog: RecipeCatalog) -> RecipeCatalog:
+    """Publish a catalog built elsewhere (e.g. by app.preprocess_data)"""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is not None and catalog is not _catalog:
+            catalog.version = max(catalog.version, _catalog.version + 1)
+        _catalog = catalog
+    return catalog
+
+
+def build_recipe_catalog(interactions_df: pd.DataFrame) -> RecipeCatalog:
+    """Build a catalog from interaction rows and make it the shared one"""
+    return set_recipe_catalog(RecipeCatalog.from_dataframe(interactions_df))
+
+
+def get_recipe_catalog(interactions_path: str = 'interactions_enhanced_final.csv') -> RecipeCatalog:
+    """Shared catalog, built from the interaction data on first use"""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                try:
+                    _catalog = RecipeCatalog.from_dataframe(read_table(interactions_path))
+                    print(f"✅ Recipe catalog built with {len(_catalog)} recipes")
+                except Exception as e:
+                    print(f"⚠️ Could not build recipe catalog: {e}")
+                    return RecipeCatalog.empty()
+    return _catalog
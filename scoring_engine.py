@@ -0,0 +1,232 @@
+"""
+🎯 VECTORIZED SCORING ENGINE
+============================
+
+NumPy scoring path behind app.get_recommendations():
+
+1. a dense score vector over the whole item table (cf_score + content_score)
+2. a boolean seen-mask built from the customer's history
+3. a boolean filter mask per feature type, compiled by keyword_index
+4. argpartition-based top-k selection
+
+Result dictionaries are only built for the items that are returned.
+
+Usage:
+    engine = ScoringEngine(interaction_store)
+    engine.recommend('CUS00001', feature_type='breakfast', count=5)
+
+Author: AI Assistant
+Date: June 19, 2025
+"""
+
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence
+
+import numpy as np
+
+from interaction_store import InteractionStore
+from keyword_index import KeywordIndex, get_keyword_index
+from sampling import gumbel_top_k, make_rng, rank_weights
+
+# Feature type -> keyword_index rule
+FEATURE_RULES = {
+    'breakfast': 'meal:breakfast',
+    'lunch': 'meal:lunch',
+    'dinner': 'meal:dinner',
+    'easy': 'difficulty:easy'
+}
+
+
+def top_k(scores: np.ndarray, k: int, mask: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Indices of the k highest scores, best first
+
+    Ties are broken by the lower index, which gives the same order as a
+    stable descending sort of the full array.
+
+    Args:
+        scores: 1-D score array
+        k: Number of indices to return
+        mask: Optional boolean array restricting the eligible indices
+
+    Returns:
+        int64 array of at most k indices
+    """
+    candidates = np.flatnonzero(mask) if mask is not None else np.arange(len(scores))
+    if k <= 0 or len(candidates) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    candidate_scores = scores[candidates]
+    if k < len(candidates):
+        # Everything strictly above the k-th score, then ties at the k-th score by index
+        kth_score = np.partition(candidate_scores, len(candidates) - k)[len(candidates) - k]
+        above = candidate_scores > kth_score
+        ties = np.flatnonzero(candidate_scores == kth_score)[:k - int(above.sum())]
+        keep = np.concatenate((np.flatnonzero(above), ties))
+        candidates, candidate_scores = candidates[keep], candidate_scores[keep]
+
+    order = np.lexsort((candidates, -candidate_scores))
+    return candidates[order]
+
+
+def fill_menus(ranked: Dict[str, Sequence[Any]], n_menus: int,
+               recipe_of: Callable[[Any], Hashable]) -> List[Dict[str, Any]]:
+    """
+    Fill menus slot by slot without repeating a recipe
+
+    Menu i takes, for every slot, the best remaining entry of that slot whose
+    recipe is not used by any earlier pick.
+
+    Args:
+        ranked: Slot name -> entries sorted best first
+        n_menus: Number of menus to fill
+        recipe_of: Returns the recipe key of an entry
+
+    Returns:
+        One dictionary per menu (slot -> entry, or None when exhausted)
+    """
+    used = set()
+    positions = {slot: 0 for slot in ranked}
+    menus = []
+    for _ in range(n_menus):
+        menu = {}
+        for slot, entries in ranked.items():
+            position = positions[slot]
+            while position < len(entries) and recipe_of(entries[position]) in used:
+                position += 1
+            if position < len(entries):
+                menu[slot] = entries[position]
+                used.add(recipe_of(entries[position]))
+                position += 1
+            else:
+                menu[slot] = None
+            positions[slot] = position
+        menus.append(menu)
+    return menus
+
+
+class ScoringEngine:
+    """Dense, mask-based recommendation scoring over an InteractionStore"""
+
+    def __init__(self, store: InteractionStore, keyword_index: Optional[KeywordIndex] = None):
+        self.store = store
+        self.scores = store.item_scores()
+        self.keyword_index = keyword_index or get_keyword_index(store)
+
+    def feature_mask(self, feature_type: Optional[str]) -> Optional[np.ndarray]:
+        """Boolean mask over the item table for a feature type (None = no filter)"""
+        if feature_type not in FEATURE_RULES:
+            return None
+        return self.keyword_index.item_mask(FEATURE_RULES[feature_type])
+
+    def recommendation(self, item_row: int, score: float) -> Dict[str, Any]:
+        """Response dictionary for one item"""
+        item = self.store.item_record(item_row)
+        return {
+            'item_index': item['item_index'],
+            'recipe_name': item['recipe_name'],
+            'recipe_url': item['recipe_url'],
+            'difficulty': item['difficulty'],
+            'meal_time': item['meal_time'],
+            'predicted_rating': float(score)
+        }
+
+    def recommend(self, user_id: str, feature_type: Optional[str] = None,
+                  count: int = 5, randomize: bool = False,
+                  rng: Optional[np.random.Generator] = None) -> List[Dict[str, Any]]:
+        """
+        Top recommendations for a known customer
+
+        Args:
+            user_id: Customer ID present in the store
+            feature_type: Optional 'breakfast', 'lunch', 'dinner' or 'easy' filter
+            count: Number of recommendations
+            randomize: Add ±5% score noise and sample from the top candidates
+            rng: Per-request generator used when randomize is True
+
+        Returns:
+            Recommendation dictionaries sorted by predicted_rating
+            (in draw order when randomized)
+        """
+        candidates = ~self.store.seen_mask(user_id)
+        feature_mask = self.feature_mask(feature_type)
+
+        if not randomize:
+            eligible = candidates & feature_mask if feature_mask is not None else candidates
+            rows = top_k(self.scores, count, eligible)
+            return [self.recommendation(row, self.scores[row]) for row in rows]
+
+        rng = make_rng(rng)
+        candidate_rows = np.flatnonzero(candidates)
+
+        # Small random factor for variation (±5%), drawn for candidates only
+        noisy_scores = self.scores[candidate_rows] * rng.uniform(0.95, 1.05, len(candidate_rows))
+        ranked = top_k(noisy_scores, count * 3)
+        top_rows, top_scores = candidate_rows[ranked], noisy_scores[ranked]
+
+        # Weighted sampling without replacement: higher ranked items more likely
+        picks = gumbel_top_k(rank_weights(len(top_rows)), count * 2, rng)
+
+        # Filter by feature type after sampling, as the legacy path did
+        if feature_mask is not None:
+            picks = picks[feature_mask[top_rows[picks]]]
+        return [self.recommendation(top_rows[pick], top_scores[pick]) for pick in picks[:count]]
+
+    def recommend_slots(self, user_id: str, slots: Sequence[str],
+                        count: int = 5) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Top recommendations for several feature types in one pass
+
+        Candidates and their scores are gathered once; every slot is then a
+        masked top-k over the same arrays. Results equal separate
+        recommend(user_id, slot, count) calls.
+
+        Args:
+            user_id: Customer ID present in the store
+            slots: Feature types, e.g. ['breakfast', 'lunch', 'dinner']
+            count: Recommendations per slot
+
+        Returns:
+            Slot -> recommendation dictionaries
+        """
+        rows = np.flatnonzero(~self.store.seen_mask(user_id))
+        scores = self.scores[rows]
+
+        results = {}
+        for slot in slots:
+            slot_mask = self.feature_mask(slot)
+            picked = top_k(scores, count, slot_mask[rows] if slot_mask is not None else None)
+            results[slot] = [self.recommendation(rows[i], scores[i]) for i in picked]
+        return results
+
+    def recommend_menus(self, user_id: str, slots: Sequence[str],
+                        n_menus: int = 6) -> List[Dict[str, Optional[Dict[str, Any]]]]:
+        """
+        Fill n_menus menus (one recommendation per slot) without repeating a recipe
+
+        Args:
+            user_id: Customer ID present in the store
+            slots: Feature types making up a menu
+            n_menus: Number of menus
+
+        Returns:
+            One dictionary per menu (slot -> recommendation or None)
+        """
+        rows = np.flatnonzero(~self.store.seen_mask(user_id))
+        scores = self.scores[rows]
+        recipe_codes = self.store.item_recipe_codes[rows]
+
+        ranked = {}
+        for slot in slots:
+            slot_mask = self.feature_mask(slot)
+            slot_positions = np.flatnonzero(slot_mask[rows]) if slot_mask is not None \
+                else np.arange(len(rows))
+            # Best item of every recipe, recipes ordered by that item's score
+            order = slot_positions[np.lexsort((slot_positions, -scores[slot_positions]))]
+            _, first = np.unique(recipe_codes[order], return_index=True)
+            ranked[slot] = order[np.sort(first)].tolist()
+
+        menus = fill_menus(ranked, n_menus, lambda position: recipe_codes[position])
+        return [{slot: self.recommendation(rows[position], scores[position])
+                 if position is not None else None
+                 for slot, position in menu.items()}
+                for menu in menus]
@@ -0,0 +1,195 @@
+"""
+🚀 PRODUCTION SERVING ENTRY POINT
+=================================
+
+Pre-forked serving for app.py under gunicorn (see gunicorn.conf.py).
+
+The master process:
+1. imports app.py (CSV snapshots, interaction store, catalog, indexes)
+2. registers the optional route groups (new customer, hybrid)
+3. optionally loads the hybrid model (PRELOAD_HYBRID=1), synchronously so
+   no loading thread is running at fork; otherwise every worker loads it
+   in a background warm-up thread after fork
+4. warms every request path once (lazy masks, Jinja templates, URL map)
+5. packs the NumPy state into one contiguous read-only arena
+6. freezes the garbage collector so workers do not dirty shared pages
+
+Workers are forked from that state and share it copy-on-write; each worker
+is warmed in post_fork before it accepts traffic and reports its private
+memory (GET /api/system/memory). Each worker runs its own hybrid retrain
+thread, which also loads generations published by the other workers.
+
+Usage:
+    gunicorn -c gunicorn.conf.py              # WEB_CONCURRENCY workers
+    python serve.py                           # same, via gunicorn's runner
+
+Author: AI Assistant
+Date: June 19, 2025
+"""
+
+import gc
+import os
+import sys
+from typing import Any, Callable, Dict, Tuple
+
+import numpy as np
+
+ARENA_ALIGNMENT = 64
+
+# Paths exercised once in the master and once in every worker
+WARMUP_PATHS = [
+    '/',
+    '/api/meal_plans?user_id={customer}',
+    '/api/nutrition_recommendations?user_id={customer}&nutrition_type=balanced',
+    '/api/age_based_recommendations?user_id={customer}',
+    '/api/meal_plans?user_id=WARMUP_NEW_USER'
+]
+
+
+def pack_arrays(arrays: Dict[str, np.ndarray]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Copy numeric arrays into one contiguous buffer
+
+    Args:
+        arrays: Name -> array (object arrays are skipped)
+
+    Returns:
+        (arena buffer, name -> read-only view into the arena)
+    """
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        if array.dtype == object:
+            continue
+        offset = -(-offset // ARENA_ALIGNMENT) * ARENA_ALIGNMENT
+        layout[name] = offset
+        offset += array.nbytes
+
+    arena = np.empty(offset, dtype=np.uint8)
+    views = {}
+    for name, start in layout.items():
+        array = np.ascontiguousarray(arrays[name])
+        view = arena[start:start + array.nbytes].view(array.dtype).reshape(array.shape)
+        view[...] = array
+        view.flags.writeable = False
+        views[name] = view
+    return arena, views
+
+
+def _array_slots(food_app) -> Dict[str, Tuple[np.ndarray, Callable[[np.ndarray], None]]]:
+    """Read-only arrays of the serving state with a setter to swap each one"""
+    slots: Dict[str, Tuple[np.ndarray, Callable[[np.ndarray], None]]] = {}
+
+    def add_object(label: str, obj: Any):
+        for attribute, value in list(vars(obj).items()):
+            if isinstance(value, np.ndarray):
+                slots[f"{label}.{attribute}"] = (
+                    value, lambda array, obj=obj, attribute=attribute: setattr(obj, attribute, array))
+
+    def add_mapping(label: str, mapping: Dict[str, Any]):
+        for key, value in list(mapping.items()):
+            if isinstance(value, np.ndarray):
+                slots[f"{label}[{key}]"] = (
+                    value, lambda array, mapping=mapping, key=key: mapping.__setitem__(key, array))
+
+    add_object('interaction_store', food_app.interaction_store)
+    add_object('scoring_engine', food_app.scoring_engine)
+    add_object('recipe_catalog', food_app.recipe_catalog)
+    add_mapping('recipe_catalog.columns', food_app.recipe_catalog.columns)
+    add_mapping('keyword_index.item_masks', food_app.keyword_index.item_masks)
+    add_mapping('keyword_index.recipe_masks', food_app.keyword_index.recipe_masks)
+    # Popularity counters are updated in place by /api/record_interaction, so they stay private
+    return slots
+
+
+def freeze_shared_state(food_app) -> Dict[str, Any]:
+    """Pack the read-only NumPy state into one arena and keep a reference to it"""
+    slots = _array_slots(food_app)
+    arena, views = pack_arrays({name: array for name, (array, _) in slots.items()})
+    for name, view in views.items():
+        slots[name][1](view)
+
+    # Keep the arena alive for the life of the process
+    food_app.shared_arena = arena
+    return {'arrays': len(views), 'arena_mb': round(arena.nbytes / 1024 / 1024, 2)}
+
+
+def warm_up(food_app) -> int:
+    """Run every warm-up path once through the WSGI stack, returns failures"""
+    customer = food_app.customer_ids[0] if food_app.customer_ids else 'CUS00001'
+    client = food_app.app.test_client()
+    failures = 0
+    for path in WARMUP_PATHS:
+        try:
+            response = client.get(path.format(customer=customer))
+            if response.status_code >= 500:
+                failures += 1
+        except Exception as e:
+            print(f"⚠️ Warm-up failed for {path}: {e}")
+            failures += 1
+    return failures
+
+
+def prepare_master():
+    """Load, warm and freeze all shared state (runs once, before fork)"""
+    # No collections while long-lived state is being built
+    gc.disable()
+
+    import app as food_app
+    from startup_profiler import startup_profiler, get_memory_breakdown
+
+    with startup_profiler.step('initialize additional systems'):
+        # No warm-up thread here: a thread running at fork leaves its locks held in the workers
+        food_app.initialize_additional_systems(warm_hybrid=False)
+
+    if os.getenv('PRELOAD_HYBRID') and food_app.HYBRID_SYSTEM_AVAILABLE:
+        with startup_profiler.step('preload hybrid model'):
+            from hybrid_integration import get_hybrid_service
+            # Workers start their own retrain/poll thread (threads do not survive fork)
+            get_hybrid_service().ensure_initialized(schedule_retrain=False)
+
+    with startup_profiler.step('warm up request paths'):
+        failures = warm_up(food_app)
+
+    with startup_profiler.step('pack shared arrays'):
+        arena = freeze_shared_state(food_app)
+
+    # Everything allocated so far is long-lived: move it out of the GC's reach
+    gc.collect()
+    gc.freeze()
+    startup_profiler.mark_boot_complete()
+
+    memory = get_memory_breakdown()
+    print(f"✅ Master ready: {arena['arrays']} arrays in a {arena['arena_mb']} MB arena, "
+          f"{failures} warm-up failures, RSS {memory['rss_mb']} MB")
+    return food_app
+
+
+def init_worker():
+    """Per-worker setup after fork: re-enable GC and warm before accepting traffic"""
+    import app as food_app
+    from startup_profiler import get_memory_breakdown
+
+    gc.enable()
+    if food_app.HYBRID_SYSTEM_AVAILABLE:
+        from hybrid_integration import DEFAULT_INTERACTIONS_PATH, get_hybrid_service
+        service = get_hybrid_service()
+        if service.is_trained:
+            # Preloaded model: every worker polls for published generations and retrains on schedule
+            service.start_auto_retrain(DEFAULT_INTERACTIONS_PATH)
+        else:
+            # Load the model in this worker's own background thread
+            service.start_warmup(DEFAULT_INTERACTIONS_PATH)
+    warm_up(food_app)
+    memory = get_memory_breakdown()
+    print(f"👷 Worker {os.getpid()} ready: private {memory['private_mb']} MB, "
+          f"shared {memory['shared_mb']} MB, PSS {memory['pss_mb']} MB")
+
+
+if __name__ == '__main__':
+    # Hand over to gunicorn with the repository config (it imports serve:application)
+    from gunicorn.app.wsgiapp import run
+    sys.argv = ['gunicorn', '-c', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                               'gunicorn.conf.py')] + sys.argv[1:]
+    sys.exit(run())
+else:
+    application = prepare_master().app
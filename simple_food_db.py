@@ -4,6 +4,7 @@ import json
 from typing import List, Dict, Optional
 import sqlite3
 from datetime import datetime
+from id_registry import load_id_registry
 
 
 class SimpleFoodRecommendationDB:
@@ -46,7 +47,8 @@ class SimpleFoodRecommendationDB:
                 gender TEXT,
                 age_group TEXT,
                 region TEXT,
-                registration_date TEXT
+                registration_date TEXT,
+                customer_key INTEGER
             )
         ''')
 
@@ -80,10 +82,19 @@ class SimpleFoodRecommendationDB:
                 content_score REAL,
                 cf_score REAL,
                 item_index INTEGER,
-                comment TEXT
+                comment TEXT,
+                customer_key INTEGER,
+                recipe_key INTEGER
             )
         ''')
 
+        # Databases created before the ID registry: add the int32 key columns
+        for table, column in [('customers', 'customer_key'), ('interactions', 'customer_key'),
+                              ('interactions', 'recipe_key')]:
+            existing = {row[1] for row in cursor.execute(f'PRAGMA table_info({table})')}
+            if column not in existing:
+                cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} INTEGER')
+
         # Create index for faster queries
         cursor.execute(
             'CREATE INDEX IF NOT EXISTS idx_customer_id ON interactions(customer_id)')
@@ -91,6 +102,10 @@ class SimpleFoodRecommendationDB:
             'CREATE INDEX IF NOT EXISTS idx_recipe_name ON interactions(recipe_name)')
         cursor.execute(
             'CREATE INDEX IF NOT EXISTS idx_interaction_date ON interactions(interaction_date)')
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_customer_key ON interactions(customer_key)')
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_recipe_key ON interactions(recipe_key)')
 
         conn.commit()
         conn.close()
@@ -187,18 +202,24 @@ class SimpleFoodRecommendationDB:
             # Clear existing data
             cursor.execute('DELETE FROM customers')
 
-            for idx, row in df.iterrows():
+            # Registry ids of every customer (new customers get the next free id)
+            customer_keys = load_id_registry(df).customers.encode_many(df['customer_id'])
+
+            # Keys are positional: the DataFrame index may not be a RangeIndex
+            for position, (_, row) in enumerate(df.iterrows()):
                 cursor.execute('''
                     INSERT INTO customers (
-                        customer_id, full_name, gender, age_group, region, registration_date
-                    ) VALUES (?, ?, ?, ?, ?, ?)
+                        customer_id, full_name, gender, age_group, region, registration_date,
+                        customer_key
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
                 ''', (
                     str(row['customer_id']),
                     str(row['full_name']),
                     str(row['gender']),
                     str(row['age_group']),
                     str(row['region']),
-                    str(row['registration_date'])
+                    str(row['registration_date']),
+                    int(customer_keys[position])
                 ))
 
             conn.commit()
@@ -224,15 +245,21 @@ class SimpleFoodRecommendationDB:
             # Clear existing interactions data
             cursor.execute('DELETE FROM interactions')
 
+            # Registry ids of every customer and recipe
+            registry = load_id_registry(df)
+            customer_keys = registry.customers.encode_many(df['customer_id'])
+            recipe_keys = registry.recipes.encode_many(df['recipe_name'])
+
             # Insert ALL interactions (not grouped)
-            for idx, row in df.iterrows():
+            for position, (idx, row) in enumerate(df.iterrows()):
                 cursor.execute('''
                     INSERT INTO interactions (
                         customer_id, recipe_name, recipe_url, difficulty, meal_time,
                         nutrition_category, estimated_calories, preparation_time_minutes,
                         ingredient_count, estimated_price_vnd, rating, interaction_type,
-                        interaction_date, content_score, cf_score, item_index, comment
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        interaction_date, content_score, cf_score, item_index, comment,
+                        customer_key, recipe_key
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (
                     str(row['customer_id']),
                     str(row['recipe_name']),
@@ -257,7 +284,9 @@ class SimpleFoodRecommendationDB:
                         row.get('cf_score')) else 0,
                     int(row['item_index']) if pd.notna(
                         row.get('item_index')) else 0,
-                    str(row.get('comment', ''))
+                    str(row.get('comment', '')),
+                    int(customer_keys[position]),
+                    int(recipe_keys[position])
                 ))
 
                 # Print progress every 1000 rows
@@ -520,7 +549,7 @@ class SimpleFoodRecommendationDB:
                            'meal_time', 'nutrition_category', 'estimated_calories',
                            'preparation_time_minutes', 'ingredient_count', 'estimated_price_vnd',
                            'rating', 'interaction_type', 'interaction_date', 'content_score',
-                           'cf_score', 'item_index', 'comment']
+                           'cf_score', 'item_index', 'comment', 'customer_key', 'recipe_key']
 
                 formatted_results = {
                     'documents': [[]],
@@ -553,13 +582,14 @@ class SimpleFoodRecommendationDB:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
 
+            # By customer_id (idx_customer_id): stored keys can be older than the
+            # registry (rows loaded before it, or a regenerated snapshots/ directory)
             cursor.execute('''
                 SELECT * FROM interactions 
                 WHERE customer_id = ? 
                 ORDER BY interaction_date DESC 
                 LIMIT ?
             ''', (customer_id, limit))
-
             results = cursor.fetchall()
             conn.close()
 
@@ -568,7 +598,7 @@ class SimpleFoodRecommendationDB:
                            'meal_time', 'nutrition_category', 'estimated_calories',
                            'preparation_time_minutes', 'ingredient_count', 'estimated_price_vnd',
                            'rating', 'interaction_type', 'interaction_date', 'content_score',
-                           'cf_score', 'item_index', 'comment']
+                           'cf_score', 'item_index', 'comment', 'customer_key', 'recipe_key']
 
                 return [dict(zip(columns, result)) for result in results]
             else:
@@ -0,0 +1,223 @@
+"""
+⏱️ STARTUP PROFILER
+===================
+
+Records a boot timeline (per import and per initialization step) with wall
+time in milliseconds and resident memory in MB, plus helpers to defer heavy
+imports until a route actually needs them.
+
+Usage:
+    from startup_profiler import startup_profiler, lazy_import
+
+    with startup_profiler.step('load interactions'):
+        df = read_table('interactions_enhanced_final.csv')
+
+    food_ai_agent = lazy_import('food_ai_agent')   # imported + timed on first call
+
+Set STARTUP_PROFILE=1 to print the timeline once the app module is loaded.
+
+Author: AI Assistant
+Date: June 19, 2025
+"""
+
+import importlib
+import importlib.util
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+
+def get_rss_mb() -> float:
+    """Current resident set size of this process in MB"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1024 / 1024
+    except ImportError:
+        pass
+
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    try:
+        import resource
+        # Peak RSS (KB on Linux) - best effort on other platforms
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:
+        return 0.0
+
+
+def get_memory_breakdown() -> Dict[str, Optional[float]]:
+    """
+    RSS split into shared and private pages (MB) for this process
+
+    Private memory is what every extra pre-forked worker really costs.
+    Uses /proc/self/smaps_rollup (Linux 4.14+), else only RSS is reported.
+    """
+    breakdown: Dict[str, Optional[float]] = {
+        'rss_mb': round(get_rss_mb(), 1), 'pss_mb': None,
+        'shared_mb': None, 'private_mb': None
+    }
+    try:
+        fields = {}
+        with open('/proc/self/smaps_rollup', 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                    fields[parts[0][:-1]] = int(parts[1]) / 1024
+        breakdown.update({
+            'rss_mb': round(fields.get('Rss', 0.0), 1),
+            'pss_mb': round(fields.get('Pss', 0.0), 1),
+            'shared_mb': round(fields.get('Shared_Clean', 0.0) + fields.get('Shared_Dirty', 0.0), 1),
+            'private_mb': round(fields.get('Private_Clean', 0.0) + fields.get('Private_Dirty', 0.0), 1)
+        })
+    except (OSError, ValueError):
+        pass
+    return breakdown
+
+
+class StartupProfiler:
+    """Collects timed boot events"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.baseline_rss_mb = get_rss_mb()
+        self.events: List[Dict[str, Any]] = []
+        self.boot_completed_ms: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._t0) * 1000
+
+    @contextmanager
+    def step(self, name: str, kind: str = 'init'):
+        """Time a block of startup work"""
+        start_ms = self._elapsed_ms()
+        rss_before = get_rss_mb()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            rss_after = get_rss_mb()
+            event = {
+                'name': name,
+                'kind': kind,
+                'start_ms': round(start_ms, 1),
+                'duration_ms': round(self._elapsed_ms() - start_ms, 1),
+                'rss_mb': round(rss_after, 1),
+                'rss_delta_mb': round(rss_after - rss_before, 1),
+                'after_boot': self.boot_completed_ms is not None
+            }
+            if error:
+                event['error'] = error
+            with self._lock:
+                self.events.append(event)
+
+    def import_module(self, module_name: str, kind: str = 'import'):
+        """Import a module and record how long it took"""
+        if module_name in sys.modules:
+            return sys.modules[module_name]
+        with self.step(f"import {module_name}", kind=kind):
+            return importlib.import_module(module_name)
+
+    def mark_boot_complete(self):
+        """Mark the end of the boot phase (later events are lazy loads)"""
+        if self.boot_completed_ms is None:
+            self.boot_completed_ms = round(self._elapsed_ms(), 1)
+
+    def report(self) -> Dict[str, Any]:
+        """Timeline as a JSON-serializable dictionary"""
+        with self._lock:
+            events = list(self.events)
+
+        boot_events = [e for e in events if not e['after_boot']]
+        return {
+            'started_at': self.started_at,
+            'pid': os.getpid(),
+            'boot_time_ms': self.boot_completed_ms,
+            'baseline_rss_mb': round(self.baseline_rss_mb, 1),
+            'current_rss_mb': round(get_rss_mb(), 1),
+            'import_time_ms': round(sum(e['duration_ms'] for e in boot_events
+                                        if e['kind'] == 'import'), 1),
+            'init_time_ms': round(sum(e['duration_ms'] for e in boot_events
+                                      if e['kind'] == 'init'), 1),
+            'events': events
+        }
+
+    def format_report(self) -> str:
+        """Human readable timeline"""
+        report = self.report()
+        lines = [
+            "⏱️ Startup timeline",
+            f"{'step':<48} {'kind':<7} {'start ms':>9} {'ms':>9} {'RSS MB':>8} {'Δ MB':>7}"
+        ]
+        for event in report['events']:
+            name = event['name'] + (' (failed)' if 'error' in event else '')
+            kind = 'lazy' if event['after_boot'] else event['kind']
+            lines.append(
+                f"{name[:48]:<48} {kind:<7} {event['start_ms']:>9.1f} "
+                f"{event['duration_ms']:>9.1f} {event['rss_mb']:>8.1f} {event['rss_delta_mb']:>7.1f}")
+        lines.append(
+            f"Boot: {report['boot_time_ms']} ms "
+            f"(imports {report['import_time_ms']} ms, init {report['init_time_ms']} ms), "
+            f"RSS {report['baseline_rss_mb']} → {report['current_rss_mb']} MB")
+        return '\n'.join(lines)
+
+    def emit(self):
+        """Print the timeline to stdout"""
+        print(self.format_report())
+
+
+class LazyModule:
+    """Module proxy that imports the real module on first attribute access"""
+
+    def __init__(self, module_name: str, profiler: StartupProfiler):
+        self._module_name = module_name
+        self._profiler = profiler
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = self._profiler.import_module(self._module_name)
+        return self._module
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._module is not None
+
+    def __getattr__(self, name: str):
+        return getattr(self._load(), name)
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self.is_loaded else 'deferred'
+        return f"<LazyModule {self._module_name} ({state})>"
+
+
+def module_available(module_name: str) -> bool:
+    """Check that a module can be imported without importing it"""
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+# Global profiler, created as early as possible in the process
+startup_profiler = StartupProfiler()
+
+
+def lazy_import(module_name: str) -> LazyModule:
+    """Defer importing a module until it is first used"""
+    return LazyModule(module_name, startup_profiler)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test ANN serving when a customer's seen recipes fill the probed lists
+
+Forces the ANN path on the sample data (build_ann_indexes(min_items=0)) and
+checks that heavy users still get as many recommendations as exact scoring.
+"""
+
+import contextlib
+import io
+
+import numpy as np
+
+from ann_index import ANNIndex
+
+SAMPLE_DATA = 'interactions_enhanced_final.csv'
+METHODS = ['get_matrix_factorization_recommendations',
+           'get_implicit_feedback_recommendations',
+           'get_content_based_recommendations']
+
+
+def test_index_widens_probe():
+    print("🧪 Testing ANN probe widening...")
+    rng = np.random.default_rng(0)
+    index = ANNIndex.build(rng.normal(size=(400, 16)).astype(np.float32), n_lists=20, n_probe=1)
+    query = rng.normal(size=(1, 16)).astype(np.float32)
+
+    # Exclude every item of the single probed list and most of the rest
+    ids, _ = index.search(query, 10, exclude=[index.list_items[:390]])
+    assert (ids[0] >= 0).sum() == 10, ids
+    assert not np.isin(ids[0], index.list_items[:390]).any()
+
+    # Fewer items left than k: the free slots stay empty
+    ids, scores = index.search(query, 10, exclude=[index.list_items[:395]])
+    assert sorted(ids[0][:5]) == sorted(index.list_items[395:])
+    assert (ids[0][5:] == -1).all() and np.isneginf(scores[0][5:]).all()
+    print("✅ ANN search fills k results despite exclusions")
+
+
+def test_forced_ann_path():
+    print("🧪 Testing forced ANN path on the sample data...")
+    from hybrid_recommendation_system import HybridRecommendationSystem
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        system = HybridRecommendationSystem()
+        system.load_data(SAMPLE_DATA)
+        system.train_all_models()
+
+    # Heaviest users first, they are the ones exhausting the probed lists
+    counts = np.diff(system.user_item_matrix.indptr)
+    customers = ['CUS00006'] + [system.encoders['customer'].classes_[row]
+                                for row in np.argsort(-counts, kind='stable')[:20]]
+
+    def recommend():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return {method: {customer: getattr(system, method)(customer, 10) for customer in customers}
+                    for method in METHODS}
+
+    exact = recommend()
+    with contextlib.redirect_stdout(io.StringIO()):
+        system.build_ann_indexes(min_items=0)
+    assert any(name.startswith('ann_') for name in system.models)
+    approx = recommend()
+
+    for method in METHODS:
+        for customer in customers:
+            assert len(approx[method][customer]) == len(exact[method][customer]), (method, customer)
+            assert all(np.isfinite(result.score) for result in approx[method][customer])
+    print(f"✅ ANN results as long as exact results for {len(customers)} heavy customers")
+
+
+if __name__ == "__main__":
+    test_index_widens_probe()
+    test_forced_ann_path()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test columnar snapshot freshness after CSV rewrites and registrations
+"""
+
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+
+from data_snapshot import get_snapshot_dir, open_snapshot, read_table, snapshot_is_fresh
+from new_customer_registration import save_customer_to_csv
+
+
+def copy_customers(tmp):
+    csv_path = os.path.join(tmp, 'customers_data.csv')
+    shutil.copy('customers_data.csv', csv_path)
+    return csv_path
+
+
+def test_snapshot_matches_csv():
+    print("🧪 Testing snapshot round trip...")
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = copy_customers(tmp)
+        expected = pd.read_csv(csv_path)
+        read_table(csv_path, refresh=True)
+        assert snapshot_is_fresh(csv_path)
+        pd.testing.assert_frame_equal(read_table(csv_path), expected)
+    print("✅ Snapshot returns the same frame as read_csv")
+
+
+def test_rewritten_csv_is_not_served_from_snapshot():
+    print("🧪 Testing stale snapshot detection...")
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = copy_customers(tmp)
+        read_table(csv_path, refresh=True)
+        df = pd.read_csv(csv_path).iloc[:-1]
+        df.to_csv(csv_path, index=False, encoding='utf-8')
+
+        assert not snapshot_is_fresh(csv_path)
+        assert open_snapshot(csv_path) is None
+        assert len(read_table(csv_path)) == len(df)
+    print("✅ Stale snapshot ignored after a CSV rewrite")
+
+
+def test_registration_refreshes_snapshot():
+    print("🧪 Testing snapshot refresh on registration...")
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = copy_customers(tmp)
+        read_table(csv_path, refresh=True)
+        customer = dict(pd.read_csv(csv_path).iloc[0])
+        customer['customer_id'] = 'CUS_SNAPSHOT_TEST'
+
+        assert save_customer_to_csv(customer, filename=csv_path)
+        assert snapshot_is_fresh(csv_path, get_snapshot_dir(csv_path))
+        snapshot = open_snapshot(csv_path)
+        assert snapshot.column('customer_id')[-1] == 'CUS_SNAPSHOT_TEST'
+        pd.testing.assert_frame_equal(snapshot.to_dataframe(), pd.read_csv(csv_path))
+    print("✅ Registration left a fresh snapshot with the new customer")
+
+
+if __name__ == "__main__":
+    test_snapshot_matches_csv()
+    test_rewritten_csv_is_not_served_from_snapshot()
+    test_registration_refreshes_snapshot()
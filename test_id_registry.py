@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test ID registry persistence and id assignment across processes
+"""
+
+import multiprocessing
+import os
+import tempfile
+
+import pandas as pd
+
+import id_registry
+from id_registry import IdRegistry, load_id_registry
+
+
+def _add_customers(directory, prefix, count):
+    registry = IdRegistry.open(directory)
+    return {f"{prefix}{n}": registry.add('customers', f"{prefix}{n}") for n in range(count)}
+
+
+def test_registry_round_trip():
+    print("🧪 Testing ID registry persistence...")
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, 'id_registry')
+        frame = pd.DataFrame({'customer_id': ['CUS00002', 'CUS00001'], 'recipe_name': ['Phở', 'Bún chả']})
+        registry = load_id_registry(frame, directory=directory)
+        assert list(registry.customers.classes_) == ['CUS00001', 'CUS00002']
+        assert registry.add('customers', 'CUS00003') == 2
+
+        loaded = IdRegistry.open(directory)
+        assert list(loaded.customers.classes_) == ['CUS00001', 'CUS00002', 'CUS00003']
+        assert loaded.recipes.encode('Phở') == registry.recipes.encode('Phở')
+    print("✅ Registry saved and loaded with the same ids")
+
+
+def test_concurrent_processes_get_distinct_ids():
+    print("🧪 Testing id assignment from several processes...")
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, 'id_registry')
+        IdRegistry.open(directory).register(pd.DataFrame({'customer_id': ['CUS00001']}))
+
+        with multiprocessing.get_context('spawn').Pool(3) as pool:
+            results = pool.starmap(_add_customers, [(directory, prefix, 20) for prefix in 'ABC'])
+
+        assigned = {key: key_id for result in results for key, key_id in result.items()}
+        assert len(set(assigned.values())) == len(assigned) == 60
+        saved = IdRegistry.open(directory)
+        assert len(saved.customers) == 61
+        assert all(saved.customers.encode(key) == key_id for key, key_id in assigned.items())
+    print("✅ 60 keys from 3 processes got distinct, saved ids")
+
+
+def test_loading_keeps_the_shared_registry():
+    print("🧪 Testing that loading extends the shared registry in place...")
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, 'id_registry')
+        previous = id_registry._registry
+        shared = IdRegistry.open(directory)
+        id_registry.set_id_registry(shared)
+        try:
+            shared.customers.add('CUS_IN_MEMORY')
+            original_dir, id_registry.REGISTRY_DIR = id_registry.REGISTRY_DIR, directory
+            try:
+                registry = load_id_registry(pd.DataFrame({'customer_id': ['CUS00009']}), directory=directory)
+            finally:
+                id_registry.REGISTRY_DIR = original_dir
+            assert registry is shared
+            assert 'CUS_IN_MEMORY' in registry.customers and 'CUS00009' in registry.customers
+        finally:
+            id_registry.set_id_registry(previous)
+    print("✅ Shared registry kept its in-memory ids")
+
+
+if __name__ == "__main__":
+    test_registry_round_trip()
+    test_concurrent_processes_get_distinct_ids()
+    test_loading_keeps_the_shared_registry()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test compiled keyword rule masks against a per-item evaluation of the rules
+"""
+
+import numpy as np
+
+import keyword_index
+from data_snapshot import read_table
+from interaction_store import InteractionStore
+from keyword_index import ATTRIBUTE_COLUMNS, KeywordIndex, KeywordMatcher, list_rules, register_rule
+
+
+def item_attribute(store, item, attribute):
+    dictionary_name, codes_name = ATTRIBUTE_COLUMNS[attribute]
+    code = getattr(store, codes_name)[item]
+    return getattr(store, dictionary_name)[code] if code >= 0 else None
+
+
+def expected_mask(store, rule):
+    """The rule evaluated item by item with plain substring checks"""
+    mask = np.zeros(store.n_items, dtype=bool)
+    for item in range(store.n_items):
+        code = store.item_recipe_codes[item]
+        name = str(store.recipe_names[code]).lower() if code >= 0 else ''
+        hit = code >= 0 and any(keyword in name for keyword in rule['keywords'])
+        if rule['any_of']:
+            hit = hit or any(item_attribute(store, item, attribute) in values
+                             for attribute, values in rule['any_of'].items())
+        elif not rule['keywords']:
+            hit = True
+        mask[item] = hit and all(item_attribute(store, item, attribute) in values
+                                 for attribute, values in rule['all_of'].items())
+    return mask
+
+
+def test_matcher_finds_overlapping_keywords():
+    print("🧪 Testing Aho-Corasick keyword matcher...")
+    matcher = KeywordMatcher(['bánh', 'bánh mì', 'mì', 'cá', 'cà chua'])
+    assert matcher.find('bánh mì cá') == {0, 1, 2, 3}
+    assert matcher.find('canh cà chua') == {4}
+    assert matcher.find('phở') == set()
+    print("✅ Matcher returns every keyword found")
+
+
+def test_compiled_masks_match_rules():
+    print("🧪 Testing compiled rule masks...")
+    store = InteractionStore.from_dataframe(read_table('interactions_enhanced_final.csv'))
+    index = KeywordIndex(store)
+    for rule in list_rules():
+        mask = index.item_mask(rule['name'])
+        assert np.array_equal(mask, expected_mask(store, rule)), rule['name']
+    print(f"✅ {len(list_rules())} rule masks identical to per-item evaluation")
+
+
+def test_registered_rule_recompiles():
+    print("🧪 Testing rule registration...")
+    store = InteractionStore.from_dataframe(read_table('interactions_enhanced_final.csv'))
+    index = KeywordIndex(store)
+    version = index.rules_version
+    name = 'test:noodles'
+    try:
+        register_rule(name, ['Bún', 'Phở'], all_of={'meal_time': ['breakfast']})
+        assert index.rules_version > version
+        rule = next(rule for rule in list_rules() if rule['name'] == name)
+        assert np.array_equal(index.item_mask(name), expected_mask(store, rule))
+
+        items = np.flatnonzero(index.item_mask(name))[:3]
+        assert len(items) > 0
+        records = [{'item_index': int(store.item_index[item])} for item in items] + [{'item_index': -5}]
+        assert index.matches(name, records).tolist() == [True] * len(items) + [False]
+        assert not index.matches('test:unknown', records).any()
+    finally:
+        with keyword_index._rules_lock:
+            keyword_index._rules.pop(name, None)
+            keyword_index._rules_version += 1
+    print("✅ New rule compiled and matched by item_index")
+
+
+if __name__ == "__main__":
+    test_matcher_finds_overlapping_keywords()
+    test_compiled_masks_match_rules()
+    test_registered_rule_recompiles()
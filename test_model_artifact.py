@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test model artifact save/load round trip and publishing of versions
+"""
+
+import contextlib
+import io
+import multiprocessing
+import os
+import tempfile
+
+import numpy as np
+
+from model_artifact import VERSIONS_SUFFIX, publish_artifact, read_manifest
+
+SAMPLE_DATA = 'interactions_enhanced_final.csv'
+GENERATIONS = ['20250619-100000-aaaaaa', '20250619-110000-bbbbbb', '20250619-090000-cccccc']
+
+
+def train_system():
+    from hybrid_recommendation_system import HybridRecommendationSystem
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        system = HybridRecommendationSystem()
+        system.load_data(SAMPLE_DATA)
+        system.train_all_models()
+    return system
+
+
+def load_system(directory):
+    from hybrid_recommendation_system import HybridRecommendationSystem
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        system = HybridRecommendationSystem()
+        assert system.load_artifact(directory)
+    return system
+
+
+def recommend(system, customers):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return {customer: [(result.recipe_name, round(float(result.score), 6))
+                           for result in system.get_hybrid_recommendations(customer, 10)]
+                for customer in customers}
+
+
+def test_artifact_round_trip():
+    print("🧪 Testing artifact save/load round trip...")
+    system = train_system()
+    customers = list(system.encoders['customer'].classes_[::50])
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, 'artifact')
+        with contextlib.redirect_stdout(io.StringIO()):
+            system.save_artifact(directory)
+        loaded = load_system(directory)
+
+        assert loaded.interactions_df is None
+        assert sorted(loaded.models) == sorted(system.models)
+        assert (loaded.user_item_matrix != system.user_item_matrix).nnz == 0
+        assert np.array_equal(loaded.encoders['customer'].classes_, system.encoders['customer'].classes_)
+        assert recommend(loaded, customers) == recommend(system, customers)
+    print(f"✅ Loaded artifact gives the same recommendations for {len(customers)} customers")
+
+
+def test_publish_keeps_newest_version():
+    print("🧪 Testing artifact publishing...")
+    system = train_system()
+    with tempfile.TemporaryDirectory() as tmp:
+        published = os.path.join(tmp, 'artifact')
+        with contextlib.redirect_stdout(io.StringIO()):
+            system.generation_id = None
+            system.save_artifact(published)            # written before versioning
+            for generation_id in GENERATIONS:
+                system.generation_id = generation_id
+                system.save_artifact(os.path.join(tmp, generation_id))
+
+        # Two publishers at once: the newer generation must end up published
+        context = multiprocessing.get_context('spawn')
+        processes = [context.Process(target=publish_artifact, args=(os.path.join(tmp, generation_id), published))
+                     for generation_id in GENERATIONS[:2]]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            assert process.exitcode == 0
+
+        assert os.path.islink(published)
+        assert read_manifest(published)['generation_id'] == GENERATIONS[1]
+        serving = load_system(published)
+        matrix = serving.user_item_matrix
+
+        # An older generation is discarded, the published one stays
+        with contextlib.redirect_stdout(io.StringIO()):
+            publish_artifact(os.path.join(tmp, GENERATIONS[2]), published)
+        assert read_manifest(published)['generation_id'] == GENERATIONS[1]
+        assert not os.path.exists(os.path.join(tmp, GENERATIONS[2]))
+
+        versions = os.listdir(published + VERSIONS_SUFFIX)
+        assert GENERATIONS[1] in versions and GENERATIONS[2] not in versions
+        assert any(name.startswith('unversioned-') for name in versions)
+        assert load_system(published).generation_id == GENERATIONS[1]
+        assert matrix.sum() == system.user_item_matrix.sum()   # memory-mapped arrays still readable
+    print("✅ Newest generation published; legacy artifact kept as a version")
+
+
+if __name__ == "__main__":
+    test_artifact_round_trip()
+    test_publish_keeps_newest_version()
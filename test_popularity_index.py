@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test incremental popularity leaderboard updates against a full re-rank
+"""
+
+import numpy as np
+
+from data_snapshot import read_table
+from interaction_store import InteractionStore
+from popularity_index import FEATURE_TYPES, PopularityIndex
+
+
+def build_index():
+    store = InteractionStore.from_dataframe(read_table('interactions_enhanced_final.csv'))
+    customers = read_table('customers_data.csv')
+    return PopularityIndex.from_store(store, customers), store
+
+
+def test_record_interaction_matches_full_rank():
+    print("🧪 Testing incremental popularity updates...")
+    index, store = build_index()
+    rng = np.random.default_rng(0)
+    customers = store.customer_ids[rng.choice(len(store.customer_ids), 50)]
+    recipes = index.recipe_names[rng.choice(len(index.recipe_names), 200)]
+
+    for step, recipe_name in enumerate(recipes):
+        index.record_interaction(str(customers[step % len(customers)]), str(recipe_name),
+                                 float(rng.integers(1, 6)))
+
+    incremental = {key: leaderboard.copy() for key, leaderboard in index.leaderboards.items()}
+    for segment_key in index.counts:
+        index._rank(segment_key)
+    for key, leaderboard in index.leaderboards.items():
+        assert np.array_equal(incremental[key], leaderboard), key
+    print(f"✅ {len(incremental)} leaderboards identical to a full re-rank")
+
+
+def test_top_reflects_new_ratings():
+    print("🧪 Testing top() after new ratings...")
+    index, store = build_index()
+    customer_id = str(store.customer_ids[0])
+    last = index.top(None, count=len(index.recipe_names))[-1]['recipe_name']
+    for _ in range(2000):
+        assert index.record_interaction(customer_id, last, 5.0)
+    assert index.top(None, count=1)[0]['recipe_name'] == last
+    for feature_type in FEATURE_TYPES:
+        assert len(index.top(feature_type, count=5)) <= 5
+    print("✅ Heavily rated recipe moved to the top")
+
+
+if __name__ == "__main__":
+    test_record_interaction_matches_full_rank()
+    test_top_reflects_new_ratings()
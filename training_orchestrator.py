@@ -0,0 +1,185 @@
+"""
+🏭 PARALLEL TRAINING ORCHESTRATOR
+=================================
+
+Trains the independent model groups of HybridRecommendationSystem
+concurrently once the data has been preprocessed:
+
+    collaborative         user/item neighbor tables
+    content_based         content neighbor table
+    matrix_factorization  SVD/NMF (surprise) or TruncatedSVD + serving arrays
+    deep_learning         neural CF (TensorFlow) + NumPy inference export
+    implicit_feedback     implicit-feedback ALS over interaction types
+
+Every group runs in its own worker process forked from the preprocessed
+system, so the interaction table, the CSR matrices and the feature arrays are
+shared copy-on-write instead of being pickled to the workers. Each worker
+sends back only the models its group produced.
+
+Per group the orchestrator reports wall time, worker peak RSS and the size of
+the trained models. Peak traced memory (Python and NumPy allocations) is
+added when config['profile_training_memory'] is set; allocation tracing
+slows training down, so it is off by default.
+
+Usage:
+    orchestrator = TrainingOrchestrator(system, n_jobs=4)
+    report = orchestrator.train()                           # every group
+    report = orchestrator.train(['collaborative'])          # retrain a subset
+
+Author: AI Assistant
+Date: June 19, 2025
+"""
+
+import multiprocessing
+import os
+import pickle
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Model group -> HybridRecommendationSystem training method
+MODEL_GROUPS = {
+    'collaborative': 'train_collaborative_filtering',
+    'content_based': 'train_content_based_filtering',
+    'matrix_factorization': 'train_matrix_factorization',
+    'deep_learning': 'train_deep_learning',
+    'implicit_feedback': 'train_implicit_als'
+}
+
+# Below this many interactions the fork/transfer overhead outweighs the gain
+PARALLEL_MIN_INTERACTIONS = 50000
+
+# Models that stay in the worker (the Keras model is exported as neural_cf_numpy)
+UNTRANSFERABLE_MODELS = {'neural_cf'}
+
+# State shared with forked workers (set in the parent right before forking)
+_worker_state: Dict[str, Any] = {}
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB (None if unavailable)"""
+    if resource is None:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _train_group(group: str) -> Dict[str, Any]:
+    """Train one model group on the shared system (runs in a worker or in-process)"""
+    system = _worker_state['system']
+    before = {name: id(model) for name, model in system.models.items()}
+
+    trace_memory = bool(system.config.get('profile_training_memory', False))
+    if trace_memory:
+        tracemalloc.start()
+    start_time = time.perf_counter()
+    error = None
+    try:
+        getattr(system, MODEL_GROUPS[group])()
+    except Exception as e:
+        error = str(e)
+    seconds = time.perf_counter() - start_time
+    peak_bytes = None
+    if trace_memory:
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    # Models created or replaced by this group
+    trained = {name: model for name, model in system.models.items()
+               if before.get(name) != id(model) and name not in UNTRANSFERABLE_MODELS}
+    payload = pickle.dumps(trained, protocol=pickle.HIGHEST_PROTOCOL)
+
+    return {
+        'group': group,
+        'models': sorted(trained),
+        'payload': payload,
+        'seconds': round(seconds, 3),
+        'peak_memory_mb': round(peak_bytes / 1024 / 1024, 2) if peak_bytes is not None else None,
+        'peak_rss_mb': _peak_rss_mb(),
+        'artifact_mb': round(len(payload) / 1024 / 1024, 3),
+        'pid': os.getpid(),
+        'error': error
+    }
+
+
+class TrainingOrchestrator:
+    """Runs the model groups of a preprocessed system in a process pool"""
+
+    def __init__(self, system, n_jobs: Optional[int] = None,
+                 min_parallel_interactions: int = PARALLEL_MIN_INTERACTIONS):
+        self.system = system
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.min_parallel_interactions = min_parallel_interactions
+        self.last_report: List[Dict[str, Any]] = []
+
+    def _use_processes(self, n_groups: int) -> bool:
+        return (min(self.n_jobs, n_groups) > 1
+                and 'fork' in multiprocessing.get_all_start_methods()
+                and self.system.n_interactions >= self.min_parallel_interactions)
+
+    def train(self, groups: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """
+        Train (or retrain) model groups
+
+        Args:
+            groups: Subset of MODEL_GROUPS to train (default: all); models of
+                    the other groups are kept
+
+        Returns:
+            Dictionary with the total wall time, the execution mode and one
+            report per group (seconds, peak_memory_mb (None unless
+            profile_training_memory), peak_rss_mb, artifact_mb, models, error)
+        """
+        groups = list(groups) if groups else list(MODEL_GROUPS)
+        unknown = [group for group in groups if group not in MODEL_GROUPS]
+        if unknown:
+            raise ValueError(f"Unknown model groups: {unknown} (expected {list(MODEL_GROUPS)})")
+
+        start_time = time.perf_counter()
+        _worker_state['system'] = self.system
+        try:
+            if self._use_processes(len(groups)):
+                mode = 'processes'
+                n_workers = min(self.n_jobs, len(groups))
+                with ProcessPoolExecutor(n_workers, mp_context=multiprocessing.get_context('fork')) as pool:
+                    results = list(pool.map(_train_group, groups))
+            else:
+                mode = 'in-process'
+                n_workers = 1
+                results = [_train_group(group) for group in groups]
+        finally:
+            _worker_state.clear()
+
+        report = []
+        for result in results:
+            payload = result.pop('payload')
+            if mode == 'processes' and result['error'] is None:
+                self.system.models.update(pickle.loads(payload))
+            report.append(result)
+
+        self.last_report = report
+        return {
+            'seconds': round(time.perf_counter() - start_time, 3),
+            'mode': mode,
+            'workers': n_workers,
+            'groups': report
+        }
+
+
+def format_report(summary: Dict[str, Any]) -> str:
+    """Human-readable table of a train() summary"""
+    lines = [f"{'group':<22}{'seconds':>9}{'peak MB':>10}{'RSS MB':>9}{'size MB':>10}  models"]
+    for group in summary['groups']:
+        lines.append(
+            f"{group['group']:<22}{group['seconds']:>9.3f}"
+            f"{format(group['peak_memory_mb'], '.2f') if group['peak_memory_mb'] is not None else '-':>10}"
+            f"{group['peak_rss_mb'] if group['peak_rss_mb'] is not None else '-':>9}"
+            f"{group['artifact_mb']:>10.3f}  "
+            f"{', '.join(group['models']) or '-'}{'  ⚠️ ' + group['error'] if group['error'] else ''}")
+    lines.append(f"total {summary['seconds']:.3f}s ({summary['mode']}, {summary['workers']} workers)")
+    return '\n'.join(lines)